@@ -0,0 +1,65 @@
+# batch_control.py - Cancelación y pausa cooperativas de un lote de conversión
+
+import threading
+import multiprocessing
+
+class BatchControl:
+    """
+    Control de un lote desde otro hilo: pause(), resume() y cancel().
+    Es cooperativo: cada trabajo lo consulta antes de empezar, así que los
+    trabajos en cola se descartan y los que están en curso terminan limpios.
+    Para el motor de procesos, shared_events() crea eventos que los procesos
+    hijos reciben al arrancar y que reflejan el estado de este control.
+    """
+
+    def __init__(self, cancel_event=None, running_event=None):
+        self._cancel = cancel_event or threading.Event()
+        self._running = running_event or threading.Event()
+        if running_event is None:
+            self._running.set()
+        self._mirrors = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set() and not self.cancelled
+
+    def cancel(self):
+        """Cancela el lote; también despierta a los trabajos en pausa"""
+        with self._lock:
+            for cancel, running in [(self._cancel, self._running)] + self._mirrors:
+                cancel.set()
+                running.set()
+
+    def pause(self):
+        """Los trabajos que aún no han empezado esperan hasta resume()"""
+        with self._lock:
+            if self._cancel.is_set():
+                return
+            for _, running in [(self._cancel, self._running)] + self._mirrors:
+                running.clear()
+
+    def resume(self):
+        with self._lock:
+            for _, running in [(self._cancel, self._running)] + self._mirrors:
+                running.set()
+
+    def wait(self, timeout=None):
+        """Bloquea mientras el lote esté en pausa; devuelve False si se canceló"""
+        self._running.wait(timeout)
+        return not self._cancel.is_set()
+
+    def shared_events(self, context=multiprocessing):
+        """Par (cancelación, en marcha) de multiprocessing sincronizado con este control"""
+        with self._lock:
+            cancel, running = context.Event(), context.Event()
+            if self._cancel.is_set():
+                cancel.set()
+            if self._running.is_set():
+                running.set()
+            self._mirrors.append((cancel, running))
+            return cancel, running
@@ -0,0 +1,90 @@
+# batch_journal.py - Diario de un lote en curso para reanudarlo tras un cierre inesperado
+
+import os
+import json
+import time
+import atexit
+import threading
+
+class BatchJournal:
+    """
+    Registro de solo anexado (JSONL) de las salidas ya terminadas de un lote.
+    Cada línea es una entrada como las del manifiesto incremental más la ruta
+    del origen. Las entradas se acumulan y se anexan por lotes (cada
+    flush_every entradas o flush_interval segundos); si el proceso muere se
+    pierden como mucho las pendientes, que simplemente se vuelven a convertir.
+    Un lote que termina sin cancelarse borra su diario con finish().
+    """
+    FILE_NAME = '.pix_journal.jsonl'
+
+    def __init__(self, path, resume=False, flush_every=32, flush_interval=1.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._entries = {}
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        if resume:
+            self._load()
+        elif os.path.exists(path):
+            # Lote nuevo: el diario anterior ya no describe nada
+            os.remove(path)
+        atexit.register(self.flush)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Línea truncada por un cierre inesperado
+                        continue
+                    self._entries[entry.get('source')] = entry
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, source):
+        with self._lock:
+            return self._entries.get(os.path.abspath(source))
+
+    def record(self, entry):
+        with self._lock:
+            self._entries[entry['source']] = entry
+            self._pending.append(entry)
+            if (len(self._pending) >= self.flush_every or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        try:
+            lines = ''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in self._pending)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+            self._pending.clear()
+        except OSError:
+            pass
+
+    def finish(self, completed=True):
+        """Cierra el diario; si el lote se completó ya no hace falta y se borra"""
+        atexit.unregister(self.flush)
+        with self._lock:
+            if not completed:
+                self._flush()
+                return
+            self._pending.clear()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -0,0 +1,341 @@
+# benchmark.py - Banco de pruebas de rendimiento del motor de conversión
+#
+# Uso:
+#   python -m benchmark -o resultados.json
+#   python -m benchmark --quick --formats png,jpg,webp --engines threads,processes
+#
+# Genera un corpus sintético en un directorio temporal (tamaños, modos con y
+# sin alfa, paletas y GIF animados), convierte cada formato de entrada a cada
+# formato de salida con convert_image y el corpus completo con batch_convert
+# en cada motor, siempre recodificando (sin passthrough). El informe JSON (imágenes/s, MB/s, latencias p50/p95 y pico
+# de memoria) permite comparar ejecuciones entre versiones. La sección
+# 'flatten' compara el ajuste de modo para JPG (composición de alfa) con la
+# implementación anterior, que convertía, separaba canales y pegaba.
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import PIL
+from PIL import Image, ImageDraw
+from converter import ImageConverter
+
+ENGINES = {
+    'sequential': {'use_threading': False, 'use_processes': False},
+    'threads': {'use_threading': True, 'use_processes': False},
+    'processes': {'use_threading': False, 'use_processes': True},
+}
+
+# Los pares con el mismo formato se copiarían sin decodificar (passthrough):
+# el banco mide siempre la recodificación
+CONVERT_SETTINGS = {'passthrough': 'off'}
+
+SIZES = {'small': (320, 240), 'medium': (1600, 1200), 'large': (4000, 3000)}
+
+# Variantes del corpus: modo de la imagen y si es animada
+VARIANTS = {
+    'rgb': 'RGB',
+    'rgba': 'RGBA',
+    'gray': 'L',
+    'palette': 'P',
+    'palette_alpha': 'PA',
+    'animated': 'GIF',
+}
+
+def writable_formats(formats=None):
+    """Formatos de SUPPORTED_FORMATS que Pillow puede escribir aquí (HEIC necesita pillow-heif)"""
+    Image.init()
+    result = []
+    for fmt in formats or ImageConverter.SUPPORTED_FORMATS:
+        name = 'JPEG' if fmt == 'JPG' else fmt
+        if name in Image.SAVE:
+            result.append(fmt)
+    return result
+
+def synthetic_image(size, variant, seed=0):
+    """Imagen con degradados, ruido y formas para que los codificadores trabajen de verdad"""
+    width, height = size
+    base = Image.linear_gradient('L').resize(size)
+    radial = Image.radial_gradient('L').resize(size)
+    noise = Image.effect_noise(size, 48 + seed % 16)
+    img = Image.merge('RGB', (base, radial, noise))
+    draw = ImageDraw.Draw(img)
+    for i in range(8):
+        x = (seed * 37 + i * width // 8) % width
+        draw.ellipse((x, height // 4, x + width // 6, height // 4 + height // 3),
+                     fill=(255 - i * 30, i * 30, (seed * 50) % 256))
+    if variant == 'gray':
+        return img.convert('L')
+    if variant in ('rgba', 'palette_alpha'):
+        img.putalpha(Image.radial_gradient('L').resize(size).point(lambda v: 255 - v))
+    if variant == 'palette':
+        return img.quantize(256)
+    if variant == 'palette_alpha':
+        alpha = img.getchannel('A')
+        img = img.convert('RGB').quantize(255)
+        img.paste(255, mask=alpha.point(lambda a: 255 if a < 128 else 0))
+        img.info['transparency'] = 255
+    return img
+
+def save_as(img, path, fmt):
+    """Guarda img en fmt adaptando el modo a lo que admite cada formato"""
+    if fmt == 'JPG':
+        img = img.convert('RGB') if img.mode not in ('RGB', 'L') else img
+        img.save(path, format='JPEG', quality=90)
+    elif fmt == 'ICO':
+        img.convert('RGBA').save(path, format='ICO', sizes=[(min(256, img.width), min(256, img.height))])
+    elif fmt == 'BMP' and img.mode == 'RGBA':
+        img.convert('RGB').save(path, format='BMP')
+    else:
+        img.save(path, format=fmt)
+
+def build_corpus(directory, sizes, input_formats, frames=24):
+    """Crea el corpus en directory; devuelve una lista de dicts (path, format, size, variant, bytes)"""
+    corpus = []
+    for size_name in sizes:
+        size = SIZES[size_name]
+        for variant in VARIANTS:
+            for fmt in input_formats:
+                if variant == 'animated':
+                    if fmt not in ImageConverter.ANIMATED_FORMATS:
+                        continue
+                    images = [synthetic_image(size, 'rgb', seed) for seed in range(frames)]
+                    path = os.path.join(directory, f"{size_name}_{variant}_{fmt.lower()}.{fmt.lower()}")
+                    images[0].save(path, format=fmt, save_all=True, append_images=images[1:],
+                                   duration=40, loop=0)
+                else:
+                    path = os.path.join(directory, f"{size_name}_{variant}_{fmt.lower()}.{fmt.lower()}")
+                    save_as(synthetic_image(size, variant), path, fmt)
+                corpus.append({'path': path, 'format': fmt, 'size': size_name,
+                               'variant': variant, 'bytes': os.path.getsize(path)})
+    return corpus
+
+# Modos del banco de composición de alfa: variante del corpus y modo final
+FLATTEN_MODES = {
+    'RGB': ('rgb', 'RGB'),
+    'RGBA': ('rgba', 'RGBA'),
+    'LA': ('rgba', 'LA'),
+    'P+transparency': ('palette_alpha', 'P'),
+}
+
+def legacy_process_for_jpg(img):
+    """Ajuste de modo para JPG tal y como se hacía antes (referencia del banco)"""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        fondo = Image.new('RGB', img.size, (255, 255, 255))
+        fondo.paste(img, mask=img.split()[-1])
+        return fondo
+    return img.convert('RGB')
+
+def bench_flatten(sizes, repeat=3, log=None):
+    """_process_for_format(img, 'JPG') frente a la implementación anterior (mejor de repeat)"""
+    converter = ImageConverter(history_file=None, max_history_items=None)
+    results = []
+    for size_name in sizes:
+        for label, (variant, mode) in FLATTEN_MODES.items():
+            img = synthetic_image(SIZES[size_name], variant)
+            if img.mode != mode:
+                img = img.convert(mode)
+            timings = {}
+            for name, fn in (('current', lambda im: converter._process_for_format(im, 'JPG')),
+                             ('previous', legacy_process_for_jpg)):
+                best = None
+                for _ in range(max(1, repeat)):
+                    t0 = time.perf_counter()
+                    fn(img)
+                    elapsed = time.perf_counter() - t0
+                    best = elapsed if best is None else min(best, elapsed)
+                timings[name] = best
+            entry = {'size': size_name, 'mode': label,
+                     'current_ms': round(timings['current'] * 1000, 3),
+                     'previous_ms': round(timings['previous'] * 1000, 3),
+                     'speedup': round(timings['previous'] / timings['current'], 2) if timings['current'] else None}
+            results.append(entry)
+            if log: log(f"flatten {size_name:<6} {label:<15} {entry['previous_ms']} -> "
+                        f"{entry['current_ms']} ms (x{entry['speedup']})")
+    converter.close()
+    return results
+
+def percentile(values, q):
+    """Percentil q (0-100) por rango más cercano"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize(latencies, total_bytes, elapsed):
+    """Métricas comparables de un escenario"""
+    return {
+        'images': len(latencies),
+        'seconds': round(elapsed, 4),
+        'images_per_sec': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'mb_per_sec': round(total_bytes / 1e6 / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+    }
+
+def peak_rss_mb(children=False):
+    """Pico de memoria residente (MB) del proceso o de sus hijos; None si no se puede medir"""
+    if not children:
+        # En Linux ru_maxrss sobrevive a exec (hereda el pico del padre); VmHWM no
+        try:
+            with open('/proc/self/status', encoding='ascii') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except (OSError, ValueError):
+            pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux informa en KB y macOS en bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def bench_pairs(corpus, output_formats, out_dir, repeat=1, log=None):
+    """convert_image de cada formato de entrada a cada formato de salida"""
+    converter = ImageConverter(history_file=None, max_history_items=None)
+    results = []
+    input_formats = sorted({item['format'] for item in corpus})
+    for in_fmt in input_formats:
+        items = [item for item in corpus if item['format'] == in_fmt]
+        for out_fmt in output_formats:
+            latencies, total_bytes, failures = [], 0, 0
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for item in items:
+                    name = f"{os.path.basename(item['path'])}.{out_fmt.lower()}"
+                    t0 = time.perf_counter()
+                    success, _ = converter.convert_image(item['path'], os.path.join(out_dir, name), out_fmt,
+                                                         CONVERT_SETTINGS)
+                    latencies.append(time.perf_counter() - t0)
+                    total_bytes += item['bytes']
+                    failures += not success
+            entry = {'input': in_fmt, 'output': out_fmt, 'failures': failures}
+            entry.update(summarize(latencies, total_bytes, time.perf_counter() - start))
+            results.append(entry)
+            if log: log(f"{in_fmt:>4} -> {out_fmt:<4} {entry['images_per_sec']} img/s")
+    converter.close()
+    return results
+
+def _run_engine(files, total_bytes, out_dir, output_format, engine, workers, queue):
+    """Ejecuta un lote en un proceso aparte para medir su pico de memoria"""
+    converter = ImageConverter(history_file=None, max_history_items=None)
+    results = converter.batch_convert(files, out_dir, output_format, max_threads=workers,
+                                      max_processes=workers, quality_settings=CONVERT_SETTINGS,
+                                      **ENGINES[engine])
+    converter.close()
+    entry = {'engine': engine, 'output': output_format, 'workers': workers,
+             'failures': sum(1 for success, _, _ in results if not success)}
+    entry.update(summarize(list(results.timings), total_bytes, results.elapsed))
+    # Latencia por archivo; el rendimiento es el del lote completo
+    entry['images_per_sec'] = round(len(results) / results.elapsed, 2) if results.elapsed else None
+    entry['stage_seconds'] = {stage: data['total_seconds']
+                              for stage, data in results.metrics.to_dict()['stages'].items()}
+    entry['peak_rss_mb'] = peak_rss_mb()
+    if engine == 'processes':
+        entry['workers_peak_rss_mb'] = peak_rss_mb(children=True)
+    queue.put(entry)
+
+def bench_batch(corpus, output_formats, engines, workers, out_dir, log=None):
+    """batch_convert del corpus completo con cada motor y formato de salida"""
+    files = [item['path'] for item in corpus]
+    total_bytes = sum(item['bytes'] for item in corpus)
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for out_fmt in output_formats:
+        for engine in engines:
+            target = os.path.join(out_dir, f"batch_{engine}_{out_fmt.lower()}")
+            queue = context.Queue()
+            process = context.Process(target=_run_engine,
+                                      args=(files, total_bytes, target, out_fmt, engine, workers, queue))
+            process.start()
+            entry = queue.get()
+            process.join()
+            results.append(entry)
+            if log: log(f"lote {engine:<10} -> {out_fmt:<4} {entry['images_per_sec']} img/s, "
+                        f"{entry['peak_rss_mb']} MB")
+    return results
+
+def run(args):
+    def log(message):
+        if not args.silent:
+            print(message, file=sys.stderr)
+
+    formats = writable_formats([f.strip().upper() for f in args.formats.split(',')] if args.formats else None)
+    output_formats = formats
+    engines = [e.strip() for e in args.engines.split(',')]
+    if args.sizes:
+        sizes = [s.strip() for s in args.sizes.split(',')]
+    else:
+        sizes = ['small'] if args.quick else list(SIZES)
+    workers = args.workers or os.cpu_count() or 1
+    work_dir = tempfile.mkdtemp(prefix='pix-bench-')
+    try:
+        corpus_dir = os.path.join(work_dir, 'corpus')
+        out_dir = os.path.join(work_dir, 'out')
+        os.makedirs(corpus_dir)
+        os.makedirs(out_dir)
+        log(f"Generando corpus ({', '.join(sizes)}) en {work_dir}")
+        corpus = build_corpus(corpus_dir, sizes, formats, frames=8 if args.quick else 24)
+        report = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'environment': {
+                'python': platform.python_version(),
+                'pillow': PIL.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+            },
+            'config': {'sizes': sizes, 'formats': formats, 'engines': engines,
+                       'workers': workers, 'repeat': args.repeat},
+            'skipped_formats': [f for f in ImageConverter.SUPPORTED_FORMATS if f not in formats],
+            'corpus': {'files': len(corpus), 'bytes': sum(item['bytes'] for item in corpus)},
+        }
+        report['flatten'] = bench_flatten(sizes, max(3, args.repeat), log)
+        report['pairs'] = bench_pairs(corpus, output_formats, out_dir, args.repeat, log)
+        report['pairs_peak_rss_mb'] = peak_rss_mb()
+        batch_formats = [f.strip().upper() for f in args.batch_formats.split(',')] if args.batch_formats else output_formats
+        report['batch'] = bench_batch(corpus, writable_formats(batch_formats), engines, workers, out_dir, log)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=args.indent, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        log(f"Informe guardado en {args.output}")
+    else:
+        print(text)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="benchmark", description="Rendimiento del motor de conversión de Pix")
+    parser.add_argument("-o", "--output", help="Archivo JSON del informe (por defecto: salida estándar)")
+    parser.add_argument("--quick", action="store_true", help="Solo el tamaño pequeño y animaciones cortas")
+    parser.add_argument("--sizes", help="Tamaños: " + ", ".join(SIZES) + " (por defecto todos)")
+    parser.add_argument("--formats", help="Formatos de entrada y salida (por defecto todos los que se pueden escribir)")
+    parser.add_argument("--batch-formats", default="JPG,WEBP",
+                        help="Formatos de salida de los lotes (vacío = los mismos que --formats)")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="Motores de lote: " + ", ".join(ENGINES))
+    parser.add_argument("-w", "--workers", type=int, default=0, help="Hilos o procesos (0 = núcleos)")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeticiones de cada par de formatos")
+    parser.add_argument("--keep", action="store_true", help="Conservar el directorio de trabajo")
+    parser.add_argument("--indent", type=int, default=2, help="Sangría del JSON")
+    parser.add_argument("--silent", action="store_true", help="Sin mensajes de progreso")
+    return parser
+
+def main(argv=None):
+    return run(build_parser().parse_args(argv))
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
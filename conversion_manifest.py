@@ -0,0 +1,119 @@
+# conversion_manifest.py - Manifiesto para la conversión incremental
+
+import os
+import json
+import hashlib
+import threading
+
+def hash_file(path, chunk_size=1024 * 1024, limit=None):
+    """
+    SHA-256 del contenido leído por bloques (sin cargar el archivo entero).
+    Con limit solo se leen los primeros limit bytes.
+    """
+    with open(path, 'rb') as f:
+        return hash_stream(f, chunk_size, limit)
+
+def hash_stream(f, chunk_size=1024 * 1024, limit=None):
+    """SHA-256 de un flujo binario desde su posición actual (ver hash_file)"""
+    digest = hashlib.sha256()
+    remaining = limit
+    while remaining is None or remaining > 0:
+        chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+        if not chunk:
+            break
+        digest.update(chunk)
+        if remaining is not None:
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+def settings_key(output_format, settings):
+    """Representación estable de los ajustes efectivos de una conversión"""
+    return json.dumps({'format': output_format, 'settings': settings or {}},
+                      sort_keys=True, default=str)
+
+def check_entry(entry, source, output, key, verify_hash=False):
+    """
+    Comprueba si la salida registrada en entry sigue al día.
+    Devuelve (al_dia, firma_del_origen); la firma se reutiliza para
+    actualizar el manifiesto tras convertir.
+    """
+    st = os.stat(source)
+    signature = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    if not entry or entry.get('settings') != key or entry.get('output') != os.path.abspath(output):
+        return False, signature
+    try:
+        out_st = os.stat(output)
+    except OSError:
+        return False, signature
+    if out_st.st_size != entry.get('output_size') or out_st.st_mtime_ns != entry.get('output_mtime_ns'):
+        return False, signature
+    if entry.get('size') != signature['size']:
+        return False, signature
+    if entry.get('mtime_ns') == signature['mtime_ns']:
+        return True, signature
+    if verify_hash and entry.get('sha256'):
+        # Misma longitud pero distinta fecha: decide el contenido
+        signature['sha256'] = hash_file(source)
+        return signature['sha256'] == entry['sha256'], signature
+    return False, signature
+
+def make_entry(signature, source, output, key, verify_hash=False):
+    """Entrada del manifiesto para una conversión recién terminada"""
+    out_st = os.stat(output)
+    entry = dict(signature)
+    if verify_hash and 'sha256' not in entry:
+        entry['sha256'] = hash_file(source)
+    entry.update({
+        'output': os.path.abspath(output),
+        'output_size': out_st.st_size,
+        'output_mtime_ns': out_st.st_mtime_ns,
+        'settings': key,
+    })
+    return entry
+
+class ConversionManifest:
+    """
+    Registro de conversiones ya realizadas, indexado por la ruta absoluta del
+    origen (tamaño, fecha de modificación, hash opcional, salida y ajustes).
+    Se guarda completo y de forma atómica al terminar cada lote.
+    """
+    FILE_NAME = '.pix_manifest.json'
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+        except Exception:
+            self._entries = {}
+
+    def get(self, source):
+        with self._lock:
+            return self._entries.get(os.path.abspath(source))
+
+    def update(self, source, entry):
+        with self._lock:
+            self._entries[os.path.abspath(source)] = entry
+            self._dirty = True
+
+    def remove(self, source):
+        with self._lock:
+            if self._entries.pop(os.path.abspath(source), None) is not None:
+                self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
@@ -0,0 +1,133 @@
+# conversion_metrics.py - Tiempos por etapa y contadores de bytes de las conversiones
+
+import bisect
+import time
+
+# Etapas de convert_image en orden; 'encode' incluye las escrituras con búfer
+# y 'write' el vaciado y cierre del archivo de salida
+STAGES = ('open', 'decode', 'process', 'encode', 'write')
+BYTE_COUNTERS = ('input_bytes', 'decoded_bytes', 'output_bytes')
+
+class StageClock:
+    """Cronómetro de etapas: mark(etapa) guarda el tiempo desde la marca anterior"""
+
+    def __init__(self):
+        self.stages = {}
+        self._last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+class StageHistogram:
+    """
+    Histograma de duraciones con cubetas fijas en milisegundos.
+    Los percentiles se estiman con el límite superior de su cubeta.
+    """
+    BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(self.BUCKETS_MS, seconds * 1000)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """Límite superior (ms) de la cubeta que contiene el percentil q (0-100)"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, round(self.max * 1000, 3))
+        return round(self.max * 1000, 3)
+
+    def to_dict(self):
+        labels = [f"<={bound}ms" for bound in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        return {
+            'count': self.count,
+            'total_seconds': round(self.total, 6),
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'max_ms': round(self.max * 1000, 3),
+            'buckets': {label: n for label, n in zip(labels, self.counts) if n},
+        }
+
+class _Group:
+    """Contadores y un histograma por etapa de un conjunto de conversiones"""
+
+    def __init__(self):
+        self.files = 0
+        self.failures = 0
+        self.bytes = dict.fromkeys(BYTE_COUNTERS, 0)
+        self.stages = {stage: StageHistogram() for stage in STAGES}
+
+    def add(self, record):
+        self.files += 1
+        self.failures += not record.get('success', True)
+        for key in BYTE_COUNTERS:
+            self.bytes[key] += record.get(key) or 0
+        for stage, seconds in record.get('stages', {}).items():
+            self.stages.setdefault(stage, StageHistogram()).add(seconds)
+
+    def bottleneck(self):
+        """(etapa, fracción del tiempo total) de la etapa más lenta, o (None, 0)"""
+        total = sum(h.total for h in self.stages.values())
+        if not total:
+            return None, 0.0
+        stage = max(self.stages, key=lambda s: self.stages[s].total)
+        return stage, self.stages[stage].total / total
+
+    def to_dict(self):
+        stage, share = self.bottleneck()
+        data = {'files': self.files, 'failures': self.failures}
+        data.update(self.bytes)
+        data['stages'] = {name: h.to_dict() for name, h in self.stages.items() if h.count}
+        data['bottleneck'] = {'stage': stage, 'share': round(share, 4)} if stage else None
+        return data
+
+class BatchMetrics:
+    """
+    Agrega los registros de convert_image de un lote: totales y, por cada par
+    de formatos ('PNG->JPG'), archivos, fallos, bytes e histogramas por etapa.
+    """
+
+    def __init__(self):
+        self.total = _Group()
+        self.pairs = {}
+
+    def add(self, record):
+        if not record:
+            return
+        pair = f"{record.get('input_format')}->{record.get('output_format')}"
+        if pair not in self.pairs:
+            self.pairs[pair] = _Group()
+        self.pairs[pair].add(record)
+        self.total.add(record)
+
+    def bottleneck(self):
+        return self.total.bottleneck()
+
+    def summary(self):
+        """Texto breve con el reparto del tiempo por etapa, p. ej. 'encode 61%, decode 22%'"""
+        total = sum(h.total for h in self.total.stages.values())
+        if not total:
+            return ""
+        parts = sorted(((h.total / total, stage) for stage, h in self.total.stages.items() if h.count),
+                       reverse=True)
+        return ", ".join(f"{stage} {share:.0%}" for share, stage in parts)
+
+    def to_dict(self):
+        data = self.total.to_dict()
+        data['pairs'] = {pair: group.to_dict() for pair, group in sorted(self.pairs.items())}
+        return data
@@ -1,12 +1,177 @@
 # converter.py - Módulo para convertir imágenes entre múltiples formatos
 
-from PIL import Image
+from PIL import Image, ImageChops, GifImagePlugin
+import io
 import os
+import asyncio
+import re
 import time
-import json
+import shutil
+import signal
 from datetime import datetime
 import threading
-import queue
+import multiprocessing
+from collections import deque
+from batch_control import BatchControl
+from batch_journal import BatchJournal
+from worker_pool import WorkerPool
+from history_store import HistoryStore
+from conversion_manifest import ConversionManifest, check_entry, make_entry, settings_key, hash_file, hash_stream
+from memory_budget import MemoryScheduler, estimate_image_memory, bytes_per_pixel
+from conversion_metrics import BatchMetrics, StageClock
+import quality_metric
+from passthrough import estimate_jpeg_quality, strip_jpeg_metadata, strip_png_metadata, webp_is_lossless, png_zlib_level
+
+class _BatchProgress:
+    """
+    Contador de progreso de un lote seguro entre hilos; solo llama al callback
+    cuando cambia el porcentaje entero, así un lote grande no genera un aviso por archivo.
+    Con total=None el total crece a medida que se descubren archivos y el
+    progreso no pasa de 99% hasta que termina el descubrimiento.
+    """
+    def __init__(self, total, callback):
+        self.total = total
+        self.callback = callback
+        self.discovering = total is None
+        self.completed = 0
+        self.last_percent = -1
+        self.lock = threading.Lock()
+
+    def discovered(self, count):
+        if self.discovering:
+            with self.lock:
+                self.total = count
+
+    def discovery_done(self):
+        with self.lock:
+            self.discovering = False
+        self._report()
+
+    def advance(self, *_):
+        with self.lock:
+            self.completed += 1
+        self._report()
+
+    def _report(self):
+        if not self.callback:
+            return
+        with self.lock:
+            if not self.total or not self.completed:
+                return
+            percent = int(self.completed/self.total*100)
+            if self.discovering:
+                percent = min(percent, 99)
+            if percent != self.last_percent:
+                self.last_percent = percent
+                self.callback(percent)
+
+class _EffortBudget:
+    """
+    Presupuesto de tiempo (s) de un lote para el esfuerzo 'auto'. Con el
+    tiempo medio de los archivos terminados proyecta la duración total; si
+    se pasa del presupuesto limita el esfuerzo de los siguientes trabajos a
+    'balanced' y, si se pasa en más de un 50%, a 'fastest'.
+    """
+    def __init__(self, budget, workers):
+        self.budget = budget
+        self.workers = max(1, workers)
+        self.start = time.perf_counter()
+        self.completed = 0
+        self.busy = 0.0
+        self.lock = threading.Lock()
+
+    def done(self, seconds):
+        with self.lock:
+            self.completed += 1
+            self.busy += seconds
+
+    def cap(self, remaining):
+        with self.lock:
+            if not self.completed:
+                return None
+            average = self.busy / self.completed
+            completed = self.completed
+        projected = time.perf_counter() - self.start + max(0, remaining - completed) * average / self.workers
+        if projected <= self.budget:
+            return None
+        return 'balanced' if projected <= 1.5 * self.budget else 'fastest'
+
+class BatchResults(list):
+    """
+    Resultado de batch_convert: lista de tuplas (success, msg, path) en el orden
+    de entrada, con la ruta de salida y el tiempo (s) de cada archivo.
+    """
+    outputs = ()
+    timings = ()
+    elapsed = 0.0
+    # Modo incremental: archivos omitidos por estar al día
+    cached = ()
+    cache_hits = 0
+    cache_misses = 0
+    # Deduplicación: índice del original de cada duplicado y trabajo ahorrado
+    duplicate_of = ()
+    duplicates = 0
+    dedup_saved_bytes = 0
+    dedup_saved_seconds = 0.0
+    # Tiempos por etapa y bytes: agregado del lote (BatchMetrics) y registro de cada archivo
+    metrics = None
+    file_metrics = ()
+    # Cancelación: el lote se detuvo antes de terminar; dropped = trabajos descartados
+    cancelled = False
+    dropped = 0
+    # Reanudación: archivos que el diario ya daba por terminados
+    resumed = 0
+
+class _FrameStream(Image.Image):
+    """
+    Vista perezosa de los fotogramas procesados de una imagen multi-fotograma.
+    Los escritores de Pillow recorren las animaciones con seek(n): cada
+    fotograma se decodifica y procesa en ese momento y sustituye al anterior,
+    así que solo hay uno en memoria. durations acumula la duración (ms) de los
+    fotogramas ya vistos, en el formato de lista que espera el codificador WEBP.
+    """
+    # Metadatos de animación que se conservan de cada fotograma de origen
+    FRAME_INFO = ('duration', 'loop')
+    _OWN = ('_source', '_process', '_position', 'n_frames', 'is_animated', 'durations',
+            'encoderinfo', 'encoderconfig', '_default_encoderinfo')
+
+    def __init__(self, source, process):
+        super().__init__()
+        self._source = source
+        self._process = process
+        self._position = None
+        self.n_frames = source.n_frames
+        self.is_animated = self.n_frames > 1
+        self.durations = []
+        self.seek(0)
+
+    def seek(self, frame):
+        if not 0 <= frame < self.n_frames:
+            raise EOFError("No hay más fotogramas")
+        if frame == self._position:
+            return
+        self._source.seek(frame)
+        processed = self._process(self._source)
+        if processed is self._source:
+            processed = processed.copy()
+        info = dict(processed.info)
+        for key in self.FRAME_INFO:
+            if key in self._source.info:
+                info[key] = self._source.info[key]
+        disposal = getattr(self._source, 'disposal_method', None)
+        if disposal is not None:
+            info['disposal'] = disposal
+        # Adoptar el estado del fotograma procesado (núcleo, modo, tamaño, paleta)
+        for key, value in vars(processed).items():
+            if key not in self._OWN:
+                setattr(self, key, value)
+        self.info = info
+        self._position = frame
+        if frame == len(self.durations):
+            self.durations.append(info.get('duration', 0))
+
+    def tell(self):
+        return self._position
 
 class ImageConverter:
     """
@@ -23,6 +188,103 @@ class ImageConverter:
         'HEIC': ['heic', 'heif']  # Requiere pillow-heif si quieres HEIC
     }
 
+    # Progreso (%) al terminar cada etapa real de convert_image
+    PROGRESS_STAGES = {
+        'open': 10,
+        'decode': 35,
+        'process': 60,
+        'encode': 85,
+        'write': 100,
+    }
+
+    ICO_SIZES = [(16,16),(32,32),(48,48)]
+
+    # Deduplicación: bytes iniciales que se comparan antes de leer archivos del mismo tamaño
+    DEDUP_HEAD_BYTES = 64 * 1024
+
+    RESAMPLE_FILTERS = {
+        'nearest': Image.Resampling.NEAREST,
+        'box': Image.Resampling.BOX,
+        'bilinear': Image.Resampling.BILINEAR,
+        'hamming': Image.Resampling.HAMMING,
+        'bicubic': Image.Resampling.BICUBIC,
+        'lanczos': Image.Resampling.LANCZOS,
+    }
+
+    # fit: cabe en el recuadro; fill: cubre el recuadro; crop: cubre y recorta al centro
+    RESIZE_MODES = ('fit', 'fill', 'crop')
+
+    # Claves de quality_settings que configuran el pipeline y no se pasan al codificador
+    PIPELINE_KEYS = ('resize', 'effort', 'effort_cap', 'target_size', 'target_iterations',
+                     'target_ssim', 'background', 'passthrough', 'passthrough_link',
+                     'strip_metadata')
+
+    # Formatos con calidad ajustable para los modos de tamaño y calidad objetivo
+    TARGET_SIZE_FORMATS = ('JPG', 'WEBP')
+    TARGET_SIZE_ITERATIONS = 8
+
+    # Esfuerzo del codificador, de más rápido a más pequeño. Cada preajuste
+    # sustituye los parámetros de esfuerzo del formato (la calidad no cambia).
+    # 'standard' reproduce los parámetros anteriores a los preajustes
+    EFFORT_LEVELS = ('fastest', 'balanced', 'standard', 'smallest')
+    EFFORT_PRESETS = {
+        'fastest': {
+            'JPG': {'optimize': False},
+            'WEBP': {'method': 0},
+            'PNG': {'optimize': False},
+        },
+        'balanced': {
+            'JPG': {'optimize': True},
+            'WEBP': {'method': 4},
+            'PNG': {'optimize': False},
+        },
+        'standard': {
+            'JPG': {'optimize': True},
+            'WEBP': {'method': 6},
+            'PNG': {'optimize': True},
+        },
+        'smallest': {
+            'JPG': {'optimize': True, 'progressive': True},
+            'WEBP': {'method': 6},
+            'PNG': {'optimize': True},
+        },
+    }
+    # Modo 'auto': (píxeles máximos, preajuste); por encima, 'fastest'
+    AUTO_EFFORT = ((2_000_000, 'smallest'), (16_000_000, 'balanced'))
+
+    # Modos en los que reduce() promedia píxeles correctamente (no paletas)
+    REDUCIBLE_MODES = ('L', 'LA', 'RGB', 'RGBA', 'RGBX', 'CMYK', 'I', 'F')
+
+    # A partir de este tamaño la composición de alfa de los modos que hay que
+    # convertir (paletas) se hace por franjas de STRIP_BYTES en lugar de crear
+    # una copia RGBA completa de la imagen
+    LARGE_IMAGE_PIXELS = 50_000_000
+    STRIP_BYTES = 16 * 1024 * 1024
+
+    # Salida sin decodificar cuando el formato no cambia (quality_settings['passthrough']):
+    # 'auto' solo si sería equivalente a convertir, 'always' siempre que no
+    # cambien píxeles ni modo, 'off' recodifica siempre
+    PASSTHROUGH_MODES = ('auto', 'always', 'off')
+    # Modos de origen que cada formato escribiría sin cambiar los píxeles
+    PASSTHROUGH_IMAGE_MODES = {
+        'JPG': ('RGB', 'L'),
+        'PNG': ('1', 'L', 'LA', 'P', 'RGB', 'RGBA', 'I', 'I;16'),
+        'WEBP': ('RGB', 'RGBA'),
+        'GIF': ('L', 'P'),
+        'BMP': ('1', 'L', 'P', 'RGB'),
+        'TIFF': ('1', 'L', 'P', 'RGB'),
+    }
+
+    # Fondo sobre el que se compone la transparencia en formatos sin alfa
+    # (quality_settings['background']: tupla RGB o color de Pillow, p. ej. '#202020')
+    BACKGROUND_COLOR = (255, 255, 255)
+
+    # Formatos que admiten varios fotogramas (animaciones y TIFF multipágina)
+    ANIMATED_FORMATS = ('GIF', 'WEBP', 'TIFF')
+
+    # Conversiones asíncronas simultáneas (aconvert, aconvert_bytes, abatch)
+    ASYNC_CONCURRENCY = 2 * (os.cpu_count() or 1)
+
     QUALITY_SETTINGS = {
         'JPG': {'quality': 95, 'optimize': True},
         'WEBP': {'quality': 90, 'method': 6},
@@ -30,27 +292,72 @@ class ImageConverter:
         'TIFF': {'compression': 'tiff_lzw'},
     }
 
-    def __init__(self, history_file="conversion_history.json"):
+    def __init__(self, history_file="conversion_history.jsonl", max_history_items=100):
         self.history_file = history_file
-        self._load_history()
+        # Un pool por número de hilos: cerrar uno mientras otro lote (vista
+        # previa, rendiciones) sigue enviándole trabajo rompería ese lote
+        self._pools = {}
+        self._pool_lock = threading.Lock()
+        # Se migra el historial antiguo (lista JSON) si aún no existe el JSONL
+        legacy_file = os.path.splitext(history_file)[0] + '.json' if history_file else None
+        self._history = HistoryStore(history_file, max_items=max_history_items,
+                                     legacy_path=legacy_file)
+        self._metrics_hooks = []
+        # Puntuaciones SSIM por imagen y ajustes del codificador (modo target_ssim)
+        self._ssim_cache = quality_metric.ScoreCache()
+        # API asíncrona: pool propio y semáforo del bucle de eventos en uso
+        self._async_pool = None
+        self._async_loop = None
+        self._async_semaphore = None
 
-    def _load_history(self):
-        try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    self.history = json.load(f)
-            else:
-                self.history = []
-        except Exception:
-            self.history = []
+    def add_metrics_hook(self, hook):
+        """
+        Registra hook(registro), llamado tras cada conversión con un dict con
+        input_format, output_format, success, stages (segundos por etapa) e
+        input_bytes, decoded_bytes y output_bytes. Puede llamarse desde varios
+        hilos; sus excepciones se ignoran para no romper la conversión.
+        """
+        self._metrics_hooks.append(hook)
 
-    def _save_history(self):
-        try:
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                # Guardar solo las últimas 100 entradas
-                json.dump(self.history[-100:], f, indent=2, ensure_ascii=False)
-        except Exception:
-            pass
+    def remove_metrics_hook(self, hook):
+        self._metrics_hooks.remove(hook)
+
+    def _emit_metrics(self, record):
+        for hook in list(self._metrics_hooks):
+            try:
+                hook(record)
+            except Exception:
+                pass
+
+    def _get_pool(self, max_threads):
+        """Devuelve el pool de max_threads hilos, reutilizado entre lotes"""
+        workers = max(1, int(max_threads))
+        with self._pool_lock:
+            if workers not in self._pools:
+                self._pools[workers] = WorkerPool(workers)
+            return self._pools[workers]
+
+    def close(self):
+        """Libera los hilos de los pools de trabajo"""
+        with self._pool_lock:
+            for pool in self._pools.values():
+                pool.shutdown()
+            self._pools.clear()
+            if self._async_pool is not None:
+                self._async_pool.shutdown()
+                self._async_pool = None
+
+    @property
+    def history(self):
+        """Entradas recientes del historial (las antiguas primero)"""
+        return self._history.entries
+
+    def save_history(self):
+        """Vuelca al disco las entradas pendientes del historial"""
+        self._history.flush()
+
+    def clear_history(self):
+        self._history.clear()
 
     def _add_to_history(self, input_path, output_path, in_fmt, out_fmt, success):
         entry = {
@@ -63,8 +370,7 @@ class ImageConverter:
             'input_size': os.path.getsize(input_path) if os.path.exists(input_path) else 0,
             'output_size': os.path.getsize(output_path) if success and os.path.exists(output_path) else 0
         }
-        self.history.append(entry)
-        self._save_history()
+        self._history.append(entry)
 
     def get_format_from_extension(self, file_path):
         ext = os.path.splitext(file_path)[1].lower().lstrip('.')
@@ -74,36 +380,94 @@ class ImageConverter:
         return None
 
     def convert_image(self, input_path, output_path, output_format,
-                      quality_settings=None, progress_callback=None):
+                      quality_settings=None, progress_callback=None, resize=None,
+                      metrics=None):
         """
         Convierte una sola imagen.
+        progress_callback recibe el porcentaje al completar cada etapa
+        (apertura, decodificación, procesado, codificación y escritura).
+        resize (o quality_settings['resize']) es un dict con max_width,
+        max_height, mode ('fit', 'fill', 'crop'), resample y only_shrink.
+        Si metrics es un dict se rellena con el registro de tiempos por etapa
+        y bytes que también reciben los hooks de add_metrics_hook.
+        Con quality_settings['target_size'] (bytes, JPG/WEBP) la imagen se
+        decodifica y procesa una vez y se busca por bisección la mayor
+        calidad que cabe, codificando en memoria como mucho
+        target_iterations veces; solo el resultado final se escribe. El
+        registro de métricas incluye 'target' (quality, iterations, size, met).
+        Con quality_settings['target_ssim'] (0-1, JPG/WEBP, requiere numpy) se
+        busca la menor calidad cuya salida alcanza esa similitud SSIM con la
+        imagen procesada; el registro incluye 'perceptual'. target_size tiene
+        prioridad si se indican ambos.
+        Si el formato no cambia y la salida sería equivalente (ver
+        _passthrough) el archivo se copia, enlaza o limpia de metadatos sin
+        decodificarlo; el registro incluye 'passthrough' con la operación.
         """
+        clock = StageClock()
+        record = {'input_format': None, 'output_format': output_format, 'success': False,
+                  'stages': clock.stages, 'input_bytes': 0, 'decoded_bytes': 0, 'output_bytes': 0}
+
+        def report(stage):
+            clock.mark(stage)
+            if progress_callback: progress_callback(self.PROGRESS_STAGES[stage])
+
         try:
-            if progress_callback: progress_callback(10)
             in_fmt = self.get_format_from_extension(input_path)
             if not in_fmt:
                 return False, "Formato de entrada no soportado"
+            record['input_format'] = in_fmt
 
-            if progress_callback: progress_callback(25)
+            resize = resize or (quality_settings or {}).get('resize')
+            background = (quality_settings or {}).get('background')
             with Image.open(input_path) as img:
-                if progress_callback: progress_callback(50)
-                img = self._process_for_format(img, output_format)
-                if progress_callback: progress_callback(75)
-
-                save_kwargs = quality_settings or self.QUALITY_SETTINGS.get(output_format, {})
-                time.sleep(0.1)  # pequeña pausa para animación de progreso
-
-                fmt = 'JPEG' if output_format == 'JPG' else output_format
-                if output_format == 'ICO':
-                    # ICO necesita RGBA en varios tamaños
-                    if img.mode != 'RGBA': img = img.convert('RGBA')
-                    img.save(output_path, format='ICO', sizes=[(16,16),(32,32),(48,48)])
+                report('open')
+                record['input_bytes'] = os.path.getsize(input_path)
+                action = self._passthrough(img, input_path, output_format, quality_settings, resize)
+                if action:
+                    record['output_bytes'], msg = self._write_passthrough(action, input_path,
+                                                                          output_path, output_format)
+                    record['passthrough'] = action
+                    report('write')
+                    record['success'] = True
+                    self._add_to_history(input_path, output_path, in_fmt, output_format, True)
+                    return True, msg
+                if self._is_multiframe(img, output_format):
+                    # Los fotogramas se decodifican y procesan durante la codificación,
+                    # así que su tiempo cuenta en 'encode'
+                    frames = img.n_frames
+                    img = self._frame_stream(img, output_format, resize, background)
+                    report('decode')
                 else:
-                    img.save(output_path, format=fmt, **save_kwargs)
+                    frames = 1
+                    img = self.load_reduced(img, self._target_size(output_format, img.size, resize))
+                    report('decode')
+                    record['decoded_bytes'] = img.width * img.height * bytes_per_pixel(img.mode)
+                    img = self._process_for_format(img, output_format, resize, background)
+                report('process')
+                msg = f"Convertido a {output_format}"
+                digest = (self._source_digest(input_path)
+                          if self._targets_ssim(img, output_format, quality_settings) else None)
+                searched = self._search_quality(img, output_format, quality_settings, digest)
+                if searched:
+                    # Decodificado y procesado una vez; solo se repite la codificación en memoria
+                    buffer, key, info = searched
+                    report('encode')
+                    record['output_bytes'] = self._write_atomic(output_path,
+                                                                lambda out: out.write(buffer.getbuffer()))
+                    record[key] = info
+                    msg += self._search_message(key, info)
+                else:
+                    if (quality_settings or {}).get('target_ssim') and not quality_metric.available():
+                        msg += " (calidad fija: el modo SSIM requiere numpy)"
+                    record['output_bytes'] = self._write_output(img, output_path, output_format,
+                                                                quality_settings, lambda: report('encode'))
+                report('write')
+                if frames > 1:
+                    record['decoded_bytes'] = img.width * img.height * bytes_per_pixel(img.mode) * frames
 
-                if progress_callback: progress_callback(100)
+                record['success'] = True
                 self._add_to_history(input_path, output_path, in_fmt, output_format, True)
-                return True, f"Convertido a {output_format}"
+                return True, msg
 
         except FileNotFoundError:
             self._add_to_history(input_path, output_path, None, output_format, False)
@@ -114,19 +478,861 @@ class ImageConverter:
         except Exception as e:
             self._add_to_history(input_path, output_path, None, output_format, False)
             return False, f"Error: {e}"
+        finally:
+            if metrics is not None:
+                metrics.update(record)
+            if self._metrics_hooks:
+                self._emit_metrics(record)
+
+    def _passthrough(self, img, source, output_format, quality_settings, resize=None, start=0):
+        """
+        Operación que produce la salida sin decodificar img (abierta, solo
+        cabeceras): 'copy', 'link', 'strip' (quitar metadatos) o None si hay
+        que convertir. Exige que el formato real sea el de salida, que no haya
+        redimensionado ni búsqueda de calidad y que el modo no cambie. En
+        'auto' un JPEG solo se copia si su calidad estimada no supera la
+        pedida (recodificarlo solo añadiría pérdida) y un WEBP solo si es sin
+        pérdida y se pide sin pérdida; TIFF y PNG, si los ajustes efectivos
+        del codificador no cambian la compresión (ver _same_encoding). source
+        es la ruta o el flujo de origen.
+        """
+        settings = quality_settings or {}
+        mode = settings.get('passthrough', 'auto')
+        if mode not in self.PASSTHROUGH_MODES or mode == 'off':
+            return None
+        if (img.format != ('JPEG' if output_format == 'JPG' else output_format)
+                or img.mode not in self.PASSTHROUGH_IMAGE_MODES.get(output_format, ())):
+            return None
+        if self._resize_geometry(img.size, resize):
+            return None
+        if output_format in self.TARGET_SIZE_FORMATS and (settings.get('target_size')
+                                                          or settings.get('target_ssim')):
+            return None
+        if mode == 'auto' and output_format == 'JPG':
+            source_quality = estimate_jpeg_quality(img)
+            requested = settings.get('quality', self.QUALITY_SETTINGS['JPG']['quality'])
+            if source_quality is None or source_quality > requested:
+                return None
+        if mode == 'auto' and output_format == 'WEBP':
+            if not settings.get('lossless') or not self._read_source(source, start, webp_is_lossless):
+                return None
+        if mode == 'auto' and not self._same_encoding(img, source, output_format, settings, start):
+            return None
+        if settings.get('strip_metadata'):
+            if output_format == 'BMP':
+                # BMP no lleva metadatos
+                return 'copy'
+            if output_format not in ('JPG', 'PNG'):
+                return None
+            if output_format == 'JPG' and img.getexif().get(0x0112, 1) != 1:
+                # La orientación EXIF no puede aplicarse sin recodificar
+                return None
+            return 'strip'
+        return 'link' if settings.get('passthrough_link') else 'copy'
+
+    def _same_encoding(self, img, source, output_format, settings, start=0):
+        """
+        True si los ajustes con los que se codificaría img (los de _encode,
+        con el esfuerzo resuelto para su tamaño) no cambiarían su compresión
+        sin pérdida: un TIFF debe tener ya la compresión pedida y un PNG solo
+        se copia sin optimize, con el nivel de Pillow (6) y si el origen se
+        comprimió al menos con ese nivel.
+        """
+        encoder = self._save_kwargs(output_format, settings, img.width * img.height)
+        if output_format == 'TIFF':
+            return encoder.get('compression', 'raw') == img.info.get('compression', 'raw')
+        if output_format == 'PNG':
+            if encoder.get('compress_level', 6) != 6 or encoder.get('optimize'):
+                return False
+            level = self._read_source(source, start, png_zlib_level)
+            return level is not None and level >= 2
+        return True
+
+    def _read_source(self, source, start, read):
+        """read(flujo) sobre el origen (ruta o flujo, que se deja donde estaba)"""
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                return read(f)
+        position = source.tell()
+        source.seek(start)
+        try:
+            return read(source)
+        finally:
+            source.seek(position)
+
+    def _strip_metadata(self, output_format):
+        return strip_jpeg_metadata if output_format == 'JPG' else strip_png_metadata
+
+    def _write_passthrough(self, action, input_path, output_path, output_format):
+        """Crea output_path desde input_path sin decodificar; devuelve (bytes, mensaje)"""
+        if action != 'strip' and os.path.exists(output_path) and os.path.samefile(input_path, output_path):
+            return os.path.getsize(output_path), "Sin cambios (el origen ya es la salida)"
+        if action == 'link':
+            tmp_path = self._temp_path(output_path)
+            try:
+                os.link(input_path, tmp_path)
+                os.replace(tmp_path, output_path)
+                return os.path.getsize(output_path), "Enlazado sin recodificar"
+            except OSError:
+                # Otro sistema de archivos o sin soporte de enlaces: se copia
+                if os.path.lexists(tmp_path):
+                    os.remove(tmp_path)
+        with open(input_path, 'rb') as src:
+            if action == 'strip':
+                size = self._write_atomic(output_path, lambda out: self._strip_metadata(output_format)(src, out))
+                return size, "Metadatos eliminados sin recodificar"
+            size = self._write_atomic(output_path, lambda out: shutil.copyfileobj(src, out, 1024 * 1024))
+        return size, "Copiado sin recodificar"
+
+    # .<nombre>.<pid>.<hilo>.tmp (ver _temp_path)
+    _TEMP_NAME = re.compile(r'^\..+\.(\d+)\.\d+\.tmp$')
+
+    def _temp_path(self, output_path):
+        """Nombre temporal oculto junto a output_path, único por proceso e hilo"""
+        directory, name = os.path.split(output_path)
+        return os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    def _remove_stale_temps(self, directory):
+        """
+        Borra de directory los temporales de _temp_path cuyo proceso ya no
+        existe (un lote que se mató a mitad de una escritura). Los de
+        procesos vivos, este incluido, pueden estar en uso y se dejan.
+        Devuelve cuántos se borraron.
+        """
+        removed = 0
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    match = self._TEMP_NAME.match(entry.name)
+                    if not match or int(match.group(1)) == os.getpid() or _pid_alive(int(match.group(1))):
+                        continue
+                    try:
+                        os.remove(entry.path)
+                        removed += 1
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return removed
+
+    def _write_output(self, img, output_path, output_format, quality_settings=None,
+                      on_encoded=None):
+        """Codifica img en output_path (de forma atómica); devuelve los bytes escritos"""
+        def write(out):
+            self._encode(img, out, output_format, quality_settings)
+            if on_encoded: on_encoded()
+        return self._write_atomic(output_path, write)
+
+    def _write_atomic(self, output_path, write):
+        """
+        Llama a write(archivo) sobre un temporal junto a output_path y lo
+        renombra de forma atómica: un cierre inesperado nunca deja una salida
+        a medio escribir con el nombre definitivo. Devuelve los bytes escritos.
+        """
+        tmp_path = self._temp_path(output_path)
+        # w+b: el TIFF multipágina relee lo ya escrito para enlazar las páginas
+        out = open(tmp_path, 'w+b')
+        try:
+            with out:
+                write(out)
+                # ICO y TIFF vuelven atrás para escribir cabeceras: el tamaño es el final del archivo
+                size = out.seek(0, os.SEEK_END)
+            # os.replace cambia la entrada del directorio: una salida enlazada
+            # (deduplicación) no sobrescribe sus otros nombres
+            os.replace(tmp_path, output_path)
+            return size
+        except BaseException:
+            # No dejar el temporal (también si se interrumpe)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def convert_bytes(self, source, output_format, quality_settings=None, output=None,
+                      resize=None):
+        """
+        Convierte una imagen en memoria sin tocar el disco.
+        source puede ser bytes o un objeto binario tipo archivo. Devuelve los
+        bytes codificados o, si se pasa output (flujo binario escribible),
+        escribe en él y devuelve el número de bytes escritos.
+        Con quality_settings['target_size'] o 'target_ssim' (JPG/WEBP) se
+        busca la calidad como en convert_image, y si la salida sería
+        equivalente se devuelven los bytes de origen (o sin metadatos).
+        Los errores se propagan (PIL.UnidentifiedImageError, OSError, ...).
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        resize = resize or (quality_settings or {}).get('resize')
+        background = (quality_settings or {}).get('background')
+        start = source.tell()
+        with Image.open(source) as img:
+            action = self._passthrough(img, source, output_format, quality_settings, resize, start)
+            if action:
+                source.seek(start)
+                buffer = io.BytesIO()
+                if action == 'strip':
+                    self._strip_metadata(output_format)(source, buffer)
+                else:
+                    shutil.copyfileobj(source, buffer)
+                if output is None:
+                    return buffer.getvalue()
+                output.write(buffer.getbuffer())
+                return buffer.tell()
+            if self._is_multiframe(img, output_format):
+                img = self._frame_stream(img, output_format, resize, background)
+            else:
+                img = self.load_reduced(img, self._target_size(output_format, img.size, resize))
+                img = self._process_for_format(img, output_format, resize, background)
+            digest = (self._source_digest(source, start)
+                      if self._targets_ssim(img, output_format, quality_settings) else None)
+            searched = self._search_quality(img, output_format, quality_settings, digest)
+            if searched:
+                buffer = searched[0]
+                if output is None:
+                    return buffer.getvalue()
+                output.write(buffer.getbuffer())
+                return buffer.tell()
+            if (output is not None and getattr(output, 'seekable', lambda: False)()
+                    and getattr(output, 'readable', lambda: False)()
+                    and (output_format not in ('ICO', 'TIFF') or output.tell() == 0)):
+                begin = output.tell()
+                self._encode(img, output, output_format, quality_settings)
+                # ICO y TIFF vuelven atrás para escribir cabeceras: el tamaño es el final del flujo
+                return output.seek(0, os.SEEK_END) - begin
+            # Algunos codificadores necesitan seek (ICO) o releer la salida
+            # (TIFF multipágina), y ambos escriben posiciones absolutas, así
+            # que a mitad de un flujo o sin seek se codifica en memoria
+            buffer = io.BytesIO()
+            self._encode(img, buffer, output_format, quality_settings)
+            if output is None:
+                return buffer.getvalue()
+            data = buffer.getbuffer()
+            output.write(data)
+            return len(data)
+
+    # ——————————————————————————————
+    # API asíncrona (asyncio): el trabajo de CPU va al pool de hilos y el
+    # bucle de eventos nunca se bloquea
+    # ——————————————————————————————
+
+    def _get_async_pool(self):
+        """
+        Pool compartido por las llamadas asíncronas. Su cola no tiene límite:
+        submit() se llama desde el bucle de eventos y no puede bloquear. Los
+        trabajos cancelados antes de empezar siguen en la cola hasta que un
+        hilo los descarta; lo que se acota es el trabajo vivo, con el semáforo
+        de _async_limit.
+        """
+        with self._pool_lock:
+            if self._async_pool is None:
+                self._async_pool = WorkerPool(os.cpu_count() or 1, queue_size=0)
+            return self._async_pool
+
+    def _async_limit(self):
+        """Semáforo que acota las conversiones asíncronas en curso (uno por bucle de eventos)"""
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_loop = loop
+            self._async_semaphore = asyncio.Semaphore(self.ASYNC_CONCURRENCY)
+        return self._async_semaphore
+
+    async def _offload(self, fn, *args):
+        """
+        Ejecuta fn en el pool cuando el semáforo deja hueco. Si la tarea se
+        cancela antes de empezar el trabajo se descarta; si ya está en curso
+        termina en segundo plano (la salida se escribe de forma atómica).
+        """
+        async with self._async_limit():
+            return await asyncio.wrap_future(self._get_async_pool().submit(fn, *args))
+
+    async def aconvert(self, input_path, output_path, output_format,
+                       quality_settings=None, resize=None):
+        """Versión asíncrona de convert_image; devuelve (success, msg)"""
+        return await self._offload(self.convert_image, input_path, output_path, output_format,
+                                   quality_settings, None, resize)
+
+    async def aconvert_bytes(self, source, output_format, quality_settings=None, resize=None):
+        """Versión asíncrona de convert_bytes; devuelve los bytes codificados"""
+        return await self._offload(self.convert_bytes, source, output_format, quality_settings,
+                                   None, resize)
+
+    async def abatch(self, files, output_dir, output_format, quality_settings=None, resize=None):
+        """
+        Generador asíncrono que convierte files en output_dir y produce cada
+        (success, msg, path) en cuanto termina, en orden de finalización.
+        Como mucho hay ASYNC_CONCURRENCY archivos en curso y no se envían más
+        mientras el consumidor no pida el siguiente resultado. Al cancelar la
+        tarea consumidora (o salir del bucle) se descartan los pendientes.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        files = iter(files)
+        pending = {}
+        try:
+            while True:
+                while len(pending) < self.ASYNC_CONCURRENCY:
+                    path = next(files, None)
+                    if path is None:
+                        break
+                    out = self._output_path_for(path, output_dir, output_format)
+                    task = asyncio.ensure_future(self.aconvert(path, out, output_format,
+                                                               quality_settings, resize))
+                    pending[task] = path
+                if not pending:
+                    return
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    path = pending.pop(task)
+                    success, msg = task.result()
+                    yield success, msg, path
+        finally:
+            for task in pending:
+                task.cancel()
+            self._history.flush()
+
+    def convert_renditions(self, input_path, renditions, output_dir=None, max_threads=4):
+        """
+        Genera varias versiones (tamaño/formato) de una imagen con una sola
+        decodificación. Cada rendición es un dict con 'format' y, opcionalmente,
+        'name', 'resize', 'quality' (argumentos del codificador, también
+        target_size o target_ssim) y 'output'.
+        Cada tamaño se obtiene del intermedio más pequeño que siga siendo
+        adecuado (al menos el doble del destino) y las codificaciones se
+        reparten en el pool de hilos (en serie si comparten imagen). Las
+        puntuaciones SSIM se guardan en output_dir (ScoreCache.FILE_NAME), así
+        que cada tamaño aprovecha la búsqueda de los demás y de otras
+        ejecuciones. Devuelve una lista de dicts (en el orden
+        recibido) con name, format, output, success, msg, size y bytes.
+        """
+        output_dir = output_dir or os.path.dirname(input_path)
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        in_fmt = self.get_format_from_extension(input_path)
+        results = []
+        for i, rendition in enumerate(renditions):
+            fmt = rendition['format'].upper()
+            name = rendition.get('name') or str(i)
+            results.append({
+                'name': name, 'format': fmt,
+                'output': rendition.get('output') or os.path.join(output_dir, f"{stem}_{name}.{fmt.lower()}"),
+                'success': False, 'msg': '', 'size': None, 'bytes': 0,
+            })
+
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            with Image.open(input_path) as src:
+                source_size = src.size
+                # ICO no se redimensiona aquí (como en convert_image): el
+                # codificador genera cada tamaño y _target_size ya limita la decodificación
+                resizes = [r.get('resize') for r in renditions]
+                geometries = [self._resize_geometry(source_size, resize) for resize in resizes]
+                targets = [self._target_size(res['format'], source_size, resize)
+                           for res, resize in zip(results, resizes)]
+                # Una sola decodificación, a la resolución que necesite la rendición más grande
+                decode_target = None
+                if all(targets):
+                    decode_target = max(targets, key=lambda t: t[0] * t[1])
+                src = self.load_reduced(src, decode_target)
+
+                # De mayor a menor para que cada tamaño parta del intermedio anterior
+                order = sorted(range(len(renditions)),
+                               key=lambda i: -(geometries[i][0][0] * geometries[i][0][1]
+                                               if geometries[i] else source_size[0] * source_size[1]))
+                intermediates = [src]
+                images = {}
+                for i in order:
+                    if not geometries[i]:
+                        images[i] = src
+                        continue
+                    new_size, box = geometries[i]
+                    candidates = [im for im in intermediates
+                                  if im.width >= 2 * new_size[0] and im.height >= 2 * new_size[1]]
+                    base = min(candidates, key=lambda im: im.width * im.height) if candidates else src
+                    scaled = self._scale(base, new_size, resizes[i].get('resample', 'lanczos'))
+                    if scaled is not base:
+                        intermediates.append(scaled)
+                    images[i] = scaled.crop(box) if box else scaled
+
+                # save() guarda los parámetros del codificador en la imagen: las
+                # rendiciones que comparten objeto se codifican una tras otra
+                groups = {}
+                for i in order:
+                    groups.setdefault(id(images[i]), []).append(i)
+
+                # Las búsquedas SSIM comparten el hash del origen y sus puntuaciones
+                digest = score_file = None
+                if any((r.get('quality') or {}).get('target_ssim') for r in renditions):
+                    digest = self._source_digest(input_path)
+                    score_file = os.path.join(output_dir, quality_metric.ScoreCache.FILE_NAME)
+                    self._ssim_cache.load(score_file)
+
+                def encode_group(indexes):
+                    for i in indexes:
+                        self._encode_rendition(images[i], results[i], renditions[i].get('quality'),
+                                               digest)
+
+                pool = self._get_pool(max_threads)
+                futures = [pool.submit(encode_group, indexes) for indexes in groups.values()]
+                for future in futures:
+                    future.result()
+                if score_file:
+                    self._ssim_cache.save(score_file)
+        except FileNotFoundError:
+            for res in results:
+                res['msg'] = "Archivo no encontrado."
+        except PermissionError:
+            for res in results:
+                res['msg'] = "Sin permisos para acceder."
+        except Exception as e:
+            for res in results:
+                if not res['msg']:
+                    res['msg'] = f"Error: {e}"
+
+        for res in results:
+            self._add_to_history(input_path, res['output'], in_fmt, res['format'], res['success'])
+        return results
+
+    def _encode_rendition(self, img, result, quality_settings, source=None):
+        """Ajusta el modo y escribe una rendición; el resultado se anota en result"""
+        try:
+            img = self._process_for_format(img, result['format'],
+                                           background=(quality_settings or {}).get('background'))
+            msg = f"Convertido a {result['format']}"
+            searched = self._search_quality(img, result['format'], quality_settings, source)
+            if searched:
+                buffer, key, info = searched
+                result['bytes'] = self._write_atomic(result['output'],
+                                                     lambda out: out.write(buffer.getbuffer()))
+                result[key] = info
+                msg += self._search_message(key, info)
+            else:
+                result['bytes'] = self._write_output(img, result['output'], result['format'],
+                                                     quality_settings)
+            result['size'] = img.size
+            result.update(success=True, msg=msg)
+        except Exception as e:
+            result['msg'] = f"Error: {e}"
 
-    def _process_for_format(self, img, output_format):
+    def _target_size(self, output_format, size, resize=None):
+        """Tamaño máximo que necesita la salida, o None si es el de origen"""
+        targets = []
+        if output_format == 'ICO':
+            targets.append(max(self.ICO_SIZES))
+        geometry = self._resize_geometry(size, resize)
+        if geometry:
+            targets.append(geometry[0])
+        if not targets:
+            return None
+        return min(targets, key=lambda t: t[0] * t[1])
+
+    def _resize_geometry(self, size, resize):
+        """
+        Calcula (tamaño_escalado, caja_de_recorte) para aplicar resize a una
+        imagen de tamaño size. Devuelve None si no hay que redimensionar.
+        """
+        if not resize:
+            return None
+        max_w = resize.get('max_width') or 0
+        max_h = resize.get('max_height') or 0
+        if not max_w and not max_h:
+            return None
+        mode = resize.get('mode', 'fit')
+        if mode not in self.RESIZE_MODES:
+            raise ValueError(f"Modo de redimensionado no válido: {mode}")
+        w, h = size
+        scales = [dim for dim in (max_w / w if max_w else None, max_h / h if max_h else None)
+                  if dim is not None]
+        # Con una sola dimensión todos los modos equivalen a 'fit'
+        both = len(scales) == 2
+        scale = max(scales) if both and mode in ('fill', 'crop') else min(scales)
+        if resize.get('only_shrink', True):
+            scale = min(scale, 1.0)
+        new_size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        box = None
+        if both and mode == 'crop':
+            crop_w, crop_h = min(max_w, new_size[0]), min(max_h, new_size[1])
+            left = (new_size[0] - crop_w) // 2
+            top = (new_size[1] - crop_h) // 2
+            box = (left, top, left + crop_w, top + crop_h)
+            if box == (0, 0) + new_size:
+                box = None
+        if new_size == size and box is None:
+            return None
+        return new_size, box
+
+    def _apply_resize(self, img, resize):
+        """Etapa de redimensionado del pipeline"""
+        geometry = self._resize_geometry(img.size, resize)
+        if not geometry:
+            return img
+        new_size, box = geometry
+        img = self._scale(img, new_size, resize.get('resample', 'lanczos'))
+        if box:
+            img = img.crop(box)
+        return img
+
+    def _scale(self, img, new_size, resample='lanczos'):
+        """Escala img a new_size con el filtro indicado por nombre"""
+        if new_size == img.size:
+            return img
+        resample = self.RESAMPLE_FILTERS[resample]
+        if img.mode in ('P', '1') and resample != Image.Resampling.NEAREST:
+            # Las paletas solo admiten vecino más próximo: pasar a color real
+            has_alpha = 'transparency' in img.info
+            img = img.convert('RGBA' if has_alpha else 'RGB')
+        return img.resize(new_size, resample, reducing_gap=3.0)
+
+    def load_reduced(self, img, target_size=None, reducing_gap=2.0):
+        """
+        Decodifica img a la menor resolución que siga cubriendo
+        target_size * reducing_gap: usa draft() en JPEG (escalado DCT 1/2-1/8
+        durante la decodificación) y reduce() por un factor entero después.
+        Sin target_size decodifica a tamaño completo. Devuelve la imagen cargada.
+        """
+        if not target_size:
+            img.load()
+            return img
+        needed = (max(1, int(target_size[0] * reducing_gap)),
+                  max(1, int(target_size[1] * reducing_gap)))
+        if img.format == 'JPEG':
+            img.draft(None, needed)
+        img.load()
+        factor = int(min(img.width / needed[0], img.height / needed[1]))
+        if factor >= 2 and img.mode in self.REDUCIBLE_MODES:
+            img = img.reduce(factor)
+        return img
+
+    def make_thumbnail(self, source, size=(180, 180)):
+        """
+        Miniatura rápida para vistas previas (RGB o RGBA) sin decodificar la
+        imagen completa. source es una ruta, bytes o un objeto tipo archivo.
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        with Image.open(source) as img:
+            has_alpha = 'A' in img.mode or 'transparency' in img.info
+            img = self.load_reduced(img, size)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if has_alpha else 'RGB')
+            img.thumbnail(size, Image.Resampling.LANCZOS)
+            return img.copy()
+
+    def resolve_effort(self, effort, pixels, cap=None):
+        """
+        Preajuste de esfuerzo para una imagen de pixels píxeles. 'auto' usa el
+        más lento para imágenes pequeñas y el más rápido para las grandes;
+        cap (lo fija el presupuesto de tiempo del lote) limita ese esfuerzo.
+        """
+        if effort != 'auto':
+            return effort if effort in self.EFFORT_PRESETS else None
+        effort = next((name for limit, name in self.AUTO_EFFORT if pixels <= limit), 'fastest')
+        if cap in self.EFFORT_LEVELS and self.EFFORT_LEVELS.index(effort) > self.EFFORT_LEVELS.index(cap):
+            effort = cap
+        return effort
+
+    def _targets_size(self, img, output_format, quality_settings):
+        """True si hay que buscar la calidad para un tamaño objetivo (no con animaciones)"""
+        return bool((quality_settings or {}).get('target_size')
+                    and output_format in self.TARGET_SIZE_FORMATS
+                    and not isinstance(img, _FrameStream))
+
+    def _targets_ssim(self, img, output_format, quality_settings):
+        """True si hay que buscar la calidad para una similitud SSIM objetivo"""
+        return bool((quality_settings or {}).get('target_ssim')
+                    and output_format in self.TARGET_SIZE_FORMATS
+                    and not isinstance(img, _FrameStream)
+                    and quality_metric.available())
+
+    def _search_quality(self, img, output_format, quality_settings, source=None):
+        """
+        Codificación con búsqueda de calidad si quality_settings la pide:
+        (buffer, clave del registro de métricas, info) o None. source es el
+        hash del origen (ver _source_digest) para la caché SSIM.
+        """
+        if self._targets_size(img, output_format, quality_settings):
+            buffer, info = self._encode_to_size(img, output_format, quality_settings)
+            return buffer, 'target', info
+        if self._targets_ssim(img, output_format, quality_settings):
+            buffer, info = self._encode_to_ssim(img, output_format, quality_settings, source)
+            return buffer, 'perceptual', info
+        return None
+
+    def _encode_to_size(self, img, output_format, quality_settings):
+        """
+        Busca por bisección la mayor calidad cuya salida cabe en
+        quality_settings['target_size'] bytes, codificando en memoria (como
+        mucho target_iterations veces). Devuelve (buffer, info) con quality,
+        iterations, size y met; si ninguna calidad cabe, el intento más pequeño.
+        """
+        settings = dict(quality_settings)
+        if all(key in self.PIPELINE_KEYS for key in settings):
+            settings.update(self.QUALITY_SETTINGS.get(output_format, {}))
+        target = settings['target_size']
+        max_iterations = max(1, settings.get('target_iterations') or self.TARGET_SIZE_ITERATIONS)
+        low, high = 1, min(100, settings.get('quality', 95))
+        best = smallest = None
+        iterations = 0
+        # La calidad configurada primero: si ya cabe no hace falta buscar
+        quality = high
+        while low <= high and iterations < max_iterations:
+            buffer = io.BytesIO()
+            self._encode(img, buffer, output_format, dict(settings, quality=quality))
+            iterations += 1
+            if buffer.tell() <= target:
+                best = (buffer, quality)
+                low = quality + 1
+            else:
+                if smallest is None or buffer.tell() < smallest[0].tell():
+                    smallest = (buffer, quality)
+                high = quality - 1
+            quality = (low + high) // 2
+        buffer, quality = best or smallest
+        return buffer, {'quality': quality, 'iterations': iterations, 'size': buffer.tell(),
+                        'target': target, 'met': best is not None}
+
+    def _encode_to_ssim(self, img, output_format, quality_settings, source=None):
+        """
+        Busca por bisección la menor calidad cuya salida alcanza
+        quality_settings['target_ssim'] frente a la luminancia reducida de img
+        (como mucho target_iterations codificaciones). Las puntuaciones se
+        guardan en self._ssim_cache por origen (source, hash de su contenido)
+        y ajustes del codificador, y dentro por imagen procesada: repetir la
+        conversión solo codifica la calidad elegida, y otra rendición del
+        mismo origen empieza por la calidad que eligieron las demás. Con un
+        archivo de puntuaciones (ver _run_batch) se conservan entre ejecuciones.
+        Devuelve (buffer, info) con quality, score, iterations, cached y met;
+        si ninguna calidad llega, la mayor probada.
+        """
+        settings = dict(quality_settings)
+        if all(key in self.PIPELINE_KEYS for key in settings):
+            settings.update(self.QUALITY_SETTINGS.get(output_format, {}))
+        target = settings['target_ssim']
+        max_iterations = max(1, settings.get('target_iterations') or self.TARGET_SIZE_ITERATIONS)
+        scorer = quality_metric.SSIMScorer(img)
+        # El preajuste de esfuerzo resuelto forma parte de la entrada (cambia la salida)
+        effort = self.resolve_effort(settings.get('effort'), img.width * img.height,
+                                     settings.get('effort_cap')) if settings.get('effort') else None
+        encoder = {k: v for k, v in settings.items() if k not in self.PIPELINE_KEYS and k != 'quality'}
+        family = f"{source or scorer.key}:{settings_key(output_format, encoder)}"
+        entry = f"{scorer.key}:{effort}"
+        known = self._ssim_cache.get(family)
+        scores = known.pop(entry, {})
+        cached = len(scores)
+        # Calidad elegida por otras rendiciones del mismo origen: primer intento
+        chosen = [min(q for q, s in other.items() if s >= target)
+                  for other in known.values() if any(s >= target for s in other.values())]
+        hint = round(sum(chosen) / len(chosen)) if chosen and not scores else None
+        buffers = {}
+
+        def encode(quality):
+            buffer = io.BytesIO()
+            self._encode(img, buffer, output_format, dict(settings, quality=quality))
+            buffers[quality] = buffer
+            return buffer
+
+        low, high = 1, 100
+        best = None
+        iterations = 0
+        quality = hint
+        direction = None
+        step = 1
+        while low <= high and iterations < max_iterations:
+            if quality is None:
+                quality = (low + high) // 2
+            if quality not in scores:
+                scores[quality] = scorer.score(encode(quality).getvalue())
+            iterations += 1
+            met = scores[quality] >= target
+            if met:
+                best = quality
+                high = quality - 1
+            else:
+                low = quality + 1
+            if hint is not None and direction in (None, -1 if met else 1):
+                # Desde la pista se avanza con pasos que se duplican hasta
+                # que el resultado cambia; después, bisección en lo acotado
+                direction = -1 if met else 1
+                quality = min(high, max(low, quality + direction * step))
+                step *= 2
+            else:
+                hint = quality = None
+        # Sin ninguna calidad suficiente se usa la mayor probada
+        quality = best if best is not None else max(scores)
+        self._ssim_cache.update(family, entry, scores)
+        buffer = buffers.get(quality) or encode(quality)
+        return buffer, {'quality': quality, 'score': round(scores[quality], 5),
+                        'iterations': len(buffers), 'cached': iterations - (len(scores) - cached),
+                        'target': target, 'met': best is not None}
+
+    def _score_file(self, directory, quality_settings):
+        """Archivo de puntuaciones SSIM de un lote que las busca (si no, None)"""
+        if not (quality_settings or {}).get('target_ssim'):
+            return None
+        return os.path.join(directory, quality_metric.ScoreCache.FILE_NAME)
+
+    def _source_digest(self, source, start=0):
+        """SHA-256 del origen (ruta o flujo desde start): su clave en la caché SSIM"""
+        return self._read_source(source, start, hash_stream)
+
+    def _search_message(self, key, info):
+        """Detalle del mensaje de convert_image para una búsqueda de calidad"""
+        if key == 'perceptual':
+            msg = (f" (SSIM {info['score']:.4f}, calidad {info['quality']}, "
+                   f"{info['iterations']} codificaciones)")
+            return msg if info['met'] else msg + " sin alcanzar la similitud objetivo"
+        msg = (f" ({info['size']} bytes, calidad {info['quality']}, "
+               f"{info['iterations']} codificaciones)")
+        return msg if info['met'] else msg + " sin alcanzar el tamaño objetivo"
+
+    def _encode(self, img, fp, output_format, quality_settings=None):
+        """Codifica una imagen ya procesada en el flujo binario fp"""
+        save_kwargs = self._save_kwargs(output_format, quality_settings, img.width * img.height)
+        if isinstance(img, _FrameStream):
+            self._encode_frames(img, fp, output_format, save_kwargs)
+        elif output_format == 'ICO':
+            # ICO necesita RGBA en varios tamaños
+            if img.mode != 'RGBA': img = img.convert('RGBA')
+            img.save(fp, format='ICO', sizes=self.ICO_SIZES)
+        else:
+            fmt = 'JPEG' if output_format == 'JPG' else output_format
+            img.save(fp, format=fmt, **save_kwargs)
+
+    def _save_kwargs(self, output_format, quality_settings, pixels):
+        """
+        Argumentos del codificador: los de quality_settings (o
+        QUALITY_SETTINGS si no hay ninguno) con el preajuste de esfuerzo
+        resuelto para una imagen de pixels píxeles.
+        """
+        quality_settings = quality_settings or {}
+        save_kwargs = {k: v for k, v in quality_settings.items() if k not in self.PIPELINE_KEYS}
+        save_kwargs = save_kwargs or dict(self.QUALITY_SETTINGS.get(output_format, {}))
+        if quality_settings.get('effort'):
+            preset = self.resolve_effort(quality_settings['effort'], pixels,
+                                         quality_settings.get('effort_cap'))
+            if preset:
+                save_kwargs.update(self.EFFORT_PRESETS[preset].get(output_format, {}))
+        return save_kwargs
+
+    def _is_multiframe(self, img, output_format):
+        """True si img tiene varios fotogramas y la salida puede conservarlos"""
+        return (output_format in self.ANIMATED_FORMATS and img.format in self.ANIMATED_FORMATS
+                and getattr(img, 'n_frames', 1) > 1)
+
+    def _frame_stream(self, img, output_format, resize=None, background=None):
+        """
+        Secuencia perezosa de los fotogramas de img ya procesados para
+        output_format. Todos los fotogramas de GIF y WEBP comparten el tamaño
+        del primero; en GIF comparten además una única paleta.
+        """
+        shared = {}
+        if output_format == 'GIF':
+            shared['alpha'] = 'A' in img.mode or 'transparency' in img.info
+            shared['palette'] = self._shared_palette(img, shared['alpha'])
+
+        def process(frame):
+            frame = self._apply_resize(frame, resize)
+            if output_format != 'TIFF':
+                canvas = shared.setdefault('size', frame.size)
+                if frame.size != canvas:
+                    frame = self._scale(frame, canvas, (resize or {}).get('resample', 'lanczos'))
+            if output_format == 'GIF':
+                return self._quantize_frame(frame, shared)
+            return self._process_for_format(frame, output_format, background=background)
+
+        return _FrameStream(img, process)
+
+    def _shared_palette(self, img, has_alpha, samples=8, tile=128):
+        """
+        Paleta común a todos los fotogramas: se cuantiza una tira con
+        miniaturas de fotogramas repartidos por toda la animación, así los
+        colores que aparecen más tarde también tienen entrada. Con
+        transparencia se deja libre el índice 255.
+        """
+        count = min(samples, img.n_frames)
+        indices = sorted({round(i * (img.n_frames - 1) / max(1, count - 1)) for i in range(count)})
+        strip = Image.new('RGB', (tile * len(indices), tile))
+        for pos, index in enumerate(indices):
+            img.seek(index)
+            frame = img.convert('RGBA').convert('RGB')
+            # Vecino más próximo: no inventa colores intermedios
+            frame.thumbnail((tile, tile), Image.Resampling.NEAREST)
+            strip.paste(frame, (pos * tile, 0))
+        img.seek(0)
+        return strip.quantize(colors=255 if has_alpha else 256)
+
+    def _quantize_frame(self, frame, shared):
+        """
+        Pasa un fotograma a la paleta compartida: cuantizar contra una paleta
+        fija es mucho más barato que recalcularla y evita tablas de color
+        locales. Los píxeles transparentes van al índice 255.
+        """
+        alpha = None
+        if shared['alpha']:
+            frame = frame.convert('RGBA')
+            alpha = frame.getchannel('A')
+        quantized = frame.convert('RGB').quantize(palette=shared['palette'])
+        if alpha is not None:
+            quantized.paste(255, mask=alpha.point(lambda a: 255 if a < 128 else 0))
+            quantized.info['transparency'] = 255
+        return quantized
+
+    def _encode_frames(self, frames, fp, output_format, save_kwargs):
+        """Codifica una secuencia de fotogramas procesados sin acumularlos"""
+        if output_format == 'GIF':
+            self._write_gif_frames(frames, fp)
+            return
+        save_kwargs = dict(save_kwargs)
+        if output_format == 'WEBP':
+            # Sin bloque de repetición el GIF se reproduce una sola vez
+            save_kwargs.setdefault('loop', frames.info.get('loop', 1))
+            save_kwargs.setdefault('duration', frames.durations)
+        frames.save(fp, format=output_format, save_all=True, **save_kwargs)
+
+    def _write_gif_frames(self, frames, fp):
+        """
+        Escribe un GIF animado fotograma a fotograma. El escritor de Pillow
+        guarda todos los fotogramas hasta el final para optimizarlos; aquí se
+        escribe cada uno en cuanto se procesa, recortado a la zona que cambia
+        respecto al anterior cuando este no se borra al pasar de fotograma.
+        """
+        frames.seek(0)
+        info = {key: frames.info[key] for key in ('loop', 'duration', 'transparency')
+                if key in frames.info}
+        header, _ = GifImagePlugin.getheader(frames.copy(), info=info)
+        fp.write(b''.join(header))
+        previous = None
+        for index in range(frames.n_frames):
+            frames.seek(index)
+            params = {'duration': frames.info.get('duration', 0)}
+            if 'transparency' in frames.info:
+                params['transparency'] = frames.info['transparency']
+            # Sin método de origen, restaurar al fondo para que la
+            # transparencia no deje ver el fotograma anterior
+            params['disposal'] = frames.info.get('disposal', 2 if 'transparency' in params else 0)
+            frame, offset = frames.copy(), (0, 0)
+            if previous is not None:
+                # Misma paleta: comparar índices basta para hallar el cambio
+                bbox = ImageChops.difference(previous, frame).getbbox() or (0, 0, 1, 1)
+                offset = bbox[:2]
+                delta = frame.crop(bbox)
+            else:
+                delta = frame
+            fp.write(b''.join(GifImagePlugin.getdata(delta, offset, **params)))
+            previous = frame if params['disposal'] in (0, 1) else None
+        fp.write(b';')
+
+    def _process_for_format(self, img, output_format, resize=None, background=None):
         """
         Ajusta modo de color/transparencia según formato de salida.
+        El redimensionado se aplica antes, sobre menos píxeles. Si la imagen
+        ya está en el modo que necesita el formato se devuelve sin copiarla.
         """
+        img = self._apply_resize(img, resize)
+
         if output_format == 'JPG':
-            # Si hay canal alfa, compón sobre blanco
+            # Si hay canal alfa, compón sobre el fondo
             if img.mode in ('RGBA','LA') or (img.mode=='P' and 'transparency' in img.info):
-                img = img.convert('RGBA')
-                fondo = Image.new('RGB', img.size, (255,255,255))
-                fondo.paste(img, mask=img.split()[-1])
-                return fondo
-            return img.convert('RGB')
+                return self._flatten_alpha(img, background)
+            return img if img.mode == 'RGB' else img.convert('RGB')
 
         if output_format in ('PNG','WEBP'):
             # Asegurar modo que soporte alfa
@@ -137,69 +1343,615 @@ class ImageConverter:
         if output_format in ('BMP','TIFF'):
             # No soportan alfa
             if 'A' in img.mode:
-                fondo = Image.new('RGB', img.size, (255,255,255))
-                img = img.convert('RGBA')
-                fondo.paste(img, mask=img.split()[-1])
-                return fondo
-            return img.convert('RGB')
+                return self._flatten_alpha(img, background)
+            return img if img.mode == 'RGB' else img.convert('RGB')
 
         if output_format == 'ICO':
-            return img.convert('RGBA')
+            return img if img.mode == 'RGBA' else img.convert('RGBA')
 
         return img
 
+    def _flatten_alpha(self, img, background=None):
+        """
+        Compone img sobre background (BACKGROUND_COLOR por defecto) y
+        devuelve RGB con una sola reserva: el lienzo. RGBA y LA se pegan
+        directamente usando la propia imagen como máscara (Pillow toma su
+        canal alfa), sin convertirla ni separar canales. Los demás modos se
+        pasan a RGBA; si son grandes, por franjas, para no tener una copia
+        RGBA completa en memoria.
+        """
+        # Desde JSON el color llega como lista
+        color = tuple(background) if isinstance(background, list) else background
+        fondo = Image.new('RGB', img.size, color or self.BACKGROUND_COLOR)
+        if img.mode in ('RGBA', 'LA'):
+            fondo.paste(img, mask=img)
+            return fondo
+        if img.width * img.height < self.LARGE_IMAGE_PIXELS:
+            img = img.convert('RGBA')
+            fondo.paste(img, mask=img)
+            return fondo
+        rows = max(1, self.STRIP_BYTES // (img.width * 4))
+        for top in range(0, img.height, rows):
+            box = (0, top, img.width, min(img.height, top + rows))
+            strip = img.crop(box).convert('RGBA')
+            # Una máscara RGBA usa su canal alfa: no hace falta separarlo
+            fondo.paste(strip, box, strip)
+        return fondo
+
+    def _output_path_for(self, path, output_dir, output_format):
+        name = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(output_dir, f"{name}.{output_format.lower()}")
+
+    def _convert_job(self, job, control=None):
+        """
+        Ejecuta un trabajo del lote (dict serializable) y devuelve un dict con
+        success, msg, seconds y, en modo incremental, el estado de la caché.
+        Con control espera mientras el lote esté en pausa y, si se canceló,
+        no convierte nada y devuelve cancelled=True.
+        """
+        if control is not None and not control.wait():
+            return self._cancelled_result()
+        start = time.perf_counter()
+        path, out, output_format = job['input'], job['output'], job['format']
+        if job.get('score_file'):
+            # En un proceso hijo, las puntuaciones guardadas por ejecuciones anteriores
+            self._ssim_cache.load(job['score_file'])
+        result = {}
+        signature = None
+        if job.get('incremental'):
+            try:
+                fresh, signature = check_entry(job.get('manifest_entry'), path, out,
+                                               job['settings_key'], job.get('verify_hash'))
+            except OSError:
+                fresh = False
+            result['cache'] = 'hit' if fresh else 'miss'
+            if fresh:
+                if signature.get('sha256'):
+                    # Contenido idéntico con otra fecha: actualizar la firma
+                    result['manifest_entry'] = dict(job['manifest_entry'], **signature)
+                result.update(success=True, msg="Sin cambios (omitido)",
+                              seconds=time.perf_counter() - start)
+                return result
+
+        if job.get('resume_entry'):
+            try:
+                done, source_signature = check_entry(job['resume_entry'], path, out, job['settings_key'])
+            except OSError:
+                done = False
+            if done:
+                # Terminado antes de la interrupción: solo falta el manifiesto, que no llegó a guardarse
+                if signature is not None:
+                    result['manifest_entry'] = dict(job['resume_entry'], **signature)
+                    result['manifest_entry'].pop('source', None)
+                result.update(success=True, msg="Ya convertido (reanudado)", resumed=True,
+                              seconds=time.perf_counter() - start)
+                return result
+
+        # La firma del origen se toma antes de convertir por si cambia mientras tanto
+        journal_signature = signature
+        if job.get('journal') and journal_signature is None:
+            try:
+                st = os.stat(path)
+                journal_signature = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+            except OSError:
+                pass
+
+        quality = job.get('quality')
+        if job.get('effort_cap'):
+            quality = dict(quality or {}, effort_cap=job['effort_cap'])
+        metrics = {}
+        success, msg = self.convert_image(path, out, output_format, quality,
+                                          resize=job.get('resize'), metrics=metrics)
+        result['metrics'] = metrics
+        if success and signature is not None:
+            try:
+                result['manifest_entry'] = make_entry(signature, path, out, job['settings_key'],
+                                                      job.get('verify_hash'))
+            except OSError:
+                pass
+        if success and job.get('journal') and journal_signature is not None:
+            try:
+                result['journal_entry'] = dict(make_entry(journal_signature, path, out, job['settings_key']),
+                                               source=os.path.abspath(path))
+            except OSError:
+                pass
+        result.update(success=success, msg=msg, seconds=time.perf_counter() - start)
+        return result
+
+    def _cancelled_result(self):
+        return dict(success=False, msg="Cancelado", seconds=0.0, cancelled=True)
+
     def batch_convert(self, files, output_dir, output_format,
                       use_threading=True, max_threads=4, progress_callback=None,
-                      quality_settings=None):
+                      quality_settings=None, use_processes=False,
+                      max_processes=0, chunk_size=4, incremental=False,
+                      manifest_file=None, verify_hash=False, deduplicate=False,
+                      dedup_links=True, resize=None, worker_memory_mb=0,
+                      memory_budget_mb=0, control=None, resume=False, journal=True,
+                      effort_budget=0):
         """
         Convierte múltiples archivos, retorno lista de tuplas (success,msg,path).
+        Con use_processes=True el lote se reparte en un pool de procesos
+        (max_processes=0 usa todos los núcleos) en bloques de chunk_size.
+        Con incremental=True se omiten las salidas que siguen al día según el
+        manifiesto (por defecto output_dir/.pix_manifest.json); verify_hash
+        compara además el contenido cuando solo cambió la fecha.
+        Con deduplicate=True las entradas con contenido idéntico se convierten
+        una sola vez y las copias se crean como enlaces duros (o copias si
+        dedup_links=False o el sistema de archivos no los admite).
+        resize redimensiona cada imagen (ver convert_image).
+        Con worker_memory_mb (por hilo o proceso) o memory_budget_mb (total)
+        los trabajos se admiten según la memoria estimada a partir de la
+        cabecera: nunca se supera el presupuesto, las imágenes grandes se
+        convierten menos a la vez y las pequeñas rellenan la memoria libre.
+        El presupuesto total, si se indica, tiene prioridad (0 = sin límite).
+        control (BatchControl) permite pausar, reanudar o cancelar el lote
+        desde otro hilo: al cancelar se dejan de descubrir archivos, los
+        trabajos en cola se descartan ("Cancelado") y los que están en curso
+        terminan; se devuelven los resultados parciales con cancelled=True.
+        Con journal=True cada salida terminada se anota en un diario
+        (output_dir/.pix_journal.jsonl) que se borra al completar el lote;
+        tras un cierre inesperado o una cancelación, resume=True omite lo ya
+        terminado y vuelve a convertir solo lo que quedaba o estaba en curso.
+        Las salidas se escriben en un temporal y se renombran de forma atómica.
+        Con quality_settings['target_ssim'] las puntuaciones de la búsqueda se
+        guardan en output_dir (.pix_ssim_scores.json) y se reutilizan al
+        volver a convertir los mismos orígenes con los mismos ajustes.
+        Con quality_settings['effort'] = 'auto', effort_budget (s) es el
+        tiempo objetivo del lote: si la proyección lo supera, los archivos
+        siguientes se codifican con menos esfuerzo (0 = sin presupuesto).
+        La lista devuelta es un BatchResults con rutas de salida, tiempos por
+        archivo y métricas por etapa (results.metrics, ver BatchMetrics).
         """
         os.makedirs(output_dir, exist_ok=True)
-        total = len(files)
-        completed = 0
-        results = []
+        jobs = [(path, self._output_path_for(path, output_dir, output_format)) for path in files]
+        if incremental and not manifest_file:
+            manifest_file = os.path.join(output_dir, ConversionManifest.FILE_NAME)
+        journal_file = os.path.join(output_dir, BatchJournal.FILE_NAME) if journal or resume else None
+        score_file = self._score_file(output_dir, quality_settings)
+        return self._run_batch(jobs, len(jobs), output_format, quality_settings,
+                               progress_callback, use_threading=use_threading,
+                               max_threads=max_threads, use_processes=use_processes,
+                               max_processes=max_processes, chunk_size=chunk_size,
+                               manifest_file=manifest_file if incremental else None,
+                               verify_hash=verify_hash, deduplicate=deduplicate,
+                               dedup_links=dedup_links, resize=resize,
+                               worker_memory_mb=worker_memory_mb,
+                               memory_budget_mb=memory_budget_mb, control=control,
+                               journal_file=journal_file, resume=resume,
+                               effort_budget=effort_budget, score_file=score_file)
+
+    def iter_image_files(self, roots, input_formats=None, sort=False, exclude=()):
+        """
+        Recorre las raíces de forma perezosa con os.scandir y genera tuplas
+        (ruta, directorio_relativo) de las imágenes soportadas.
+        Las raíces que son archivos se devuelven con directorio relativo vacío.
+        Las entradas salen en el orden de os.scandir, sin leer antes el
+        directorio entero; con sort=True el recorrido es alfabético (cada
+        directorio se lee y ordena completo antes de generar nada).
+        exclude son rutas (directorios o archivos) que no se recorren, p. ej.
+        el directorio de salida cuando está dentro de una raíz.
+        """
+        formats = set(input_formats or self.SUPPORTED_FORMATS)
+        excluded = {os.path.realpath(path) for path in exclude if path}
+        excluded_names = {os.path.basename(path) for path in excluded}
+        for root in roots:
+            if not os.path.isdir(root):
+                if self.get_format_from_extension(root) in formats:
+                    yield root, ''
+                continue
+            pending = [root]
+            while pending:
+                current = pending.pop()
+                try:
+                    it = os.scandir(current)
+                except OSError:
+                    continue
+                subdirs = []
+                with it:
+                    entries = sorted(it, key=lambda e: e.name) if sort else it
+                    for entry in entries:
+                        try:
+                            if excluded and entry.name in excluded_names and \
+                                    os.path.realpath(entry.path) in excluded:
+                                continue
+                            if entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry.path)
+                            elif entry.is_file() and self.get_format_from_extension(entry.name) in formats:
+                                yield entry.path, os.path.relpath(current, root)
+                        except OSError:
+                            continue
+                # En profundidad, en el orden en que se encontraron los subdirectorios
+                pending.extend(reversed(subdirs))
+
+    def convert_tree(self, roots, output_dir, output_format, input_formats=None,
+                     use_threading=True, max_threads=4, progress_callback=None,
+                     quality_settings=None, use_processes=False,
+                     max_processes=0, chunk_size=4, incremental=False,
+                     manifest_file=None, verify_hash=False, deduplicate=False,
+                     dedup_links=True, resize=None, worker_memory_mb=0,
+                     memory_budget_mb=0, control=None, resume=False, journal=True,
+                     effort_budget=0, sort=False):
+        """
+        Convierte árboles de directorios replicando la estructura relativa en
+        output_dir (None = junto a cada original). La conversión empieza
+        mientras el descubrimiento de archivos sigue en marcha; sort=True
+        recorre en orden alfabético (ver iter_image_files). Si output_dir está
+        dentro de una raíz no se recorre, para no convertir salidas anteriores.
+        """
+        created_dirs = set()
+
+        def jobs():
+            exclude = (output_dir, manifest_file, journal_file)
+            for path, rel_dir in self.iter_image_files(roots, input_formats, sort, exclude):
+                if output_dir:
+                    target_dir = os.path.normpath(os.path.join(output_dir, rel_dir))
+                else:
+                    target_dir = os.path.dirname(path)
+                if target_dir not in created_dirs:
+                    os.makedirs(target_dir, exist_ok=True)
+                    created_dirs.add(target_dir)
+                yield path, self._output_path_for(path, target_dir, output_format)
+
+        base_dir = output_dir or next((r for r in roots if os.path.isdir(r)), '.')
+        if incremental and not manifest_file:
+            os.makedirs(base_dir, exist_ok=True)
+            manifest_file = os.path.join(base_dir, ConversionManifest.FILE_NAME)
+        journal_file = None
+        if journal or resume:
+            os.makedirs(base_dir, exist_ok=True)
+            journal_file = os.path.join(base_dir, BatchJournal.FILE_NAME)
+        score_file = self._score_file(base_dir, quality_settings)
+        return self._run_batch(jobs(), None, output_format, quality_settings,
+                               progress_callback, use_threading=use_threading,
+                               max_threads=max_threads, use_processes=use_processes,
+                               max_processes=max_processes, chunk_size=chunk_size,
+                               manifest_file=manifest_file if incremental else None,
+                               verify_hash=verify_hash, deduplicate=deduplicate,
+                               dedup_links=dedup_links, resize=resize,
+                               worker_memory_mb=worker_memory_mb,
+                               memory_budget_mb=memory_budget_mb, control=control,
+                               journal_file=journal_file, resume=resume,
+                               effort_budget=effort_budget, score_file=score_file)
+
+    def _run_batch(self, jobs, total, output_format, quality_settings,
+                   progress_callback, use_threading=True, max_threads=4,
+                   use_processes=False, max_processes=0, chunk_size=4,
+                   manifest_file=None, verify_hash=False, deduplicate=False,
+                   dedup_links=True, resize=None, worker_memory_mb=0,
+                   memory_budget_mb=0, control=None, journal_file=None, resume=False,
+                   effort_budget=0, score_file=None):
+        """
+        Ejecuta trabajos (entrada, salida) con el motor elegido. jobs puede ser
+        un iterador (total=None); se consume a medida que hay hueco en el pool.
+        score_file es el archivo de puntuaciones SSIM (ver ScoreCache).
+        """
+        start = time.perf_counter()
+        # Con deduplicación el número de conversiones reales se conoce al final
+        progress = _BatchProgress(None if deduplicate else total, progress_callback)
+        manifest = ConversionManifest(manifest_file) if manifest_file else None
+        journal = BatchJournal(journal_file, resume) if journal_file else None
+        if score_file:
+            self._ssim_cache.load(score_file)
+        effective = dict(quality_settings or self.QUALITY_SETTINGS.get(output_format, {}))
+        if resize:
+            effective['resize'] = resize
+        key = settings_key(output_format, effective)
+        files = []
+        outputs = []
+        duplicate_of = []   # índice del archivo original de cada duplicado (o None)
+        job_files = []      # índice de archivo de cada trabajo enviado
+        by_size = {}        # tamaño -> índices de los originales con ese tamaño
+        digests = {}        # (índice, bytes leídos) -> SHA-256, solo si coinciden los tamaños
+        parallel = total is None or total > 1
+        workers = 1
+        if use_processes and parallel:
+            workers = max(1, max_processes or os.cpu_count() or 1)
+        elif use_threading and parallel:
+            workers = max(1, int(max_threads))
+        budget = (memory_budget_mb or worker_memory_mb * workers) * 1024 * 1024
+        scheduler = MemoryScheduler(budget, workers) if budget and workers > 1 else None
+        effort = _EffortBudget(effort_budget, workers) if effort_budget else None
+
+        jobs = iter(jobs)
+        # Directorios de salida ya limpiados de temporales de lotes interrumpidos
+        swept_dirs = set()
+
+        def discovered():
+            # En pausa no se descubren ni envían más trabajos
+            while control is None or control.wait():
+                try:
+                    path, out = next(jobs)
+                except StopIteration:
+                    break
+                index = len(files)
+                files.append(path)
+                outputs.append(out)
+                out_dir = os.path.dirname(os.path.abspath(out))
+                if out_dir not in swept_dirs:
+                    swept_dirs.add(out_dir)
+                    self._remove_stale_temps(out_dir)
+                if deduplicate:
+                    original = find_duplicate(index)
+                    if original is not None:
+                        duplicate_of.append(original)
+                        continue
+                duplicate_of.append(None)
+                job_files.append(index)
+                progress.discovered(len(job_files))
+                job = {'input': path, 'output': out, 'format': output_format,
+                       'quality': quality_settings, 'resize': resize}
+                if manifest is not None:
+                    job.update(incremental=True, settings_key=key, verify_hash=verify_hash,
+                               manifest_entry=manifest.get(path))
+                if journal is not None:
+                    job.update(journal=True, settings_key=key)
+                    if resume:
+                        job['resume_entry'] = journal.get(path)
+                if effort is not None:
+                    job['effort_cap'] = effort.cap(total or len(job_files))
+                if score_file:
+                    job['score_file'] = score_file
+                if scheduler is not None:
+                    job['memory'] = estimate_image_memory(path, output_format, quality_settings)
+                yield job
+            progress.discovery_done()
+
+        def digest(index, limit=None):
+            if (index, limit) not in digests:
+                digests[index, limit] = hash_file(files[index], limit=limit)
+            return digests[index, limit]
+
+        def find_duplicate(index):
+            # Solo se lee un archivo aquí si otro tiene el mismo tamaño: primero
+            # su comienzo y, si coincide, el contenido completo
+            try:
+                size = os.path.getsize(files[index])
+                for candidate in by_size.get(size, ()):
+                    if (digest(candidate, self.DEDUP_HEAD_BYTES) == digest(index, self.DEDUP_HEAD_BYTES)
+                            and digest(candidate) == digest(index)):
+                        return candidate
+            except OSError:
+                return None
+            by_size.setdefault(size, []).append(index)
+            return None
+
+        def record_done(result):
+            # Se anota en cuanto termina cada archivo, no al final del lote
+            if journal is not None and 'journal_entry' in result:
+                journal.record(result['journal_entry'])
+            if effort is not None and 'metrics' in result:
+                effort.done(result['seconds'])
+
+        def record_future(future):
+            if not future.cancelled() and future.exception() is None:
+                record_done(future.result())
+
+        # Pares (índice, trabajo); con presupuesto de memoria llegan reordenados
+        tasks = enumerate(discovered())
+        if scheduler is not None:
+            tasks = scheduler.schedule(tasks)
 
-        if use_threading and total > 1:
-            q = queue.Queue()
-            lock = threading.Lock()
-
-            def worker(path):
-                nonlocal completed
-                name = os.path.splitext(os.path.basename(path))[0]
-                out = os.path.join(output_dir, f"{name}.{output_format.lower()}")
-                success, msg = self.convert_image(path, out, output_format, quality_settings)
-                q.put((success, msg, path))
-                with lock:
-                    completed += 1
-                    if progress_callback:
-                        progress_callback(int(completed/total*100))
-
-            threads = []
-            idx = 0
-            while idx < total or threads:
-                while idx < total and len(threads) < max_threads:
-                    t = threading.Thread(target=worker, args=(files[idx],))
-                    t.start()
-                    threads.append(t)
-                    idx += 1
-                threads = [t for t in threads if t.is_alive()]
-                time.sleep(0.01)
-
-            for t in threads: t.join()
-            while not q.empty():
-                results.append(q.get())
+        if use_processes and parallel:
+            converted = self._run_processes(tasks, workers, chunk_size, progress, scheduler,
+                                            control, record_done)
+
+        elif use_threading and parallel:
+            pool = self._get_pool(max_threads)
+            finished = {}
+            window = deque()
+            for seq, job in tasks:
+                future = pool.submit(self._convert_job, job, control)
+                future.add_done_callback(progress.advance)
+                if journal is not None or effort is not None:
+                    future.add_done_callback(record_future)
+                if scheduler is not None:
+                    future.add_done_callback(lambda _, seq=seq: scheduler.release(seq))
+                window.append((seq, future))
+                # Recoger los resultados ya terminados sin esperar a los demás
+                while window and window[0][1].done():
+                    done_seq, done = window.popleft()
+                    finished[done_seq] = self._future_result(done)
+            if control is not None and control.cancelled:
+                pool.cancel_pending()
+            for seq, future in window:
+                finished[seq] = self._future_result(future)
+            converted = [finished[i] for i in range(len(finished))]
 
         else:
-            for i,path in enumerate(files):
-                name = os.path.splitext(os.path.basename(path))[0]
-                out = os.path.join(output_dir, f"{name}.{output_format.lower()}")
-                success, msg = self.convert_image(path, out, output_format, quality_settings)
-                results.append((success, msg, path))
-                if progress_callback:
-                    progress_callback(int((i+1)/total*100))
+            converted = []
+            for _, job in tasks:
+                converted.append(self._convert_job(job, control))
+                record_done(converted[-1])
+                progress.advance()
+
+        if control is not None and control.cancelled and total is not None:
+            # Con una lista conocida también se devuelven los archivos que no llegaron a enviarse
+            for path, out in jobs:
+                files.append(path)
+                outputs.append(out)
+                duplicate_of.append(None)
+        by_file = [None] * len(files)
+        for index, r in zip(job_files, converted):
+            by_file[index] = r
+        for index, r in enumerate(by_file):
+            if r is None and duplicate_of[index] is None:
+                by_file[index] = self._cancelled_result()
+        if manifest is not None:
+            for index, r in zip(job_files, converted):
+                if 'manifest_entry' in r:
+                    manifest.update(files[index], r['manifest_entry'])
+                elif not r['success'] and not r.get('cancelled'):
+                    manifest.remove(files[index])
+            manifest.save()
+        if score_file:
+            self._ssim_cache.save(score_file)
 
+        results = BatchResults()
+        if deduplicate:
+            results.duplicate_of = duplicate_of
+            for index, original in enumerate(duplicate_of):
+                if original is None:
+                    continue
+                by_file[index] = self._materialize_duplicate(
+                    by_file[original], files[original], outputs[original],
+                    files[index], outputs[index], output_format, dedup_links)
+                results.duplicates += 1
+                results.dedup_saved_seconds += by_file[original]['seconds']
+                try:
+                    results.dedup_saved_bytes += os.path.getsize(files[index])
+                except OSError:
+                    pass
+
+        self._history.flush()
+        results.extend((r['success'], r['msg'], path) for r, path in zip(by_file, files))
+        results.outputs = outputs
+        results.timings = [r['seconds'] for r in by_file]
+        results.file_metrics = [r.get('metrics') for r in by_file]
+        results.metrics = BatchMetrics()
+        for r in converted:
+            results.metrics.add(r.get('metrics'))
+        results.elapsed = time.perf_counter() - start
+        if control is not None and control.cancelled:
+            results.cancelled = True
+            results.dropped = sum(1 for r in by_file if r.get('cancelled'))
+        if journal is not None:
+            journal.finish(completed=not results.cancelled)
+            results.resumed = sum(1 for r in by_file if r.get('resumed'))
+        if manifest is not None:
+            results.cached = [r.get('cache') == 'hit' for r in by_file]
+            results.cache_hits = sum(results.cached)
+            results.cache_misses = len(converted) - results.cache_hits
         return results
 
+    def _materialize_duplicate(self, original_result, original_path, original_out,
+                               path, out, output_format, use_links):
+        """Crea la salida de un duplicado a partir de la del original"""
+        start = time.perf_counter()
+        if original_result.get('cancelled'):
+            return self._cancelled_result()
+        if not original_result['success']:
+            return dict(success=False, msg=original_result['msg'], seconds=0.0)
+        name = os.path.basename(original_path)
+        try:
+            if os.path.abspath(out) != os.path.abspath(original_out):
+                if os.path.lexists(out):
+                    os.remove(out)
+                try:
+                    if not use_links:
+                        raise OSError
+                    os.link(original_out, out)
+                    msg = f"Duplicado de {name} (enlace)"
+                except OSError:
+                    tmp_path = self._temp_path(out)
+                    try:
+                        shutil.copyfile(original_out, tmp_path)
+                        os.replace(tmp_path, out)
+                    except OSError:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                        raise
+                    msg = f"Duplicado de {name} (copia)"
+            else:
+                msg = f"Duplicado de {name}"
+            success = True
+        except OSError as e:
+            success, msg = False, f"Error: {e}"
+        self._add_to_history(path, out, self.get_format_from_extension(path), output_format, success)
+        return dict(success=success, msg=msg, seconds=time.perf_counter() - start)
+
+    def _future_result(self, future):
+        """Resultado de un trabajo del pool de hilos; los descartados cuentan como cancelados"""
+        if future.cancelled():
+            return self._cancelled_result()
+        return future.result()
+
+    def _run_processes(self, tasks, max_processes, chunk_size, progress, scheduler=None,
+                       control=None, on_result=None):
+        """
+        Reparte el lote (pares (índice, trabajo)) entre procesos para que
+        Pillow use todos los núcleos. El historial se genera en cada proceso
+        hijo y se consolida aquí. Con scheduler cada resultado libera su memoria.
+        Con control los hijos reciben sus eventos de pausa y cancelación.
+        on_result(resultado) se llama en cuanto llega cada resultado.
+        """
+        workers = max(1, max_processes or os.cpu_count() or 1)
+        converted = {}
+        if scheduler is not None:
+            # Un bloque no se envía hasta estar completo: con bloques de varios
+            # trabajos el pool podría retener memoria que nadie libera
+            chunk_size = 1
+
+        events = control.shared_events() if control is not None else None
+        with multiprocessing.Pool(processes=workers, initializer=_init_process_worker,
+                                  initargs=(events,)) as pool:
+            for idx, result, entries in pool.imap_unordered(
+                    _process_convert, tasks, chunksize=max(1, chunk_size)):
+                if scheduler is not None:
+                    scheduler.release(idx)
+                converted[idx] = result
+                self._history.extend(entries)
+                self._ssim_cache.merge(result.pop('ssim_scores', ()))
+                if on_result is not None:
+                    on_result(result)
+                # Los hooks viven en este proceso, no en los hijos
+                if self._metrics_hooks and result.get('metrics'):
+                    self._emit_metrics(result['metrics'])
+                progress.advance()
+
+        return [converted[i] for i in range(len(converted))]
+
+
+# ——————————————————————————————
+# Motor de procesos (funciones a nivel de módulo para poder serializarlas)
+# ——————————————————————————————
+
+_process_converter = None
+_process_control = None
+
+def _pid_alive(pid):
+    """True si existe un proceso con ese pid; en caso de duda, True"""
+    if os.name == 'nt':
+        # os.kill(pid, 0) terminaría el proceso en Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return kernel32.GetLastError() == 5  # Acceso denegado: existe
+        try:
+            code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+def _init_process_worker(events=None):
+    global _process_converter, _process_control
+    # Ctrl+C llega a todo el grupo de procesos: decide el padre (cancelando
+    # con control o terminando el pool), un hijo interrumpido dejaría su trabajo sin resultado
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Sin archivo de historial: el proceso padre es quien lo guarda
+    _process_converter = ImageConverter(history_file=None, max_history_items=None)
+    _process_control = BatchControl(*events) if events else None
+    # Las puntuaciones SSIM nuevas vuelven al padre con cada resultado
+    _process_converter._ssim_cache = quality_metric.ScoreCache(record_updates=True)
+
+def _process_convert(task):
+    idx, job = task
+    result = _process_converter._convert_job(job, _process_control)
+    entries = _process_converter._history.drain()
+    scores = _process_converter._ssim_cache.drain_updates()
+    if scores:
+        result['ssim_scores'] = scores
+    return idx, result, entries
+
 
 # ——————————————————————————————
 # Wrappers para compatibilidad con ui.py
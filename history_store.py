@@ -0,0 +1,119 @@
+# history_store.py - Almacenamiento del historial de conversiones (JSONL de solo anexado)
+
+import os
+import json
+import time
+import atexit
+import threading
+from collections import deque
+
+class HistoryStore:
+    """
+    Historial de conversiones seguro entre hilos.
+    Las entradas se acumulan en memoria y se anexan al archivo JSONL por lotes
+    (cada flush_every entradas o flush_interval segundos). Cuando el archivo
+    supera el doble de max_items se compacta con una reescritura atómica.
+    Con path=None el historial solo vive en memoria.
+    """
+
+    def __init__(self, path="conversion_history.jsonl", max_items=100,
+                 flush_every=50, flush_interval=2.0, legacy_path=None):
+        self.path = path
+        self.max_items = max_items
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._entries = deque(maxlen=max_items or None)
+        self._pending = []
+        self._file_lines = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self._load(legacy_path)
+        if self.path:
+            atexit.register(self.flush)
+
+    def _load(self, legacy_path):
+        if not self.path:
+            return
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        self._file_lines += 1
+                        try:
+                            self._entries.append(json.loads(line))
+                        except ValueError:
+                            # Línea truncada por un cierre inesperado
+                            continue
+            elif legacy_path and os.path.exists(legacy_path):
+                # Migrar el historial antiguo (lista JSON completa)
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    self._entries.extend(json.load(f))
+                self._compact()
+        except Exception:
+            self._entries.clear()
+
+    @property
+    def entries(self):
+        """Copia de las entradas más recientes (las antiguas primero)"""
+        with self._lock:
+            return list(self._entries)
+
+    def append(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            if not self.path:
+                return
+            self._pending.append(entry)
+            if (len(self._pending) >= self.flush_every or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+
+    def extend(self, entries):
+        with self._lock:
+            for entry in entries:
+                self.append(entry)
+
+    def flush(self):
+        """Anexa las entradas pendientes al archivo"""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self.path or not self._pending:
+                return
+            try:
+                lines = ''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in self._pending)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                self._file_lines += len(self._pending)
+                self._pending.clear()
+                if self.max_items and self._file_lines > 2 * self.max_items:
+                    self._compact()
+            except Exception:
+                pass
+
+    def _compact(self):
+        """Reescribe el archivo con las últimas max_items entradas de forma atómica"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self._entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+        self._file_lines = len(self._entries)
+        self._pending.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            if self.path:
+                try:
+                    self._compact()
+                except Exception:
+                    pass
+
+    def drain(self):
+        """Devuelve y elimina todas las entradas (usado por los procesos hijo)"""
+        with self._lock:
+            entries = list(self._entries)
+            self._entries.clear()
+            self._pending.clear()
+            return entries
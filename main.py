@@ -4,6 +4,7 @@ from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QIcon
 import sys
 import os
+import multiprocessing
 
 def resource_path(relative_path):
     """
@@ -18,6 +19,8 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 if __name__ == "__main__":
+    # Necesario para el pool de procesos en el ejecutable de PyInstaller
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     
     # Configurar icono de la aplicación para la taskbar (Windows)
@@ -0,0 +1,123 @@
+# memory_budget.py - Estimación de memoria por imagen y admisión de trabajos por presupuesto
+
+import threading
+from PIL import Image
+
+# Bytes por píxel de cada modo en memoria (Pillow guarda RGB, LA, CMYK... en 4 bytes)
+_MODE_BYTES = {'1': 1, 'L': 1, 'P': 1, 'I;16': 2, 'I;16B': 2, 'I;16L': 2, 'I;16N': 2}
+
+def bytes_per_pixel(mode):
+    return _MODE_BYTES.get(mode, 4)
+
+def converts_mode(mode, output_format):
+    """
+    True si ImageConverter._process_for_format crea una copia de tamaño
+    completo (4 bytes por píxel) para pasar una imagen en mode a output_format:
+    RGB -> RGBA para PNG/WEBP, CMYK/L/paletas -> RGB o la composición del alfa.
+    """
+    if output_format in ('PNG', 'WEBP'):
+        return 'A' not in mode
+    if output_format in ('JPG', 'BMP', 'TIFF'):
+        return mode != 'RGB'
+    if output_format == 'ICO':
+        return mode != 'RGBA'
+    return False
+
+def encoder_bytes_per_pixel(output_format, quality_settings=None):
+    """
+    Memoria de trabajo del codificador por píxel (medida con Pillow 12):
+    libwebp copia la imagen a ARGB/YUV y sin pérdida guarda varias versiones;
+    JPEG con optimize/progressive reserva la salida completa. PNG, TIFF, BMP
+    y GIF codifican por filas.
+    """
+    if output_format == 'WEBP':
+        return 22 if (quality_settings or {}).get('lossless') else 6
+    return 3 if output_format == 'JPG' else 0
+
+def estimate_image_memory(path, output_format=None, quality_settings=None):
+    """
+    Memoria (bytes) que necesita convertir path: imagen decodificada, la
+    copia que crea el cambio de modo y la memoria del codificador. Sin
+    output_format se supone una copia de 4 bytes por píxel. Solo lee la
+    cabecera (Image.open es perezoso). Devuelve 0 si no se puede leer.
+    """
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            mode = img.mode
+    except Exception:
+        return 0
+    if output_format is None:
+        return width * height * (bytes_per_pixel(mode) + 4)
+    per_pixel = (bytes_per_pixel(mode) + (4 if converts_mode(mode, output_format) else 0)
+                 + encoder_bytes_per_pixel(output_format, quality_settings))
+    return width * height * per_pixel
+
+class MemoryScheduler:
+    """
+    Admite trabajos contra un presupuesto de memoria (bytes) y un máximo de
+    trabajos simultáneos. Mira los siguientes lookahead trabajos y admite el
+    mayor que quepa en la memoria libre, así las imágenes grandes ocupan el
+    presupuesto y las pequeñas rellenan lo que sobra. Un trabajo adelantado
+    max_skips veces pasa a ser el siguiente obligatorio, para que las
+    imágenes grandes no esperen indefinidamente.
+    """
+
+    def __init__(self, budget, max_running, lookahead=None, max_skips=None):
+        self.budget = max(1, int(budget))
+        self.max_running = max(1, int(max_running))
+        self.lookahead = lookahead or max(8, 4 * self.max_running)
+        self.max_skips = max_skips or self.lookahead
+        self.peak = 0
+        self._used = 0
+        self._admitted = {}
+        self._cond = threading.Condition()
+
+    def schedule(self, tasks):
+        """
+        Reordena tasks (pares (índice, trabajo) con job['memory'] en bytes)
+        y los genera a medida que caben; bloquea mientras no quepa ninguno.
+        Cada trabajo generado debe liberarse con release(índice).
+        """
+        source = iter(tasks)
+        pending = []   # [índice, trabajo, memoria, veces_adelantado]
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < self.lookahead:
+                try:
+                    seq, job = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                # Una imagen mayor que todo el presupuesto se convierte sola
+                pending.append([seq, job, min(job.get('memory') or 0, self.budget), 0])
+            if not pending:
+                return
+            with self._cond:
+                self._cond.wait_for(lambda: self._choose(pending) is not None)
+                position = self._choose(pending)
+                for skipped in pending[:position]:
+                    skipped[3] += 1
+                seq, job, memory, _ = pending.pop(position)
+                self._admitted[seq] = memory
+                self._used += memory
+                self.peak = max(self.peak, self._used)
+            yield seq, job
+
+    def _choose(self, pending):
+        """Posición en pending del trabajo a admitir ahora, o None"""
+        if len(self._admitted) >= self.max_running:
+            return None
+        free = self.budget - self._used
+        if pending[0][3] >= self.max_skips:
+            return 0 if pending[0][2] <= free else None
+        best = None
+        for position, (_, _, memory, _) in enumerate(pending):
+            if memory <= free and (best is None or memory > pending[best][2]):
+                best = position
+        return best
+
+    def release(self, seq):
+        with self._cond:
+            self._used -= self._admitted.pop(seq, 0)
+            self._cond.notify_all()
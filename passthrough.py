@@ -0,0 +1,136 @@
+# passthrough.py - Operaciones sin recodificar: calidad de un JPEG y limpieza de metadatos por bytes
+
+import shutil
+import struct
+
+# Tabla de cuantización de luminancia de referencia (IJG), en orden natural
+_JPEG_LUMA_TABLE = (
+    16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99,
+)
+
+# Segmentos JPEG que se conservan al quitar metadatos: JFIF (APP0), perfil
+# ICC y MPF (APP2) y Adobe (APP14, indica la transformación de color)
+_JPEG_KEEP_APP = (0xE0, 0xE2, 0xEE)
+# Fragmentos PNG de metadatos que no afectan a los píxeles ni a su color
+_PNG_METADATA_CHUNKS = (b'tEXt', b'zTXt', b'iTXt', b'eXIf', b'tIME')
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def _scaled_table(quality):
+    scale = 5000 // quality if quality < 50 else 200 - 2 * quality
+    return [min(255, max(1, (v * scale + 50) // 100)) for v in _JPEG_LUMA_TABLE]
+
+def estimate_jpeg_quality(img):
+    """
+    Calidad (1-100) equivalente a la tabla de luminancia de un JPEG abierto
+    (sin decodificarlo), comparándola con las tablas IJG escaladas. None si
+    no hay tablas.
+    """
+    tables = getattr(img, 'quantization', None)
+    if not tables or 0 not in tables:
+        return None
+    table = list(tables[0])
+    return min(range(1, 101),
+               key=lambda q: sum(abs(a - b) for a, b in zip(_scaled_table(q), table)))
+
+def strip_jpeg_metadata(src, dst):
+    """
+    Copia el JPEG src en dst sin EXIF/XMP (APP1), IPTC (APP13), comentarios
+    ni el resto de segmentos APP salvo los de _JPEG_KEEP_APP. Los datos
+    comprimidos (desde SOS) se copian tal cual: sin pérdida ni decodificación.
+    """
+    if src.read(2) != b'\xff\xd8':
+        raise ValueError("No es un JPEG")
+    dst.write(b'\xff\xd8')
+    while True:
+        byte = src.read(1)
+        if not byte:
+            return
+        if byte != b'\xff':
+            raise ValueError("Marcador JPEG no válido")
+        marker = src.read(1)
+        while marker == b'\xff':
+            # Bytes de relleno entre marcadores
+            marker = src.read(1)
+        code = marker[0] if marker else 0xD9
+        if code == 0xDA:
+            # Inicio de los datos comprimidos: el resto va sin cambios
+            dst.write(b'\xff\xda')
+            shutil.copyfileobj(src, dst)
+            return
+        if code == 0xD9:
+            dst.write(b'\xff\xd9')
+            return
+        if code == 0x01 or 0xD0 <= code <= 0xD7:
+            dst.write(b'\xff' + marker)
+            continue
+        length_bytes = src.read(2)
+        payload = src.read(struct.unpack('>H', length_bytes)[0] - 2)
+        is_metadata = code == 0xFE or (0xE1 <= code <= 0xEF and code not in _JPEG_KEEP_APP)
+        if not is_metadata:
+            dst.write(b'\xff' + marker + length_bytes + payload)
+
+def strip_png_metadata(src, dst):
+    """Copia el PNG src en dst sin los fragmentos de _PNG_METADATA_CHUNKS (sin decodificar)"""
+    if src.read(8) != _PNG_SIGNATURE:
+        raise ValueError("No es un PNG")
+    dst.write(_PNG_SIGNATURE)
+    while True:
+        header = src.read(8)
+        if len(header) < 8:
+            return
+        length, kind = struct.unpack('>I4s', header)
+        if kind in _PNG_METADATA_CHUNKS:
+            src.seek(length + 4, 1)
+            continue
+        dst.write(header)
+        # Datos y CRC por bloques: los IDAT pueden ser grandes
+        remaining = length + 4
+        while remaining:
+            block = src.read(min(remaining, 1024 * 1024))
+            if not block:
+                raise ValueError("PNG truncado")
+            dst.write(block)
+            remaining -= len(block)
+        if kind == b'IEND':
+            return
+
+def png_zlib_level(fp):
+    """
+    Nivel de compresión (FLEVEL de zlib, 0-3) del primer IDAT del PNG de fp
+    (al principio), o None si no se puede leer. zlib anota 0 para los
+    niveles 0-1, 1 para 2-5, 2 para el 6 (el de Pillow) y 3 para 7-9.
+    """
+    if fp.read(8) != _PNG_SIGNATURE:
+        return None
+    while True:
+        header = fp.read(8)
+        if len(header) < 8:
+            return None
+        length, kind = struct.unpack('>I4s', header)
+        if kind == b'IDAT':
+            data = fp.read(2)
+            return data[1] >> 6 if len(data) == 2 else None
+        if kind == b'IEND':
+            return None
+        fp.seek(length + 4, 1)
+
+def webp_is_lossless(fp):
+    """True si el WEBP de fp (al principio) está codificado sin pérdida (VP8L)"""
+    header = fp.read(12)
+    if header[:4] != b'RIFF' or header[8:12] != b'WEBP':
+        return False
+    while True:
+        chunk = fp.read(8)
+        if len(chunk) < 8:
+            return False
+        kind, size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+        if kind in (b'VP8 ', b'VP8L'):
+            return kind == b'VP8L'
+        if kind == b'ANMF':
+            # Animación: basta con el primer fotograma (sus 16 bytes de cabecera)
+            fp.seek(16, 1)
+            continue
+        fp.seek(size + (size & 1), 1)
@@ -0,0 +1,283 @@
+# pix.py - Conversor por lotes en línea de comandos (sin interfaz gráfica)
+#
+# Uso:
+#   python -m pix convert "fotos/*.png" capturas/ -f webp -o salida --workers 8
+#
+# No importa PyQt6, así que puede ejecutarse en cron, contenedores o servidores.
+import argparse
+import glob
+import json
+import os
+import sys
+import signal
+import multiprocessing
+from PIL import ImageColor
+from batch_control import BatchControl
+from converter import ImageConverter
+from settings_manager import SettingsManager
+
+ENGINES = ('threads', 'processes', 'sequential')
+
+def expand_inputs(patterns, converter):
+    """Expande globs, directorios y archivos a una lista de imágenes soportadas"""
+    files = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = sorted(os.path.join(pattern, name) for name in os.listdir(pattern))
+        elif glob.has_magic(pattern):
+            candidates = sorted(glob.glob(pattern, recursive=True))
+        else:
+            candidates = [pattern]
+        for path in candidates:
+            if os.path.isdir(path) or not converter.get_format_from_extension(path):
+                continue
+            if path not in seen:
+                seen.add(path)
+                files.append(path)
+    return files
+
+def parse_format(value):
+    """Acepta nombres de formato o extensiones (jpg, jpeg, tif, ...)"""
+    value = value.upper()
+    if value in ImageConverter.SUPPORTED_FORMATS:
+        return value
+    for fmt, exts in ImageConverter.SUPPORTED_FORMATS.items():
+        if value.lower() in exts:
+            return fmt
+    raise argparse.ArgumentTypeError(f"formato no soportado: {value}")
+
+def parse_color(value):
+    """Acepta cualquier color de Pillow y lo devuelve como #RRGGBB"""
+    try:
+        return '#%02X%02X%02X' % ImageColor.getrgb(value)[:3]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"color no válido: {value}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="pix", description="Pix - conversor universal de imágenes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert = subparsers.add_parser("convert", help="Convertir imágenes por lotes")
+    convert.add_argument("inputs", nargs="+", help="Archivos, directorios o patrones glob")
+    convert.add_argument("-f", "--format", required=True, type=parse_format,
+                         help="Formato de salida (" + ", ".join(ImageConverter.SUPPORTED_FORMATS) + ")")
+    convert.add_argument("-o", "--output-dir", default=".", help="Directorio de salida (por defecto: actual)")
+    convert.add_argument("-r", "--recursive", action="store_true",
+                         help="Recorrer directorios y replicar su estructura en el directorio de salida")
+    convert.add_argument("--input-format", type=parse_format, action="append",
+                         help="Convertir solo este formato de entrada (repetible, con --recursive)")
+    convert.add_argument("-q", "--quality", type=int, help="Calidad JPG/WEBP (1-100)")
+    convert.add_argument("--png-compression", type=int, choices=range(10), metavar="0-9",
+                         help="Nivel de compresión PNG")
+    convert.add_argument("--background", type=parse_color, metavar="COLOR",
+                         help="Fondo sobre el que se componen las transparencias en JPG/BMP/TIFF "
+                              "(p. ej. '#202020' o 'black'; por defecto blanco)")
+    convert.add_argument("--passthrough", choices=ImageConverter.PASSTHROUGH_MODES,
+                         help="Mismo formato de entrada y salida: copiar sin decodificar si el resultado "
+                              "sería equivalente (auto, por defecto), siempre que no cambien los píxeles "
+                              "(always) o recodificar siempre (off)")
+    convert.add_argument("--passthrough-link", action="store_true",
+                         help="Al no recodificar, crear enlaces duros en lugar de copias")
+    convert.add_argument("--strip-metadata", action="store_true",
+                         help="Al no recodificar, quitar EXIF/XMP/texto de JPG y PNG sin tocar los píxeles")
+    convert.add_argument("--effort", choices=ImageConverter.EFFORT_LEVELS + ('auto',),
+                         help="Esfuerzo del codificador (WEBP method, PNG/JPG optimize); auto lo elige "
+                              "según los píxeles de cada imagen y --time-budget")
+    convert.add_argument("--time-budget", type=int, metavar="S",
+                         help="Con --effort auto, tiempo objetivo del lote en segundos (0 = sin límite)")
+    convert.add_argument("--target-size", type=int, metavar="KB",
+                         help="JPG/WEBP: buscar la mayor calidad (hasta --quality) cuya salida cabe en KB")
+    convert.add_argument("--target-ssim", type=float, metavar="S",
+                         help="JPG/WEBP: buscar la menor calidad cuya salida alcanza esta similitud SSIM "
+                              "(0-1, p. ej. 0.98) con la imagen procesada; requiere numpy")
+    convert.add_argument("--target-iterations", type=int, metavar="N",
+                         help="Codificaciones máximas de la búsqueda de --target-size/--target-ssim (por defecto "
+                              + str(ImageConverter.TARGET_SIZE_ITERATIONS) + ")")
+    convert.add_argument("--max-width", type=int, help="Ancho máximo de salida")
+    convert.add_argument("--max-height", type=int, help="Alto máximo de salida")
+    convert.add_argument("--resize-mode", choices=ImageConverter.RESIZE_MODES, default="fit",
+                         help="fit: caber en el recuadro; fill: cubrirlo; crop: cubrirlo y recortar")
+    convert.add_argument("--resample", choices=list(ImageConverter.RESAMPLE_FILTERS), default="lanczos",
+                         help="Filtro de remuestreo")
+    convert.add_argument("--allow-upscale", action="store_true",
+                         help="Permitir ampliar imágenes menores que el recuadro")
+    convert.add_argument("-e", "--engine", choices=ENGINES, default="threads",
+                         help="Motor de ejecución del lote")
+    convert.add_argument("-w", "--workers", type=int, default=0,
+                         help="Hilos o procesos (0 = valor de la configuración / núcleos)")
+    convert.add_argument("--chunk-size", type=int, help="Archivos por bloque en el motor de procesos")
+    convert.add_argument("--worker-memory", type=int, metavar="MB",
+                         help="Presupuesto de memoria por hilo/proceso; las imágenes mayores se convierten "
+                              "menos a la vez (0 = sin límite)")
+    convert.add_argument("--memory-budget", type=int, metavar="MB",
+                         help="Memoria total del lote; tiene prioridad sobre --worker-memory")
+    convert.add_argument("-i", "--incremental", action="store_true",
+                         help="Omitir archivos cuya salida sigue al día según el manifiesto")
+    convert.add_argument("--verify-hash", action="store_true",
+                         help="En modo incremental, comparar el contenido si solo cambió la fecha")
+    convert.add_argument("--manifest", help="Ruta del manifiesto incremental (por defecto en el directorio de salida)")
+    convert.add_argument("--resume", action="store_true",
+                         help="Reanudar un lote interrumpido: omitir lo que el diario da por terminado")
+    convert.add_argument("--no-journal", action="store_true",
+                         help="No llevar el diario del lote (.pix_journal.jsonl) que permite reanudarlo")
+    convert.add_argument("-d", "--dedup", action="store_true",
+                         help="Convertir una vez las entradas con contenido idéntico y enlazar las copias")
+    convert.add_argument("--dedup-copy", action="store_true",
+                         help="Con --dedup, copiar las salidas duplicadas en lugar de usar enlaces duros")
+    convert.add_argument("--settings", help="Archivo settings.json con los valores por defecto")
+    convert.add_argument("--history", help="Archivo JSONL donde registrar el historial")
+    convert.add_argument("--metrics", action="store_true",
+                         help="Incluir en el resumen los tiempos por etapa y bytes (por lote, par de formatos y archivo)")
+    convert.add_argument("--indent", type=int, help="Sangría del resumen JSON")
+    return parser
+
+def run_convert(args):
+    # Sin --settings se usan los valores por defecto de AppSettings
+    manager = SettingsManager(args.settings or "")
+    settings = manager.settings
+    if args.quality is not None:
+        settings.jpg_quality = settings.webp_quality = args.quality
+    if args.png_compression is not None:
+        settings.png_compression = args.png_compression
+    if args.background:
+        settings.background_color = args.background
+    if args.passthrough:
+        settings.passthrough = args.passthrough
+    if args.passthrough_link:
+        settings.passthrough_links = True
+    if args.strip_metadata:
+        settings.strip_metadata = True
+    if args.target_size is not None:
+        settings.target_size_kb = args.target_size
+    if args.target_ssim is not None:
+        settings.target_ssim = args.target_ssim
+    if args.effort:
+        settings.encoder_effort = args.effort
+    if args.time_budget is not None:
+        settings.effort_time_budget = args.time_budget
+    if args.max_width or args.max_height:
+        settings.resize_enabled = True
+        settings.resize_max_width = args.max_width or 0
+        settings.resize_max_height = args.max_height or 0
+        settings.resize_mode = args.resize_mode
+        settings.resize_resample = args.resample
+        settings.resize_only_shrink = not args.allow_upscale
+
+    converter = ImageConverter(history_file=args.history, max_history_items=settings.max_history_items)
+    if args.recursive:
+        # Los globs se expanden, pero los directorios se recorren en streaming
+        roots = []
+        for pattern in args.inputs:
+            roots.extend(sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern])
+    else:
+        files = expand_inputs(args.inputs, converter)
+        if not files:
+            print(json.dumps({'error': 'No se encontraron imágenes soportadas', 'inputs': args.inputs}),
+                  file=sys.stderr)
+            return 2
+
+    options = manager.get_batch_options()
+    options['use_threading'] = args.engine == 'threads'
+    options['use_processes'] = args.engine == 'processes'
+    if args.workers:
+        options['max_threads'] = options['max_processes'] = args.workers
+    if args.chunk_size:
+        options['chunk_size'] = args.chunk_size
+    if args.worker_memory is not None:
+        options['worker_memory_mb'] = args.worker_memory
+    if args.memory_budget is not None:
+        options['memory_budget_mb'] = args.memory_budget
+    if args.incremental:
+        options['incremental'] = True
+    if args.verify_hash:
+        options['verify_hash'] = True
+    if args.manifest:
+        options['manifest_file'] = args.manifest
+    if args.resume:
+        options['resume'] = True
+    if args.no_journal:
+        options['journal'] = False
+    if args.dedup:
+        options['deduplicate'] = True
+        options['dedup_links'] = not args.dedup_copy
+
+    quality_settings = manager.get_quality_settings(args.format) or None
+    if quality_settings and args.target_iterations:
+        quality_settings['target_iterations'] = args.target_iterations
+    # Ctrl+C cancela el lote: lo que está en curso termina y se imprime el resumen parcial
+    control = BatchControl()
+    options['control'] = control
+    previous_handler = signal.signal(signal.SIGINT, lambda *_: control.cancel())
+    try:
+        results = _run(converter, args, roots if args.recursive else files, quality_settings, options)
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+    converter.close()
+    if args.recursive and not results:
+        print(json.dumps({'error': 'No se encontraron imágenes soportadas', 'inputs': args.inputs}),
+              file=sys.stderr)
+        return 2
+
+    succeeded = sum(1 for success, _, _ in results if success)
+    summary = {
+        'output_format': args.format,
+        'output_dir': os.path.abspath(args.output_dir),
+        'engine': args.engine,
+        'total': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'cancelled': results.cancelled,
+        'resumed': results.resumed,
+        'elapsed': round(results.elapsed, 6),
+        'cache': {'hits': results.cache_hits, 'misses': results.cache_misses},
+        'dedup': {
+            'duplicates': results.duplicates,
+            'saved_bytes': results.dedup_saved_bytes,
+            'saved_seconds': round(results.dedup_saved_seconds, 6)
+        },
+        'files': [
+            {
+                'input': path,
+                'output': out,
+                'success': success,
+                'message': msg,
+                'seconds': round(seconds, 6),
+                'cached': cached
+            }
+            for (success, msg, path), out, seconds, cached in zip(
+                results, results.outputs, results.timings, results.cached or [False] * len(results))
+        ]
+    }
+    for entry, record in zip(summary['files'], results.file_metrics):
+        for key in ('target', 'perceptual', 'passthrough'):
+            if record and key in record:
+                entry[key] = record[key]
+    if args.metrics:
+        summary['metrics'] = results.metrics.to_dict()
+        for entry, record in zip(summary['files'], results.file_metrics):
+            if record:
+                entry['stages'] = {stage: round(seconds, 6) for stage, seconds in record['stages'].items()}
+                entry['output_bytes'] = record['output_bytes']
+    print(json.dumps(summary, indent=args.indent, ensure_ascii=False))
+    if results.cancelled:
+        return 130
+    return 0 if succeeded == len(results) else 1
+
+def _run(converter, args, inputs, quality_settings, options):
+    if args.recursive:
+        return converter.convert_tree(inputs, args.output_dir, args.format,
+                                      input_formats=args.input_format,
+                                      quality_settings=quality_settings, **options)
+    return converter.batch_convert(inputs, args.output_dir, args.format,
+                                   quality_settings=quality_settings, **options)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "convert":
+        return run_convert(args)
+    return 2
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
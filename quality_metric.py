@@ -0,0 +1,162 @@
+# quality_metric.py - Similitud perceptual (SSIM) entre una imagen procesada y su versión codificada
+
+import io
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: sin él no hay modo de calidad perceptual
+    np = None
+
+# Lado mayor del plano de luminancia que se compara: suficiente para SSIM y barato
+SCORE_SIDE = 512
+SSIM_WINDOW = 7
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+def available():
+    return np is not None
+
+def luma_plane(img, side=SCORE_SIDE, size=None):
+    """Luminancia (L) reducida a size o, si no se indica, a side píxeles de lado mayor"""
+    if size is None:
+        scale = min(1.0, side / max(img.size))
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    if img.mode not in ('L', 'RGB'):
+        img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+    if img.size != size:
+        img = img.resize(size, Image.Resampling.BOX)
+    return img.convert('L')
+
+def _box_mean(x, window):
+    """Media en ventanas window x window (solo las completas) con una imagen integral"""
+    c = np.pad(x.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    return (c[window:, window:] - c[:-window, window:] - c[window:, :-window]
+            + c[:-window, :-window]) / (window * window)
+
+def ssim(a, b, window=SSIM_WINDOW):
+    """SSIM medio de dos planos L del mismo tamaño (1.0 = idénticos)"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    window = max(1, min(window, *a.shape))
+    mu_a, mu_b = _box_mean(a, window), _box_mean(b, window)
+    var_a = _box_mean(a * a, window) - mu_a * mu_a
+    var_b = _box_mean(b * b, window) - mu_b * mu_b
+    cov = _box_mean(a * b, window) - mu_a * mu_b
+    score = ((2 * mu_a * mu_b + _C1) * (2 * cov + _C2)) / (
+        (mu_a * mu_a + mu_b * mu_b + _C1) * (var_a + var_b + _C2))
+    return float(score.mean())
+
+class SSIMScorer:
+    """
+    Puntúa codificaciones de una misma imagen procesada contra su luminancia
+    reducida. key identifica el contenido de referencia (hash del plano), para
+    poder cachear las puntuaciones de una misma imagen procesada.
+    """
+
+    def __init__(self, img):
+        self.reference = luma_plane(img)
+        self.key = hashlib.sha1(self.reference.tobytes()).hexdigest()
+
+    def score(self, data):
+        """SSIM de los bytes codificados data frente a la referencia"""
+        with Image.open(io.BytesIO(data) if not hasattr(data, 'read') else data) as encoded:
+            # JPEG se decodifica directamente en gris; sin escalado DCT, que
+            # no reduce igual que la referencia y falsea la puntuación
+            encoded.draft('L', encoded.size)
+            plane = luma_plane(encoded, size=self.reference.size)
+        return ssim(self.reference, plane)
+
+class ScoreCache:
+    """
+    Caché LRU segura entre hilos de puntuaciones SSIM:
+    familia -> {entrada: {calidad: puntuación}}. La familia identifica el
+    origen y los ajustes del codificador; cada entrada, una imagen procesada
+    concreta (tamaño, recorte, fondo, esfuerzo). Las entradas de una misma
+    familia sirven de pista a las demás. Se puede guardar en un archivo JSON
+    (load/save) para reutilizar las puntuaciones entre ejecuciones.
+    Con record_updates=True se anotan los cambios para drain_updates() (los
+    procesos hijo devuelven así sus puntuaciones al padre).
+    """
+    FILE_NAME = '.pix_ssim_scores.json'
+
+    def __init__(self, max_items=4096, record_updates=False):
+        self.max_items = max_items
+        self.record_updates = record_updates
+        self._items = OrderedDict()
+        self._updates = []
+        self._loaded = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def get(self, family):
+        """Copia de las entradas de family: {entrada: {calidad: puntuación}}"""
+        with self._lock:
+            entries = self._items.get(family)
+            if entries is None:
+                return {}
+            self._items.move_to_end(family)
+            return {entry: dict(scores) for entry, scores in entries.items()}
+
+    def update(self, family, entry, scores):
+        with self._lock:
+            self._merge(family, entry, scores)
+            if self.record_updates:
+                self._updates.append((family, entry, dict(scores)))
+
+    def merge(self, updates):
+        """Añade los cambios devueltos por drain_updates() de otra caché"""
+        with self._lock:
+            for family, entry, scores in updates:
+                self._merge(family, entry, scores)
+
+    def drain_updates(self):
+        with self._lock:
+            updates, self._updates = self._updates, []
+            return updates
+
+    def _merge(self, family, entry, scores):
+        self._items.setdefault(family, {}).setdefault(entry, {}).update(scores)
+        self._items.move_to_end(family)
+        self._dirty = True
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def load(self, path):
+        """Incorpora las puntuaciones guardadas en path (una sola vez por archivo)"""
+        with self._lock:
+            if path in self._loaded:
+                return
+            self._loaded.add(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            dirty = self._dirty
+            for family, entries in data.items():
+                for entry, scores in entries.items():
+                    # JSON guarda las claves como texto
+                    self._merge(family, entry, {int(q): s for q, s in scores.items()})
+            self._dirty = dirty
+
+    def save(self, path):
+        """Guarda la caché en path de forma atómica si ha cambiado"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {family: entries for family, entries in self._items.items()}
+            tmp_path = path + '.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, path)
+                self._dirty = False
+            except OSError:
+                pass
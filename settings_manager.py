@@ -14,13 +14,37 @@ class AppSettings:
     # Configuraciones de conversión
     use_threading: bool = True
     max_threads: int = 4
+    use_processes: bool = False  # Pool de procesos (usa todos los núcleos)
+    max_processes: int = 0       # 0 = número de núcleos disponibles
+    process_chunk_size: int = 4
+    worker_memory_mb: int = 1024  # Presupuesto de memoria por hilo/proceso (0 = sin límite)
+    memory_budget_mb: int = 0     # Presupuesto total del lote (0 = worker_memory_mb por trabajador)
     default_output_dir: str = ""
+    incremental_conversion: bool = False  # Omitir archivos cuya salida sigue al día
+    verify_content_hash: bool = False     # Comparar contenido (SHA-256) si cambia la fecha
+    deduplicate_inputs: bool = False      # Convertir una vez las imágenes con contenido idéntico
     keep_original_files: bool = True
     
     # Configuraciones de calidad
     jpg_quality: int = 95
     webp_quality: int = 90
     png_compression: int = 6
+    background_color: str = "#FFFFFF"  # Fondo de las transparencias en JPG/BMP/TIFF
+    passthrough: str = "auto"       # Copiar sin recodificar si el formato no cambia: "auto", "always" u "off"
+    passthrough_links: bool = False # Enlaces duros en lugar de copias al no recodificar
+    strip_metadata: bool = False    # Quitar EXIF/XMP/texto de JPG/PNG al copiarlos sin recodificar
+    encoder_effort: str = "standard"  # "fastest", "balanced", "standard", "smallest" o "auto"
+    effort_time_budget: int = 0     # Segundos por lote para el modo "auto" (0 = sin límite)
+    target_size_kb: int = 0         # Tamaño máximo de salida JPG/WEBP en KB (0 = usar la calidad fija)
+    target_ssim: float = 0.0        # Similitud SSIM mínima de JPG/WEBP (0 = usar la calidad fija; requiere numpy)
+    
+    # Configuraciones de redimensionado (0 = sin límite)
+    resize_enabled: bool = False
+    resize_max_width: int = 0
+    resize_max_height: int = 0
+    resize_mode: str = "fit"        # "fit", "fill" o "crop"
+    resize_resample: str = "lanczos"
+    resize_only_shrink: bool = True
     
     # Configuraciones de interfaz
     show_preview: bool = True
@@ -67,11 +91,33 @@ class SettingsManager:
                 'theme': self.settings.theme,
                 'use_threading': self.settings.use_threading,
                 'max_threads': self.settings.max_threads,
+                'use_processes': self.settings.use_processes,
+                'max_processes': self.settings.max_processes,
+                'process_chunk_size': self.settings.process_chunk_size,
+                'worker_memory_mb': self.settings.worker_memory_mb,
+                'memory_budget_mb': self.settings.memory_budget_mb,
                 'default_output_dir': self.settings.default_output_dir,
+                'incremental_conversion': self.settings.incremental_conversion,
+                'verify_content_hash': self.settings.verify_content_hash,
+                'deduplicate_inputs': self.settings.deduplicate_inputs,
                 'keep_original_files': self.settings.keep_original_files,
                 'jpg_quality': self.settings.jpg_quality,
                 'webp_quality': self.settings.webp_quality,
                 'png_compression': self.settings.png_compression,
+                'background_color': self.settings.background_color,
+                'passthrough': self.settings.passthrough,
+                'passthrough_links': self.settings.passthrough_links,
+                'strip_metadata': self.settings.strip_metadata,
+                'encoder_effort': self.settings.encoder_effort,
+                'effort_time_budget': self.settings.effort_time_budget,
+                'target_size_kb': self.settings.target_size_kb,
+                'target_ssim': self.settings.target_ssim,
+                'resize_enabled': self.settings.resize_enabled,
+                'resize_max_width': self.settings.resize_max_width,
+                'resize_max_height': self.settings.resize_max_height,
+                'resize_mode': self.settings.resize_mode,
+                'resize_resample': self.settings.resize_resample,
+                'resize_only_shrink': self.settings.resize_only_shrink,
                 'show_preview': self.settings.show_preview,
                 'auto_resize_preview': self.settings.auto_resize_preview,
                 'show_notifications': self.settings.show_notifications,
@@ -106,24 +152,72 @@ class SettingsManager:
         """Obtener configuraciones de calidad para un formato específico"""
         quality_settings = {}
         
+        # optimize/method los decide el preajuste de esfuerzo (encoder_effort)
         if format_type == 'JPG':
             quality_settings = {
-                'quality': self.settings.jpg_quality,
-                'optimize': True
+                'quality': self.settings.jpg_quality
             }
         elif format_type == 'WEBP':
             quality_settings = {
-                'quality': self.settings.webp_quality,
-                'method': 6
+                'quality': self.settings.webp_quality
             }
         elif format_type == 'PNG':
             quality_settings = {
-                'optimize': True,
                 'compress_level': self.settings.png_compression
             }
+        if quality_settings:
+            quality_settings['effort'] = self.settings.encoder_effort
+        if format_type in ('JPG', 'WEBP') and self.settings.target_size_kb:
+            # La calidad configurada pasa a ser el máximo de la búsqueda
+            quality_settings['target_size'] = self.settings.target_size_kb * 1024
+        if format_type in ('JPG', 'BMP', 'TIFF') and self.settings.background_color.upper() != '#FFFFFF':
+            # Solo si no es el blanco por defecto, para no invalidar manifiestos existentes
+            quality_settings['background'] = self.settings.background_color
+        if format_type in ('JPG', 'WEBP') and self.settings.target_ssim:
+            # Se busca la menor calidad que alcanza la similitud (target_size tiene prioridad)
+            quality_settings['target_ssim'] = self.settings.target_ssim
+        # Copia sin recodificar: solo los valores distintos de los por defecto
+        if self.settings.passthrough != 'auto':
+            quality_settings['passthrough'] = self.settings.passthrough
+        if self.settings.passthrough_links:
+            quality_settings['passthrough_link'] = True
+        if self.settings.strip_metadata:
+            quality_settings['strip_metadata'] = True
+        
+        resize = self.get_resize_settings()
+        if resize:
+            quality_settings['resize'] = resize
         
         return quality_settings
     
+    def get_resize_settings(self) -> Dict[str, Any]:
+        """Obtener la etapa de redimensionado configurada (vacío si está desactivada)"""
+        if not self.settings.resize_enabled or not (self.settings.resize_max_width or self.settings.resize_max_height):
+            return {}
+        return {
+            'max_width': self.settings.resize_max_width,
+            'max_height': self.settings.resize_max_height,
+            'mode': self.settings.resize_mode,
+            'resample': self.settings.resize_resample,
+            'only_shrink': self.settings.resize_only_shrink
+        }
+    
+    def get_batch_options(self) -> Dict[str, Any]:
+        """Obtener opciones del motor de conversión por lotes"""
+        return {
+            'use_threading': self.settings.use_threading,
+            'max_threads': self.settings.max_threads,
+            'use_processes': self.settings.use_processes,
+            'max_processes': self.settings.max_processes,
+            'chunk_size': self.settings.process_chunk_size,
+            'worker_memory_mb': self.settings.worker_memory_mb,
+            'memory_budget_mb': self.settings.memory_budget_mb,
+            'effort_budget': self.settings.effort_time_budget,
+            'incremental': self.settings.incremental_conversion,
+            'verify_hash': self.settings.verify_content_hash,
+            'deduplicate': self.settings.deduplicate_inputs
+        }
+    
     def get_translations(self) -> Dict[str, str]:
         """Obtener traducciones según el idioma configurado"""
         translations = {
@@ -138,6 +232,7 @@ class SettingsManager:
                 'processing_mode': 'Modo de Procesamiento',
                 'concurrent': 'Concurrente (Hilos)',
                 'sequential': 'Secuencial',
+                'parallel_processes': 'Paralelo (Procesos)',
                 'quality': 'Calidad',
                 'output_directory': 'Directorio de Salida',
                 'conversion_completed': 'Conversión Completada',
@@ -152,9 +247,38 @@ class SettingsManager:
                 'maintain_original_files': 'Mantener archivos originales',
                 'show_notifications': 'Mostrar notificaciones',
                 'enable_drag_drop': 'Habilitar arrastrar y soltar',
+                'incremental_conversion': 'Omitir archivos sin cambios',
+                'deduplicate_inputs': 'Convertir una sola vez las imágenes repetidas',
                 'options': 'Opciones',
                 'max_threads': 'Hilos máximos:',
                 'png_compression': 'Compresión PNG',
+                'background_color': 'Fondo de las transparencias:',
+                'passthrough': 'Mismo formato sin recodificar',
+                'passthrough_auto': 'Automático (si el resultado es equivalente)',
+                'passthrough_always': 'Siempre',
+                'passthrough_off': 'Nunca (recodificar)',
+                'passthrough_links': 'Usar enlaces duros en lugar de copias',
+                'strip_metadata': 'Quitar metadatos (EXIF, XMP, texto)',
+                'encoder_effort': 'Esfuerzo de codificación',
+                'effort_fastest': 'Más rápido',
+                'effort_balanced': 'Equilibrado',
+                'effort_standard': 'Estándar (como en versiones anteriores)',
+                'effort_smallest': 'Archivo más pequeño',
+                'effort_auto': 'Automático (según tamaño y tiempo)',
+                'time_budget': 'Tiempo por lote (s):',
+                'target_size': 'Tamaño máximo JPG/WebP (KB):',
+                'target_ssim': 'Similitud mínima JPG/WebP (SSIM):',
+                'fixed_quality': 'Calidad fija',
+                'resize': 'Redimensionar',
+                'max_width': 'Ancho máximo:',
+                'max_height': 'Alto máximo:',
+                'no_limit': 'Sin límite',
+                'resize_mode': 'Modo:',
+                'resize_fit': 'Ajustar (mantener proporción)',
+                'resize_fill': 'Rellenar (cubrir el recuadro)',
+                'resize_crop': 'Recortar al tamaño exacto',
+                'resample_filter': 'Filtro:',
+                'only_shrink': 'Solo reducir (no ampliar)',
                 'reset_settings_confirm': '¿Está seguro de que desea restablecer todas las configuraciones?',
                 'reset': 'Restablecer',
                 'save': 'Guardar',
@@ -163,6 +287,7 @@ class SettingsManager:
                 'clear_history_confirm': '¿Está seguro de que desea limpiar el historial?',
                 'close': 'Cerrar',
                 'file': 'Archivo',
+                'folder': 'Carpeta',
                 'size': 'Tamaño',
                 'selected_files': 'Archivos seleccionados:',
                 'no_valid_files': 'No se encontraron archivos válidos para el formato de entrada seleccionado.',
@@ -193,6 +318,7 @@ class SettingsManager:
                 'processing_mode': 'Processing Mode',
                 'concurrent': 'Concurrent (Threads)',
                 'sequential': 'Sequential',
+                'parallel_processes': 'Parallel (Processes)',
                 'quality': 'Quality',
                 'output_directory': 'Output Directory',
                 'conversion_completed': 'Conversion Completed',
@@ -207,9 +333,38 @@ class SettingsManager:
                 'maintain_original_files': 'Keep original files',
                 'show_notifications': 'Show notifications',
                 'enable_drag_drop': 'Enable drag and drop',
+                'incremental_conversion': 'Skip unchanged files',
+                'deduplicate_inputs': 'Convert repeated images only once',
                 'options': 'Options',
                 'max_threads': 'Max threads:',
                 'png_compression': 'PNG Compression',
+                'background_color': 'Transparency background:',
+                'passthrough': 'Same format without re-encoding',
+                'passthrough_auto': 'Automatic (when the result is equivalent)',
+                'passthrough_always': 'Always',
+                'passthrough_off': 'Never (re-encode)',
+                'passthrough_links': 'Use hard links instead of copies',
+                'strip_metadata': 'Strip metadata (EXIF, XMP, text)',
+                'encoder_effort': 'Encoder effort',
+                'effort_fastest': 'Fastest',
+                'effort_balanced': 'Balanced',
+                'effort_standard': 'Standard (same output as before)',
+                'effort_smallest': 'Smallest file',
+                'effort_auto': 'Automatic (by size and time)',
+                'time_budget': 'Batch time budget (s):',
+                'target_size': 'Max JPG/WebP size (KB):',
+                'target_ssim': 'Min JPG/WebP similarity (SSIM):',
+                'fixed_quality': 'Fixed quality',
+                'resize': 'Resize',
+                'max_width': 'Max width:',
+                'max_height': 'Max height:',
+                'no_limit': 'No limit',
+                'resize_mode': 'Mode:',
+                'resize_fit': 'Fit (keep aspect ratio)',
+                'resize_fill': 'Fill (cover the box)',
+                'resize_crop': 'Crop to exact size',
+                'resample_filter': 'Filter:',
+                'only_shrink': 'Only shrink (never enlarge)',
                 'reset_settings_confirm': 'Are you sure you want to reset all settings?',
                 'reset': 'Reset',
                 'save': 'Save',
@@ -218,6 +373,7 @@ class SettingsManager:
                 'clear_history_confirm': 'Are you sure you want to clear the history?',
                 'close': 'Close',
                 'file': 'File',
+                'folder': 'Folder',
                 'size': 'Size',
                 'selected_files': 'Selected files:',
                 'no_valid_files': 'No valid files found for the selected input format.',
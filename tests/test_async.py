@@ -0,0 +1,45 @@
+# test_async.py - La API asíncrona no bloquea el bucle de eventos
+import asyncio
+import threading
+import time
+from converter import ImageConverter
+
+async def _max_loop_stall(duration, interval=0.01):
+    """Mayor retraso (s) de un latido del bucle durante duration segundos"""
+    worst = 0.0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - before - interval)
+    return worst
+
+def test_cancelled_tasks_do_not_block_submissions(monkeypatch):
+    # Un solo hilo de trabajo, ocupado hasta que se libera el evento
+    monkeypatch.setattr('os.cpu_count', lambda: 1)
+    converter = ImageConverter(history_file=None)
+    converter.ASYNC_CONCURRENCY = 2
+    release = threading.Event()
+    threading.Timer(1.0, release.set).start()
+
+    async def scenario():
+        heartbeat = asyncio.ensure_future(_max_loop_stall(1.3))
+        blocker = asyncio.ensure_future(converter._offload(release.wait))
+        await asyncio.sleep(0.05)
+        # Cada tarea cancelada deja un trabajo muerto en la cola del pool
+        for _ in range(6):
+            task = asyncio.ensure_future(converter._offload(time.sleep, 0))
+            await asyncio.sleep(0.02)
+            task.cancel()
+            await asyncio.sleep(0.02)
+        last = asyncio.ensure_future(converter._offload(time.sleep, 0))
+        stall = await heartbeat
+        await asyncio.wait_for(asyncio.gather(blocker, last), 5)
+        return stall
+
+    try:
+        stall = asyncio.run(scenario())
+    finally:
+        release.set()
+        converter.close()
+    assert stall < 0.2
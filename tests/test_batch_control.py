@@ -0,0 +1,67 @@
+# test_batch_control.py - Cancelación y pausa de lotes con resultados parciales
+import os
+import threading
+import time
+from PIL import Image
+from batch_control import BatchControl
+from converter import ImageConverter
+
+def _sources(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(str(tmp_path), f'img{i}.png')
+        Image.new('RGB', (32, 32), (i * 20, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+def test_cancel_returns_partial_results_in_order(tmp_path):
+    files = _sources(tmp_path, 10)
+    out = os.path.join(str(tmp_path), 'out')
+    control = BatchControl()
+    # Secuencial: se cancela al terminar el tercer archivo (30%)
+    progress = lambda percent: percent >= 30 and control.cancel()
+
+    results = ImageConverter(history_file=None).batch_convert(
+        files, out, 'JPG', use_threading=False, progress_callback=progress, control=control)
+
+    assert results.cancelled
+    assert [path for _, _, path in results] == files
+    assert [success for success, _, _ in results] == [True] * 3 + [False] * 7
+    assert results.dropped == 7
+    assert all(msg == "Cancelado" for _, msg, _ in results[3:])
+    assert sorted(name for name in os.listdir(out) if name.endswith('.jpg')) == [
+        'img0.jpg', 'img1.jpg', 'img2.jpg']
+    # El diario se conserva para poder reanudar
+    assert os.path.exists(os.path.join(out, '.pix_journal.jsonl'))
+
+def test_pause_holds_work_until_resume(tmp_path):
+    files = _sources(tmp_path, 4)
+    out = os.path.join(str(tmp_path), 'out')
+    control = BatchControl()
+    control.pause()
+    results = []
+    worker = threading.Thread(target=lambda: results.append(ImageConverter(history_file=None).batch_convert(
+        files, out, 'JPG', max_threads=2, control=control)))
+    worker.start()
+    time.sleep(0.2)
+    assert control.paused
+    assert not [name for name in os.listdir(out) if name.endswith('.jpg')]
+
+    control.resume()
+    worker.join(10)
+    assert not worker.is_alive()
+    assert all(success for success, _, _ in results[0])
+    assert not results[0].cancelled
+
+def test_cancel_while_paused_drops_everything(tmp_path):
+    files = _sources(tmp_path, 4)
+    control = BatchControl()
+    control.pause()
+    timer = threading.Timer(0.1, control.cancel)
+    timer.start()
+    results = ImageConverter(history_file=None).batch_convert(
+        files, os.path.join(str(tmp_path), 'out'), 'JPG', max_threads=2, control=control)
+    timer.join()
+    assert results.cancelled
+    assert len(results) == len(files)
+    assert not any(success for success, _, _ in results)
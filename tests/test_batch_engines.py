@@ -0,0 +1,45 @@
+# test_batch_engines.py - Motores de lote: procesos, hilos y secuencial
+import os
+from PIL import Image
+from converter import ImageConverter
+
+def _sources(tmp_path, sizes):
+    paths = []
+    for i, size in enumerate(sizes):
+        path = os.path.join(str(tmp_path), f'img{i}.png')
+        Image.radial_gradient('L').resize(size).convert('RGB').save(path)
+        paths.append(path)
+    return paths
+
+def test_process_engine_keeps_input_order_and_history(tmp_path):
+    # Tamaños alternos para que los procesos terminen desordenados
+    files = _sources(tmp_path, [(600, 600), (16, 16)] * 3)
+    out_dir = os.path.join(str(tmp_path), 'out')
+    converter = ImageConverter(history_file=None)
+    results = converter.batch_convert(files, out_dir, 'JPG', use_processes=True,
+                                      max_processes=2, chunk_size=1)
+
+    assert [path for _, _, path in results] == files
+    assert all(success for success, _, _ in results)
+    for path, out in zip(files, results.outputs):
+        assert os.path.basename(out) == os.path.splitext(os.path.basename(path))[0] + '.jpg'
+        assert os.path.getsize(out) > 0
+    # El historial de los hijos se consolida en el proceso principal
+    assert sorted(entry['input_file'] for entry in converter.history) == sorted(
+        os.path.basename(path) for path in files)
+
+def test_thread_engine_keeps_input_order(tmp_path):
+    files = _sources(tmp_path, [(600, 600), (16, 16)] * 4)
+    results = ImageConverter(history_file=None).batch_convert(
+        files, os.path.join(str(tmp_path), 'out'), 'PNG', max_threads=3)
+    assert [path for _, _, path in results] == files
+    assert all(success for success, _, _ in results)
+
+def test_batches_with_other_thread_counts_do_not_break_each_other(tmp_path):
+    converter = ImageConverter(history_file=None)
+    first = converter._get_pool(2)
+    # Otro lote con distinto número de hilos no cierra el pool del primero
+    assert converter._get_pool(3) is not first
+    assert first.submit(lambda: 'ok').result() == 'ok'
+    assert converter._get_pool(2) is first
+    converter.close()
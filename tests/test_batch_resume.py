@@ -0,0 +1,47 @@
+# test_batch_resume.py - Reanudación de lotes y restos de escrituras interrumpidas
+import os
+import subprocess
+import sys
+from PIL import Image
+from converter import ImageConverter
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+def _sources(tmp_path, count=3):
+    paths = []
+    for i in range(count):
+        path = os.path.join(str(tmp_path), f'img{i}.png')
+        Image.new('RGB', (16, 16), (i * 60, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+def test_resume_removes_temps_of_dead_processes(tmp_path):
+    out_dir = os.path.join(str(tmp_path), 'out')
+    os.makedirs(out_dir)
+    stale = os.path.join(out_dir, f'.img0.jpg.{_dead_pid()}.123.tmp')
+    live = os.path.join(out_dir, f'.img1.jpg.{os.getppid()}.456.tmp')
+    unrelated = os.path.join(out_dir, '.notes.tmp')
+    for path in (stale, live, unrelated):
+        with open(path, 'wb') as f:
+            f.write(b'partial')
+
+    results = ImageConverter(history_file=None).batch_convert(
+        _sources(tmp_path), out_dir, 'JPG', resume=True)
+
+    assert all(success for success, _, _ in results)
+    assert not os.path.exists(stale)
+    assert os.path.exists(live)
+    assert os.path.exists(unrelated)
+
+def test_new_batch_also_sweeps_stale_temps(tmp_path):
+    out_dir = os.path.join(str(tmp_path), 'out')
+    os.makedirs(out_dir)
+    stale = os.path.join(out_dir, f'.img2.jpg.{_dead_pid()}.1.tmp')
+    open(stale, 'wb').close()
+    ImageConverter(history_file=None).batch_convert(_sources(tmp_path), out_dir, 'JPG',
+                                                    use_threading=False)
+    assert not os.path.exists(stale)
+    assert sorted(os.listdir(out_dir)) == ['img0.jpg', 'img1.jpg', 'img2.jpg']
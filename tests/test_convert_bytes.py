@@ -0,0 +1,32 @@
+# test_convert_bytes.py - Conversión en memoria
+import io
+from PIL import Image
+from converter import ImageConverter
+
+def _png_bytes(size=(64, 64), mode='RGBA'):
+    buffer = io.BytesIO()
+    Image.linear_gradient('L').resize(size).convert(mode).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def test_ico_byte_count_on_seekable_output():
+    converter = ImageConverter(history_file=None)
+    output = io.BytesIO()
+    written = converter.convert_bytes(_png_bytes(), 'ICO', output=output)
+    assert written == len(output.getvalue())
+    assert written == len(converter.convert_bytes(_png_bytes(), 'ICO'))
+
+def test_byte_count_after_existing_content():
+    converter = ImageConverter(history_file=None)
+    output = io.BytesIO()
+    output.write(b'prefix')
+    written = converter.convert_bytes(_png_bytes(), 'ICO', output=output)
+    assert written == len(output.getvalue()) - len(b'prefix')
+    assert Image.open(io.BytesIO(output.getvalue()[len(b'prefix'):])).format == 'ICO'
+
+def test_tiff_after_existing_content_is_readable():
+    converter = ImageConverter(history_file=None)
+    output = io.BytesIO()
+    output.write(b'prefix')
+    written = converter.convert_bytes(_png_bytes(mode='RGB'), 'TIFF', output=output)
+    assert written == len(output.getvalue()) - len(b'prefix')
+    Image.open(io.BytesIO(output.getvalue()[len(b'prefix'):])).load()
@@ -0,0 +1,41 @@
+# test_dedup.py - Entradas idénticas dentro de un lote
+import os
+import shutil
+from PIL import Image
+import converter as converter_module
+from converter import ImageConverter
+
+def _image(path, color, size=(64, 64)):
+    Image.new('RGB', size, color).save(path)
+    return path
+
+def test_identical_inputs_are_converted_once(tmp_path):
+    a = _image(os.path.join(str(tmp_path), 'a.bmp'), 'red')
+    b = os.path.join(str(tmp_path), 'b.bmp')
+    shutil.copyfile(a, b)
+    # Mismo tamaño y distinto contenido: no es un duplicado
+    c = _image(os.path.join(str(tmp_path), 'c.bmp'), 'blue')
+    out = os.path.join(str(tmp_path), 'out')
+
+    results = ImageConverter(history_file=None).batch_convert(
+        [a, b, c], out, 'PNG', deduplicate=True)
+
+    assert all(success for success, _, _ in results)
+    assert results.duplicate_of == [None, 0, None]
+    assert results.duplicates == 1
+    with open(os.path.join(out, 'a.png'), 'rb') as fa, open(os.path.join(out, 'b.png'), 'rb') as fb:
+        assert fa.read() == fb.read()
+    assert os.path.samefile(os.path.join(out, 'a.png'), os.path.join(out, 'b.png'))
+
+def test_inputs_with_unique_sizes_are_not_hashed(tmp_path, monkeypatch):
+    hashed = []
+    original = converter_module.hash_file
+    monkeypatch.setattr(converter_module, 'hash_file',
+                        lambda path, **kwargs: hashed.append(path) or original(path, **kwargs))
+    files = [_image(os.path.join(str(tmp_path), f'{i}.bmp'), 'red', (16 + i, 16)) for i in range(4)]
+
+    results = ImageConverter(history_file=None).batch_convert(
+        files, os.path.join(str(tmp_path), 'out'), 'PNG', deduplicate=True)
+
+    assert results.duplicates == 0
+    assert hashed == []
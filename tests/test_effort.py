@@ -0,0 +1,43 @@
+# test_effort.py - Los niveles de esfuerzo solo tocan ajustes de esfuerzo
+import io
+from PIL import Image
+from converter import ImageConverter
+
+def test_effort_presets_keep_png_compress_level(monkeypatch):
+    saved = []
+    original = Image.Image.save
+    def spy(self, fp, format=None, **params):
+        saved.append(params)
+        return original(self, fp, format=format, **params)
+    monkeypatch.setattr(Image.Image, 'save', spy)
+
+    converter = ImageConverter(history_file=None)
+    source = io.BytesIO()
+    Image.linear_gradient('L').convert('RGB').save(source, format='BMP')
+    source = source.getvalue()
+    for effort in ImageConverter.EFFORT_LEVELS:
+        saved.clear()
+        converter.convert_bytes(source, 'PNG', {'compress_level': 9, 'effort': effort})
+        assert saved[-1]['compress_level'] == 9
+
+def test_default_settings_reproduce_previous_encoder_arguments(monkeypatch, tmp_path):
+    from settings_manager import SettingsManager
+    saved = []
+    original = Image.Image.save
+    def spy(self, fp, format=None, **params):
+        saved.append(params)
+        return original(self, fp, format=format, **params)
+    monkeypatch.setattr(Image.Image, 'save', spy)
+
+    manager = SettingsManager(str(tmp_path / 'settings.json'))
+    converter = ImageConverter(history_file=None)
+    source = io.BytesIO()
+    Image.linear_gradient('L').convert('RGB').save(source, format='BMP')
+    # Argumentos que SettingsManager pasaba antes de los preajustes de esfuerzo
+    previous = {'JPG': {'quality': 95, 'optimize': True},
+                'WEBP': {'quality': 90, 'method': 6},
+                'PNG': {'optimize': True, 'compress_level': 6}}
+    for fmt, expected in previous.items():
+        saved.clear()
+        converter.convert_bytes(source.getvalue(), fmt, manager.get_quality_settings(fmt))
+        assert saved[-1] == expected
@@ -0,0 +1,52 @@
+# test_flatten.py - Composición del alfa sobre el fondo y modos sin conversión
+from PIL import Image
+from converter import ImageConverter
+
+def _reference(img, color):
+    """Composición como antes: RGBA completo y canal alfa separado"""
+    rgba = img.convert('RGBA')
+    fondo = Image.new('RGB', img.size, color)
+    fondo.paste(rgba, mask=rgba.split()[3])
+    return fondo
+
+def _transparent(mode):
+    img = Image.linear_gradient('L').resize((64, 48))
+    rgba = Image.merge('RGBA', (img, img.rotate(90), img.transpose(Image.Transpose.FLIP_LEFT_RIGHT), img))
+    if mode == 'P':
+        # Paleta con un índice transparente
+        img = rgba.convert('RGB').quantize(16)
+        img.info['transparency'] = 3
+        return img
+    return rgba.convert(mode)
+
+def test_transparent_modes_are_composited_on_background():
+    converter = ImageConverter(history_file=None)
+    for mode in ('RGBA', 'LA', 'P'):
+        img = _transparent(mode)
+        flat = converter._process_for_format(img, 'JPG')
+        assert flat.mode == 'RGB'
+        assert flat.tobytes() == _reference(img, ImageConverter.BACKGROUND_COLOR).tobytes()
+
+def test_custom_background_color():
+    img = _transparent('RGBA')
+    flat = ImageConverter(history_file=None)._process_for_format(img, 'BMP', background=[0, 128, 255])
+    assert flat.tobytes() == _reference(img, (0, 128, 255)).tobytes()
+    clear = Image.new('RGBA', (4, 4), (10, 20, 30, 0))
+    assert ImageConverter(history_file=None)._flatten_alpha(clear, (0, 128, 255)).getpixel((0, 0)) == (0, 128, 255)
+
+def test_large_images_flatten_by_strips_with_same_result(monkeypatch):
+    img = _transparent('P')
+    converter = ImageConverter(history_file=None)
+    whole = converter._flatten_alpha(img)
+    monkeypatch.setattr(ImageConverter, 'LARGE_IMAGE_PIXELS', 1)
+    monkeypatch.setattr(ImageConverter, 'STRIP_BYTES', 64 * 4 * 5)
+    assert converter._flatten_alpha(img).tobytes() == whole.tobytes()
+
+def test_image_already_in_target_mode_is_not_copied():
+    converter = ImageConverter(history_file=None)
+    rgb = Image.new('RGB', (8, 8), 'red')
+    rgba = Image.new('RGBA', (8, 8), 'red')
+    assert converter._process_for_format(rgb, 'JPG') is rgb
+    assert converter._process_for_format(rgb, 'TIFF') is rgb
+    assert converter._process_for_format(rgba, 'PNG') is rgba
+    assert converter._process_for_format(rgba, 'ICO') is rgba
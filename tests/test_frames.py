@@ -0,0 +1,56 @@
+# test_frames.py - Animaciones y TIFF multipágina conservan sus fotogramas
+import os
+from PIL import Image, ImageSequence
+from converter import ImageConverter
+
+DURATIONS = [40, 80, 120, 160, 200]
+COLORS = ['red', 'green', 'blue', 'yellow', 'white']
+
+def _animated_gif(path):
+    frames = [Image.new('RGB', (32, 24), color) for color in COLORS]
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=DURATIONS, loop=0)
+    return path
+
+def _frames(path):
+    with Image.open(path) as img:
+        frames = []
+        for frame in ImageSequence.Iterator(img):
+            # WEBP solo rellena info['duration'] al decodificar el fotograma
+            pixel = frame.convert('RGB').getpixel((16, 12))
+            frames.append((frame.info.get('duration'), pixel))
+        return frames, img.info.get('loop')
+
+def test_gif_to_webp_and_gif_keep_frames_durations_and_loop(tmp_path):
+    source = _animated_gif(os.path.join(str(tmp_path), 'anim.gif'))
+    converter = ImageConverter(history_file=None)
+    expected = [(duration, Image.new('RGB', (1, 1), color).getpixel((0, 0)))
+                for duration, color in zip(DURATIONS, COLORS)]
+    for fmt in ('WEBP', 'GIF'):
+        output = os.path.join(str(tmp_path), 'out.' + fmt.lower())
+        # GIF -> GIF se copiaría sin recodificar
+        settings = {'lossless': True} if fmt == 'WEBP' else {'passthrough': 'off'}
+        success, msg = converter.convert_image(source, output, fmt, settings)
+        assert success, msg
+        frames, loop = _frames(output)
+        assert [duration for duration, _ in frames] == DURATIONS
+        assert [pixel for _, pixel in frames] == [pixel for _, pixel in expected]
+        assert loop == 0
+
+def test_resized_animation_keeps_every_frame(tmp_path):
+    source = _animated_gif(os.path.join(str(tmp_path), 'anim.gif'))
+    output = os.path.join(str(tmp_path), 'small.webp')
+    success, msg = ImageConverter(history_file=None).convert_image(
+        source, output, 'WEBP', resize={'max_width': 16})
+    assert success, msg
+    with Image.open(output) as img:
+        assert img.n_frames == len(DURATIONS)
+        assert img.size == (16, 12)
+
+def test_multipage_tiff_keeps_pages(tmp_path):
+    source = os.path.join(str(tmp_path), 'pages.gif')
+    _animated_gif(source)
+    output = os.path.join(str(tmp_path), 'pages.tiff')
+    success, msg = ImageConverter(history_file=None).convert_image(source, output, 'TIFF')
+    assert success, msg
+    with Image.open(output) as img:
+        assert img.n_frames == len(COLORS)
@@ -0,0 +1,41 @@
+# test_history_store.py - Historial JSONL acotado y migración del formato antiguo
+import json
+import os
+from history_store import HistoryStore
+from converter import ImageConverter
+
+def _entry(i):
+    return {'input_file': f'img{i}.png', 'success': True}
+
+def _lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def test_history_is_capped_in_memory_and_on_disk(tmp_path):
+    path = os.path.join(str(tmp_path), 'history.jsonl')
+    store = HistoryStore(path, max_items=5, flush_every=3)
+    for i in range(23):
+        store.append(_entry(i))
+    store.flush()
+
+    assert store.entries == [_entry(i) for i in range(18, 23)]
+    # El archivo se compacta al pasar del doble del límite
+    assert len(_lines(path)) <= 10
+    assert HistoryStore(path, max_items=5).entries == store.entries
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = os.path.join(str(tmp_path), 'history.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(_entry(0)) + '\n' + '{"input_file": "img1')
+    assert HistoryStore(path).entries == [_entry(0)]
+
+def test_legacy_json_history_is_migrated(tmp_path):
+    legacy = os.path.join(str(tmp_path), 'conversion_history.json')
+    with open(legacy, 'w', encoding='utf-8') as f:
+        json.dump([_entry(i) for i in range(8)], f)
+    path = os.path.join(str(tmp_path), 'conversion_history.jsonl')
+
+    converter = ImageConverter(history_file=path, max_history_items=5)
+
+    assert converter.history == [_entry(i) for i in range(3, 8)]
+    assert _lines(path) == converter.history
@@ -0,0 +1,46 @@
+# test_incremental.py - Conversión incremental: qué invalida una salida
+import os
+from PIL import Image
+from converter import ImageConverter
+
+def _setup(tmp_path):
+    path = os.path.join(str(tmp_path), 'img.png')
+    Image.new('RGB', (16, 16), 'red').save(path)
+    return path, os.path.join(str(tmp_path), 'out')
+
+def _run(path, out, **kwargs):
+    results = ImageConverter(history_file=None).batch_convert(
+        [path], out, 'JPG', incremental=True, **kwargs)
+    assert all(success for success, _, _ in results)
+    return results.cached[0]
+
+def _touch(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 5 * 10**9))
+
+def test_unchanged_inputs_are_skipped(tmp_path):
+    path, out = _setup(tmp_path)
+    assert _run(path, out) is False
+    assert _run(path, out) is True
+
+def test_settings_source_and_output_changes_invalidate(tmp_path):
+    path, out = _setup(tmp_path)
+    _run(path, out)
+    assert _run(path, out, quality_settings={'quality': 50}) is False
+    assert _run(path, out, quality_settings={'quality': 50}) is True
+
+    Image.new('RGB', (16, 16), 'blue').save(path)
+    _touch(path)
+    assert _run(path, out, quality_settings={'quality': 50}) is False
+
+    os.remove(os.path.join(out, 'img.jpg'))
+    assert _run(path, out, quality_settings={'quality': 50}) is False
+
+def test_verify_hash_keeps_touched_but_identical_inputs(tmp_path):
+    path, out = _setup(tmp_path)
+    _run(path, out, verify_hash=True)
+    _touch(path)
+    assert _run(path, out, verify_hash=True) is True
+    # Sin verify_hash basta con que cambie la fecha
+    _touch(path)
+    assert _run(path, out) is False
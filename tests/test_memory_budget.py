@@ -0,0 +1,43 @@
+# test_memory_budget.py - Estimación de memoria y admisión por presupuesto
+import os
+import threading
+from PIL import Image
+from memory_budget import MemoryScheduler, estimate_image_memory
+
+def _image(tmp_path, mode, size=(100, 50)):
+    path = os.path.join(str(tmp_path), f'{mode.lower()}.png' if mode != 'CMYK' else 'cmyk.jpg')
+    Image.new(mode, size).save(path)
+    return path
+
+def test_estimate_counts_mode_copies_and_encoder_memory(tmp_path):
+    pixels = 100 * 50
+    rgb, rgba, cmyk = (_image(tmp_path, mode) for mode in ('RGB', 'RGBA', 'CMYK'))
+    # RGB -> RGBA para PNG: decodificada + copia
+    assert estimate_image_memory(rgb, 'PNG') == pixels * 8
+    # RGBA ya es el modo de PNG: sin copia
+    assert estimate_image_memory(rgba, 'PNG') == pixels * 4
+    # CMYK -> RGB y memoria del codificador JPEG
+    assert estimate_image_memory(cmyk, 'JPG') == pixels * 11
+    assert estimate_image_memory(rgba, 'WEBP') < estimate_image_memory(rgba, 'WEBP', {'lossless': True})
+    assert estimate_image_memory(os.path.join(str(tmp_path), 'missing.png'), 'PNG') == 0
+
+def test_scheduler_never_exceeds_budget():
+    scheduler = MemoryScheduler(budget=100, max_running=4)
+    jobs = [(i, {'memory': memory}) for i, memory in enumerate([60, 30, 50, 10, 40, 20, 90])]
+    admitted = []
+    lock = threading.Lock()
+
+    def release_later(seq):
+        with lock:
+            admitted.append(seq)
+        scheduler.release(seq)
+
+    threads = []
+    for seq, _ in scheduler.schedule(iter(jobs)):
+        thread = threading.Timer(0.01, release_later, (seq,))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    assert sorted(admitted) == list(range(len(jobs)))
+    assert scheduler.peak <= 100
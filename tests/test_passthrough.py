@@ -0,0 +1,55 @@
+# test_passthrough.py - Copia sin recodificar solo si equivale a convertir
+import os
+from PIL import Image
+from converter import ImageConverter
+
+def _gradient(size=(256, 256)):
+    return Image.linear_gradient('L').resize(size).convert('RGB')
+
+def _convert(tmp_path, source, output_format, settings=None):
+    output = os.path.join(str(tmp_path), 'out.' + output_format.lower())
+    success, msg = ImageConverter(history_file=None).convert_image(source, output, output_format,
+                                                                   settings)
+    assert success, msg
+    with open(source, 'rb') as src, open(output, 'rb') as out:
+        return output, src.read() == out.read()
+
+def test_raw_tiff_is_reencoded_with_requested_compression(tmp_path):
+    source = os.path.join(str(tmp_path), 'raw.tiff')
+    _gradient().save(source, compression='raw')
+    for settings in (None, {'compression': 'tiff_lzw'}):
+        output, copied = _convert(tmp_path, source, 'TIFF', settings)
+        assert not copied
+        assert os.path.getsize(output) < os.path.getsize(source)
+        with Image.open(output) as img:
+            assert img.info['compression'] == 'tiff_lzw'
+
+def test_tiff_with_requested_compression_is_copied(tmp_path):
+    source = os.path.join(str(tmp_path), 'lzw.tiff')
+    _gradient().save(source, compression='tiff_lzw')
+    assert _convert(tmp_path, source, 'TIFF')[1]
+
+def test_png_is_copied_only_if_effective_settings_keep_compression(tmp_path):
+    source = os.path.join(str(tmp_path), 'source.png')
+    _gradient().save(source)
+    # Sin ajustes se usa QUALITY_SETTINGS (optimize) y 'auto' es 'smallest' en imágenes pequeñas
+    assert not _convert(tmp_path, source, 'PNG')[1]
+    assert not _convert(tmp_path, source, 'PNG', {'compress_level': 6, 'effort': 'auto'})[1]
+    assert not _convert(tmp_path, source, 'PNG', {'compress_level': 9})[1]
+    assert _convert(tmp_path, source, 'PNG', {'compress_level': 6})[1]
+    assert _convert(tmp_path, source, 'PNG', {'compress_level': 6, 'effort': 'fastest'})[1]
+    assert _convert(tmp_path, source, 'PNG', {'compress_level': 9, 'passthrough': 'always'})[1]
+
+def test_png_with_weaker_compression_is_reencoded(tmp_path):
+    source = os.path.join(str(tmp_path), 'stored.png')
+    _gradient((800, 800)).save(source, compress_level=0)
+    for settings in (None, {'compress_level': 6, 'effort': 'fastest'}):
+        output, copied = _convert(tmp_path, source, 'PNG', settings)
+        assert not copied
+        assert os.path.getsize(output) < os.path.getsize(source) // 10
+
+def test_jpeg_copied_when_quality_not_above_requested(tmp_path):
+    source = os.path.join(str(tmp_path), 'source.jpg')
+    _gradient().save(source, quality=80)
+    assert _convert(tmp_path, source, 'JPG', {'quality': 90})[1]
+    assert not _convert(tmp_path, source, 'JPG', {'quality': 60})[1]
@@ -0,0 +1,37 @@
+# test_renditions.py - Rendiciones con una sola decodificación
+import os
+from PIL import Image
+from converter import ImageConverter
+
+def _source(tmp_path, size=(400, 300), mode='RGB'):
+    path = os.path.join(tmp_path, f'source_{mode.lower()}.png')
+    Image.linear_gradient('L').resize(size).convert(mode).save(path)
+    return path
+
+def test_renditions_differing_only_in_quality_differ(tmp_path):
+    converter = ImageConverter(history_file=None)
+    for fmt, mode in (('WEBP', 'RGBA'), ('JPG', 'RGB')):
+        source = _source(str(tmp_path), (800, 800), mode)
+        for _ in range(3):
+            low, high = converter.convert_renditions(
+                source, [{'format': fmt, 'name': 'low', 'quality': {'quality': 5}},
+                         {'format': fmt, 'name': 'high', 'quality': {'quality': 100}}],
+                str(tmp_path))
+            assert low['success'] and high['success']
+            assert low['bytes'] < high['bytes']
+
+def test_ico_rendition_bytes_and_sizes_match_convert_image(tmp_path):
+    converter = ImageConverter(history_file=None)
+    source = _source(str(tmp_path))
+    result, = converter.convert_renditions(source, [{'format': 'ICO', 'name': 'icon'}], str(tmp_path))
+    assert result['success'], result['msg']
+    assert result['bytes'] == os.path.getsize(result['output'])
+
+    single = os.path.join(str(tmp_path), 'single.ico')
+    metrics = {}
+    assert converter.convert_image(source, single, 'ICO', metrics=metrics)[0]
+    assert metrics['output_bytes'] == os.path.getsize(single)
+    with Image.open(result['output']) as rendition, Image.open(single) as icon:
+        assert rendition.info['sizes'] == icon.info['sizes']
+        # Fuente 4:3: el tamaño mayor de ICO_SIZES conserva la proporción
+        assert (48, 36) in rendition.info['sizes']
@@ -0,0 +1,29 @@
+# test_settings.py - Persistencia de la configuración y opciones del lote
+import dataclasses
+import json
+import os
+from PIL import Image
+from converter import ImageConverter
+from settings_manager import AppSettings, SettingsManager
+
+def test_every_setting_is_saved(tmp_path):
+    path = os.path.join(str(tmp_path), 'settings.json')
+    SettingsManager(path).save_settings()
+    with open(path, encoding='utf-8') as f:
+        saved = json.load(f)
+    assert set(saved) == {field.name for field in dataclasses.fields(AppSettings)}
+
+def test_memory_budget_reaches_the_batch(tmp_path):
+    path = os.path.join(str(tmp_path), 'settings.json')
+    manager = SettingsManager(path)
+    manager.settings.memory_budget_mb = 64
+    manager.save_settings()
+
+    options = SettingsManager(path).get_batch_options()
+    assert options['memory_budget_mb'] == 64
+
+    source = os.path.join(str(tmp_path), 'a.png')
+    Image.new('RGB', (32, 32)).save(source)
+    results = ImageConverter(history_file=None).batch_convert(
+        [source], os.path.join(str(tmp_path), 'out'), 'JPG', **options)
+    assert [success for success, _, _ in results] == [True]
@@ -0,0 +1,57 @@
+# test_ssim_cache.py - Puntuaciones SSIM guardadas entre ejecuciones y rendiciones
+import os
+import pytest
+from PIL import Image
+from converter import ImageConverter
+import quality_metric
+
+pytestmark = pytest.mark.skipif(not quality_metric.available(), reason="requiere numpy")
+
+SETTINGS = {'target_ssim': 0.97, 'target_iterations': 10}
+
+def _source(tmp_path):
+    path = os.path.join(str(tmp_path), 'source.png')
+    base = Image.radial_gradient('L').resize((400, 300))
+    Image.merge('RGB', (base, base.rotate(90), Image.linear_gradient('L').resize((400, 300)))).save(path)
+    return path
+
+def _perceptual(converter, source, out_dir):
+    results = converter.batch_convert([source], out_dir, 'JPG', use_threading=False,
+                                      quality_settings=SETTINGS)
+    assert results[0][0]
+    return results.file_metrics[0]['perceptual']
+
+def test_second_run_reuses_saved_scores(tmp_path):
+    source = _source(tmp_path)
+    out_dir = os.path.join(str(tmp_path), 'out')
+    first = _perceptual(ImageConverter(history_file=None), source, out_dir)
+    assert os.path.exists(os.path.join(out_dir, quality_metric.ScoreCache.FILE_NAME))
+
+    # Otro conversor (otra ejecución): todas las puntuaciones vienen del archivo
+    second = _perceptual(ImageConverter(history_file=None), source, out_dir)
+    assert second['quality'] == first['quality']
+    assert second['iterations'] == 1 and second['cached'] > 1
+
+def test_renditions_start_from_sibling_quality(tmp_path):
+    source = _source(tmp_path)
+    out_dir = os.path.join(str(tmp_path), 'out')
+    converter = ImageConverter(history_file=None)
+    converter.convert_renditions(source, [{'format': 'JPG', 'name': 'full', 'quality': SETTINGS}],
+                                 out_dir, max_threads=1)
+    smaller = {'format': 'JPG', 'name': 'half', 'resize': {'max_width': 100}, 'quality': SETTINGS}
+    hinted = converter.convert_renditions(source, [smaller], out_dir, max_threads=1)[0]
+    fresh = ImageConverter(history_file=None).convert_renditions(
+        source, [smaller], os.path.join(str(tmp_path), 'fresh'), max_threads=1)[0]
+
+    assert hinted['perceptual']['quality'] == fresh['perceptual']['quality']
+    assert hinted['perceptual']['iterations'] < fresh['perceptual']['iterations']
+
+def test_score_cache_round_trip(tmp_path):
+    path = os.path.join(str(tmp_path), quality_metric.ScoreCache.FILE_NAME)
+    cache = quality_metric.ScoreCache()
+    cache.update('family', 'entry', {50: 0.9, 75: 0.95})
+    cache.save(path)
+
+    loaded = quality_metric.ScoreCache()
+    loaded.load(path)
+    assert loaded.get('family') == {'entry': {50: 0.9, 75: 0.95}}
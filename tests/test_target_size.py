@@ -0,0 +1,53 @@
+# test_target_size.py - Búsqueda de la mayor calidad que cabe en un tamaño
+import io
+import os
+from PIL import Image
+from converter import ImageConverter
+
+def _source(tmp_path):
+    path = os.path.join(str(tmp_path), 'source.png')
+    base = Image.radial_gradient('L').resize((400, 300))
+    Image.merge('RGB', (base, base.rotate(90, expand=False), Image.linear_gradient('L').resize((400, 300)))).save(path)
+    return path
+
+def _encoded_size(path, fmt, quality):
+    buffer = io.BytesIO()
+    with Image.open(path) as img:
+        img.convert('RGB').save(buffer, format='JPEG' if fmt == 'JPG' else fmt, quality=quality)
+    return buffer.tell()
+
+def test_highest_quality_that_fits_is_chosen(tmp_path):
+    source = _source(tmp_path)
+    target = (_encoded_size(source, 'JPG', 40) + _encoded_size(source, 'JPG', 41)) // 2 + 1
+    output = os.path.join(str(tmp_path), 'out.jpg')
+    metrics = {}
+    success, _ = ImageConverter(history_file=None).convert_image(
+        source, output, 'JPG', {'quality': 90, 'target_size': target, 'target_iterations': 10},
+        metrics=metrics)
+
+    assert success
+    info = metrics['target']
+    assert info['met'] and os.path.getsize(output) == info['size'] <= target
+    assert _encoded_size(source, 'JPG', info['quality'] + 1) > target
+    assert info['iterations'] <= 10
+
+def test_configured_quality_that_fits_needs_one_encode(tmp_path):
+    source = _source(tmp_path)
+    metrics = {}
+    ImageConverter(history_file=None).convert_image(
+        source, os.path.join(str(tmp_path), 'out.webp'), 'WEBP',
+        {'quality': 60, 'target_size': 10 * 1024 * 1024}, metrics=metrics)
+    assert metrics['target']['quality'] == 60
+    assert metrics['target']['iterations'] == 1
+
+def test_unreachable_target_keeps_smallest_attempt(tmp_path):
+    source = _source(tmp_path)
+    output = os.path.join(str(tmp_path), 'out.jpg')
+    metrics = {}
+    success, _ = ImageConverter(history_file=None).convert_image(
+        source, output, 'JPG', {'quality': 90, 'target_size': 10, 'target_iterations': 4},
+        metrics=metrics)
+    assert success
+    assert not metrics['target']['met']
+    assert metrics['target']['iterations'] == 4
+    assert os.path.getsize(output) == metrics['target']['size']
@@ -0,0 +1,36 @@
+# test_tree.py - Conversión de árboles de directorios
+import os
+from PIL import Image
+from converter import ImageConverter
+
+def _tree(root):
+    for rel in ('b.png', 'a.png', os.path.join('sub', 'c.png'), os.path.join('sub', 'deep', 'd.bmp')):
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Image.new('RGB', (8, 8), 'red').save(path)
+    with open(os.path.join(root, 'notes.txt'), 'w') as f:
+        f.write('no es una imagen')
+
+def test_walk_mirrors_structure_and_filters_formats(tmp_path):
+    root = os.path.join(str(tmp_path), 'in')
+    _tree(root)
+    converter = ImageConverter(history_file=None)
+
+    found = list(converter.iter_image_files([root], ['PNG'], sort=True))
+    assert [(os.path.relpath(path, root), rel) for path, rel in found] == [
+        ('a.png', '.'), ('b.png', '.'), (os.path.join('sub', 'c.png'), 'sub')]
+
+    out = os.path.join(str(tmp_path), 'out')
+    results = converter.convert_tree([root], out, 'JPG')
+    assert len(results) == 4 and all(success for success, _, _ in results)
+    assert os.path.exists(os.path.join(out, 'sub', 'deep', 'd.jpg'))
+
+def test_output_dir_inside_root_is_not_walked(tmp_path):
+    root = os.path.join(str(tmp_path), 'in')
+    _tree(root)
+    out = os.path.join(root, 'out')
+    converter = ImageConverter(history_file=None)
+    for _ in range(3):
+        results = converter.convert_tree([root], out, 'JPG', incremental=True)
+        assert len(results) == 4
+    assert not os.path.exists(os.path.join(out, 'out'))
@@ -2,17 +2,21 @@
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                             QHBoxLayout, QPushButton, QLabel, QFileDialog,
                             QProgressBar, QComboBox, QDialog, QGridLayout,
-                            QCheckBox, QSpinBox, QSlider, QTextEdit, QTabWidget,
+                            QCheckBox, QSpinBox, QDoubleSpinBox, QSlider, QTextEdit, QTabWidget,
                             QListWidget, QListWidgetItem, QMessageBox, QFrame,
-                            QScrollArea, QButtonGroup, QRadioButton, QGroupBox)
+                            QScrollArea, QButtonGroup, QRadioButton, QGroupBox,
+                            QColorDialog)
 from PyQt6.QtGui import QIcon, QPixmap, QAction, QFont, QPainter, QColor
 from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal, QMimeData, QSize
 import os
 import sys
+import time
+import threading
 from datetime import datetime
 from converter import ImageConverter
+from batch_control import BatchControl
 from settings_manager import SettingsManager
-from PIL import Image, ImageQt
+from PIL import ImageQt
 
 def resource_path(relative_path):
     """Obtener la ruta correcta de los recursos"""
@@ -27,18 +31,45 @@ def resource_path(relative_path):
 class ConversionThread(QThread):
     """
     Hilo para conversión de imágenes, soporta tanto archivos individuales como lotes.
-    Emite progreso general.
+    Emite progreso general, limitado a PROGRESS_INTERVAL segundos entre señales
+    para no saturar el bucle de eventos de Qt en lotes grandes.
     """
     finished = pyqtSignal(bool, str)
     progress = pyqtSignal(int)
 
-    def __init__(self, converter, files_to_convert, output_format, quality_settings, default_output_dir):
+    PROGRESS_INTERVAL = 0.05
+
+    def __init__(self, converter, files_to_convert, output_format, quality_settings, default_output_dir,
+                 batch_options=None, input_format=None):
         super().__init__()
         self.converter = converter
         self.files_to_convert = files_to_convert
         self.output_format = output_format
         self.quality_settings = quality_settings
         self.default_output_dir = default_output_dir
+        self.batch_options = batch_options or {}
+        self.input_format = input_format
+        self._last_progress = -1
+        self._last_progress_time = 0.0
+        self._progress_lock = threading.Lock()
+        self.control = BatchControl()
+
+    def cancel(self):
+        """Cancela el lote: se descarta lo pendiente y lo que está en curso termina limpio"""
+        self.control.cancel()
+        self.requestInterruption()
+
+    def _emit_progress(self, value):
+        """Emite el progreso solo si cambió y ha pasado el intervalo mínimo (100% siempre se emite)"""
+        with self._progress_lock:
+            now = time.monotonic()
+            if value == self._last_progress:
+                return
+            if value < 100 and now - self._last_progress_time < self.PROGRESS_INTERVAL:
+                return
+            self._last_progress = value
+            self._last_progress_time = now
+        self.progress.emit(value)
 
     def run(self):
         total_files = len(self.files_to_convert)
@@ -49,23 +80,34 @@ class ConversionThread(QThread):
         success_count = 0
         results = []
 
-        if total_files == 1:
+        if any(os.path.isdir(path) for path in self.files_to_convert):
+            # Carpetas: conversión recursiva replicando la estructura
+            results = self.converter.convert_tree(
+                self.files_to_convert,
+                self.default_output_dir or None,
+                self.output_format,
+                input_formats=[self.input_format] if self.input_format else None,
+                progress_callback=self._emit_progress,
+                quality_settings=self.quality_settings,
+                control=self.control,
+                **self.batch_options
+            )
+            self._emit_results(results)
+        elif total_files == 1:
             # Single file conversion
             input_path = self.files_to_convert[0]
             output_dir = self.default_output_dir or os.path.dirname(input_path)
             output_name = os.path.splitext(os.path.basename(input_path))[0]
             output_path = os.path.join(output_dir, f"{output_name}.{self.output_format.lower()}")
 
-            def single_progress_callback(value):
-                self.progress.emit(value)
-
             success, message = self.converter.convert_image(
                 input_path,
                 output_path,
                 self.output_format,
                 self.quality_settings,
-                single_progress_callback
+                self._emit_progress
             )
+            self.converter.save_history()
             self.finished.emit(success, message)
         else:
             # Batch conversion
@@ -73,20 +115,53 @@ class ConversionThread(QThread):
                 self.files_to_convert,
                 self.default_output_dir,
                 self.output_format,
-                progress_callback=self.progress.emit,
-                quality_settings=self.quality_settings
+                progress_callback=self._emit_progress,
+                quality_settings=self.quality_settings,
+                control=self.control,
+                **self.batch_options
             )
+            self._emit_results(results)
+
+    def _emit_results(self, results):
+        total_files = len(results)
+        success_count = sum(1 for success, _, _ in results if success)
+        # Reparto del tiempo por etapa, para ver dónde está el cuello de botella
+        breakdown = results.metrics.summary() if results.metrics else ""
+        if results.cancelled:
+            message = "Conversion cancelled." + f" {success_count}/{total_files} files converted."
+            self.finished.emit(False, message)
+        elif success_count == total_files:
+            message = "Conversion completed." + f" ({success_count}/{total_files})"
+            if breakdown:
+                message += f"\n{breakdown}"
+            self.finished.emit(True, message)
+        else:
+            message = "Partial conversion." + f" {success_count}/{total_files} files converted."
+            if breakdown:
+                message += f"\n{breakdown}"
+            self.finished.emit(False, message)
 
-            for success, message, _ in results:
-                if success:
-                    success_count += 1
+class PreviewThread(QThread):
+    """
+    Genera la miniatura de vista previa fuera del hilo de la interfaz usando
+    la decodificación reducida del conversor (draft/reduce).
+    """
+    ready = pyqtSignal(str, object)
+    failed = pyqtSignal(str, str)
 
-            if success_count == total_files:
-                message = "Conversion completed." + f" ({success_count}/{total_files})"
-                self.finished.emit(True, message)
-            else:
-                message = "Partial conversion." + f" {success_count}/{total_files} files converted."
-                self.finished.emit(False, message)
+    def __init__(self, converter, file_path, size=(180, 180)):
+        super().__init__()
+        self.converter = converter
+        self.file_path = file_path
+        self.size = size
+
+    def run(self):
+        try:
+            thumbnail = self.converter.make_thumbnail(self.file_path, self.size)
+            # QImage puede crearse fuera del hilo principal (QPixmap no)
+            self.ready.emit(self.file_path, ImageQt.ImageQt(thumbnail))
+        except Exception as e:
+            self.failed.emit(self.file_path, str(e))
 
 class SettingsDialog(QDialog):
     """Diálogo de configuraciones"""
@@ -176,7 +251,7 @@ class SettingsDialog(QDialog):
         if icon.isNull():
             print("Error: No se pudo cargar el icono configuracion.png para la ventana de configuraciones")
         self.setWindowIcon(icon)
-        self.setFixedSize(500, 600)
+        self.setFixedSize(500, 760)
         layout = QVBoxLayout()
 
         # Crear tabs
@@ -204,11 +279,15 @@ class SettingsDialog(QDialog):
         proc_layout = QVBoxLayout()
         self.threading_radio = QRadioButton(self.translations['concurrent'])
         self.sequential_radio = QRadioButton(self.translations['sequential'])
-        if self.settings_manager.settings.use_threading:
+        self.processes_radio = QRadioButton(self.translations['parallel_processes'])
+        if self.settings_manager.settings.use_processes:
+            self.processes_radio.setChecked(True)
+        elif self.settings_manager.settings.use_threading:
             self.threading_radio.setChecked(True)
         else:
             self.sequential_radio.setChecked(True)
         proc_layout.addWidget(self.threading_radio)
+        proc_layout.addWidget(self.processes_radio)
         proc_layout.addWidget(self.sequential_radio)
         threads_layout = QHBoxLayout()
         self.threads_label = QLabel(self.translations['threads_max'])
@@ -241,9 +320,15 @@ class SettingsDialog(QDialog):
         self.show_notifications_check.setChecked(self.settings_manager.settings.show_notifications)
         self.drag_drop_check = QCheckBox(self.translations['enable_drag_drop'])
         self.drag_drop_check.setChecked(self.settings_manager.settings.enable_drag_drop)
+        self.incremental_check = QCheckBox(self.translations['incremental_conversion'])
+        self.incremental_check.setChecked(self.settings_manager.settings.incremental_conversion)
+        self.dedup_check = QCheckBox(self.translations['deduplicate_inputs'])
+        self.dedup_check.setChecked(self.settings_manager.settings.deduplicate_inputs)
         options_layout.addWidget(self.keep_original_check)
         options_layout.addWidget(self.show_notifications_check)
         options_layout.addWidget(self.drag_drop_check)
+        options_layout.addWidget(self.incremental_check)
+        options_layout.addWidget(self.dedup_check)
         self.options_group.setLayout(options_layout)
         general_layout.addWidget(self.options_group)
 
@@ -267,6 +352,15 @@ class SettingsDialog(QDialog):
         self.jpg_quality_slider.valueChanged.connect(lambda v: self.jpg_quality_label.setText(f"{self.translations['quality']}: {v}%"))
         jpg_layout.addWidget(self.jpg_quality_label)
         jpg_layout.addWidget(self.jpg_quality_slider)
+        # Fondo sobre el que se componen las transparencias (JPG, BMP, TIFF)
+        background_layout = QHBoxLayout()
+        self.background_label = QLabel(self.translations['background_color'])
+        self.background_button = QPushButton()
+        self._set_background_color(self.settings_manager.settings.background_color)
+        self.background_button.clicked.connect(self._choose_background_color)
+        background_layout.addWidget(self.background_label)
+        background_layout.addWidget(self.background_button)
+        jpg_layout.addLayout(background_layout)
         self.jpg_group.setLayout(jpg_layout)
         quality_layout.addWidget(self.jpg_group)
 
@@ -296,6 +390,100 @@ class SettingsDialog(QDialog):
         self.png_group.setLayout(png_layout)
         quality_layout.addWidget(self.png_group)
 
+        # Esfuerzo del codificador
+        self.effort_group = QGroupBox(self.translations['encoder_effort'])
+        effort_layout = QGridLayout()
+        self.effort_combo = QComboBox()
+        for level in ImageConverter.EFFORT_LEVELS + ('auto',):
+            self.effort_combo.addItem(self.translations[f'effort_{level}'], level)
+        self.effort_combo.setCurrentIndex(max(0, self.effort_combo.findData(self.settings_manager.settings.encoder_effort)))
+        self.time_budget_label = QLabel(self.translations['time_budget'])
+        self.time_budget_spin = QSpinBox()
+        self.time_budget_spin.setRange(0, 86400)
+        self.time_budget_spin.setSpecialValueText(self.translations['no_limit'])
+        self.time_budget_spin.setValue(self.settings_manager.settings.effort_time_budget)
+        self.time_budget_spin.setEnabled(self.effort_combo.currentData() == 'auto')
+        self.effort_combo.currentIndexChanged.connect(
+            lambda _: self.time_budget_spin.setEnabled(self.effort_combo.currentData() == 'auto'))
+        effort_layout.addWidget(self.effort_combo, 0, 0, 1, 2)
+        effort_layout.addWidget(self.time_budget_label, 1, 0)
+        effort_layout.addWidget(self.time_budget_spin, 1, 1)
+        self.target_size_label = QLabel(self.translations['target_size'])
+        self.target_size_spin = QSpinBox()
+        self.target_size_spin.setRange(0, 1024 * 1024)
+        self.target_size_spin.setSpecialValueText(self.translations['no_limit'])
+        self.target_size_spin.setValue(self.settings_manager.settings.target_size_kb)
+        effort_layout.addWidget(self.target_size_label, 2, 0)
+        effort_layout.addWidget(self.target_size_spin, 2, 1)
+        self.target_ssim_label = QLabel(self.translations['target_ssim'])
+        self.target_ssim_spin = QDoubleSpinBox()
+        self.target_ssim_spin.setRange(0.0, 0.999)
+        self.target_ssim_spin.setDecimals(3)
+        self.target_ssim_spin.setSingleStep(0.005)
+        self.target_ssim_spin.setSpecialValueText(self.translations['fixed_quality'])
+        self.target_ssim_spin.setValue(self.settings_manager.settings.target_ssim)
+        effort_layout.addWidget(self.target_ssim_label, 3, 0)
+        effort_layout.addWidget(self.target_ssim_spin, 3, 1)
+        self.effort_group.setLayout(effort_layout)
+        quality_layout.addWidget(self.effort_group)
+
+        # Copia sin recodificar cuando el formato no cambia
+        self.passthrough_group = QGroupBox(self.translations['passthrough'])
+        passthrough_layout = QVBoxLayout()
+        self.passthrough_combo = QComboBox()
+        for mode in ImageConverter.PASSTHROUGH_MODES:
+            self.passthrough_combo.addItem(self.translations[f'passthrough_{mode}'], mode)
+        self.passthrough_combo.setCurrentIndex(max(0, self.passthrough_combo.findData(self.settings_manager.settings.passthrough)))
+        self.passthrough_links_check = QCheckBox(self.translations['passthrough_links'])
+        self.passthrough_links_check.setChecked(self.settings_manager.settings.passthrough_links)
+        self.strip_metadata_check = QCheckBox(self.translations['strip_metadata'])
+        self.strip_metadata_check.setChecked(self.settings_manager.settings.strip_metadata)
+        passthrough_layout.addWidget(self.passthrough_combo)
+        passthrough_layout.addWidget(self.passthrough_links_check)
+        passthrough_layout.addWidget(self.strip_metadata_check)
+        self.passthrough_group.setLayout(passthrough_layout)
+        quality_layout.addWidget(self.passthrough_group)
+
+        # Redimensionado
+        settings = self.settings_manager.settings
+        self.resize_group = QGroupBox(self.translations['resize'])
+        self.resize_group.setCheckable(True)
+        self.resize_group.setChecked(settings.resize_enabled)
+        resize_layout = QGridLayout()
+        self.max_width_label = QLabel(self.translations['max_width'])
+        self.max_width_spin = QSpinBox()
+        self.max_width_spin.setRange(0, 20000)
+        self.max_width_spin.setSpecialValueText(self.translations['no_limit'])
+        self.max_width_spin.setValue(settings.resize_max_width)
+        self.max_height_label = QLabel(self.translations['max_height'])
+        self.max_height_spin = QSpinBox()
+        self.max_height_spin.setRange(0, 20000)
+        self.max_height_spin.setSpecialValueText(self.translations['no_limit'])
+        self.max_height_spin.setValue(settings.resize_max_height)
+        self.resize_mode_label = QLabel(self.translations['resize_mode'])
+        self.resize_mode_combo = QComboBox()
+        for mode in ImageConverter.RESIZE_MODES:
+            self.resize_mode_combo.addItem(self.translations[f'resize_{mode}'], mode)
+        self.resize_mode_combo.setCurrentIndex(max(0, self.resize_mode_combo.findData(settings.resize_mode)))
+        self.resample_label = QLabel(self.translations['resample_filter'])
+        self.resample_combo = QComboBox()
+        for name in ImageConverter.RESAMPLE_FILTERS:
+            self.resample_combo.addItem(name.capitalize(), name)
+        self.resample_combo.setCurrentIndex(max(0, self.resample_combo.findData(settings.resize_resample)))
+        self.only_shrink_check = QCheckBox(self.translations['only_shrink'])
+        self.only_shrink_check.setChecked(settings.resize_only_shrink)
+        resize_layout.addWidget(self.max_width_label, 0, 0)
+        resize_layout.addWidget(self.max_width_spin, 0, 1)
+        resize_layout.addWidget(self.max_height_label, 1, 0)
+        resize_layout.addWidget(self.max_height_spin, 1, 1)
+        resize_layout.addWidget(self.resize_mode_label, 2, 0)
+        resize_layout.addWidget(self.resize_mode_combo, 2, 1)
+        resize_layout.addWidget(self.resample_label, 3, 0)
+        resize_layout.addWidget(self.resample_combo, 3, 1)
+        resize_layout.addWidget(self.only_shrink_check, 4, 0, 1, 2)
+        self.resize_group.setLayout(resize_layout)
+        quality_layout.addWidget(self.resize_group)
+
         self.quality_tab.setLayout(quality_layout)
         icon = QIcon(resource_path("assets/calidad.png"))
         if icon.isNull():
@@ -325,6 +513,16 @@ class SettingsDialog(QDialog):
         if directory:
             self.output_dir_label.setText(directory)
 
+    def _set_background_color(self, color):
+        self.background_color = QColor(color).name()
+        self.background_button.setText(self.background_color.upper())
+        self.background_button.setStyleSheet(f"background-color: {self.background_color};")
+
+    def _choose_background_color(self):
+        color = QColorDialog.getColor(QColor(self.background_color), self, self.translations['background_color'])
+        if color.isValid():
+            self._set_background_color(color.name())
+
     def save_settings(self):
         """Guardar configuraciones"""
         new_language_code = self.lang_combo.currentData()
@@ -332,6 +530,7 @@ class SettingsDialog(QDialog):
 
         self.settings_manager.set_setting('language', new_language_code)
         self.settings_manager.set_setting('use_threading', self.threading_radio.isChecked())
+        self.settings_manager.set_setting('use_processes', self.processes_radio.isChecked())
         self.settings_manager.set_setting('max_threads', self.threads_spin.value())
         output_dir = self.output_dir_label.text()
         if output_dir != self.translations['same_as_original_dir']:
@@ -341,9 +540,25 @@ class SettingsDialog(QDialog):
         self.settings_manager.set_setting('keep_original_files', self.keep_original_check.isChecked())
         self.settings_manager.set_setting('show_notifications', self.show_notifications_check.isChecked())
         self.settings_manager.set_setting('enable_drag_drop', self.drag_drop_check.isChecked())
+        self.settings_manager.set_setting('incremental_conversion', self.incremental_check.isChecked())
+        self.settings_manager.set_setting('deduplicate_inputs', self.dedup_check.isChecked())
         self.settings_manager.set_setting('jpg_quality', self.jpg_quality_slider.value())
         self.settings_manager.set_setting('webp_quality', self.webp_quality_slider.value())
         self.settings_manager.set_setting('png_compression', self.png_compression_slider.value())
+        self.settings_manager.set_setting('background_color', self.background_color.upper())
+        self.settings_manager.set_setting('encoder_effort', self.effort_combo.currentData())
+        self.settings_manager.set_setting('effort_time_budget', self.time_budget_spin.value())
+        self.settings_manager.set_setting('target_size_kb', self.target_size_spin.value())
+        self.settings_manager.set_setting('target_ssim', self.target_ssim_spin.value())
+        self.settings_manager.set_setting('passthrough', self.passthrough_combo.currentData())
+        self.settings_manager.set_setting('passthrough_links', self.passthrough_links_check.isChecked())
+        self.settings_manager.set_setting('strip_metadata', self.strip_metadata_check.isChecked())
+        self.settings_manager.set_setting('resize_enabled', self.resize_group.isChecked())
+        self.settings_manager.set_setting('resize_max_width', self.max_width_spin.value())
+        self.settings_manager.set_setting('resize_max_height', self.max_height_spin.value())
+        self.settings_manager.set_setting('resize_mode', self.resize_mode_combo.currentData())
+        self.settings_manager.set_setting('resize_resample', self.resample_combo.currentData())
+        self.settings_manager.set_setting('resize_only_shrink', self.only_shrink_check.isChecked())
 
         if language_changed:
             self.translations = self.settings_manager.get_translations()
@@ -386,6 +601,7 @@ class SettingsDialog(QDialog):
         self.proc_group.setTitle(self.translations['processing_mode'])
         self.threading_radio.setText(self.translations['concurrent'])
         self.sequential_radio.setText(self.translations['sequential'])
+        self.processes_radio.setText(self.translations['parallel_processes'])
         self.threads_label.setText(self.translations['threads_max'])
 
         self.output_group.setTitle(self.translations['output_directory'])
@@ -397,6 +613,8 @@ class SettingsDialog(QDialog):
         self.keep_original_check.setText(self.translations['maintain_original_files'])
         self.show_notifications_check.setText(self.translations['show_notifications'])
         self.drag_drop_check.setText(self.translations['enable_drag_drop'])
+        self.incremental_check.setText(self.translations['incremental_conversion'])
+        self.dedup_check.setText(self.translations['deduplicate_inputs'])
 
         self.jpg_group.setTitle("JPG " + self.translations['quality'])
         self.jpg_quality_label.setText(f"{self.translations['quality']}: {self.settings_manager.settings.jpg_quality}%")
@@ -407,6 +625,32 @@ class SettingsDialog(QDialog):
         self.png_group.setTitle(self.translations['png_compression'])
         self.png_compression_label.setText(f"{self.translations['png_compression']}: {self.settings_manager.settings.png_compression}")
 
+        self.background_label.setText(self.translations['background_color'])
+        self.effort_group.setTitle(self.translations['encoder_effort'])
+        for i in range(self.effort_combo.count()):
+            self.effort_combo.setItemText(i, self.translations[f'effort_{self.effort_combo.itemData(i)}'])
+        self.time_budget_label.setText(self.translations['time_budget'])
+        self.time_budget_spin.setSpecialValueText(self.translations['no_limit'])
+        self.target_size_label.setText(self.translations['target_size'])
+        self.target_size_spin.setSpecialValueText(self.translations['no_limit'])
+        self.target_ssim_label.setText(self.translations['target_ssim'])
+        self.target_ssim_spin.setSpecialValueText(self.translations['fixed_quality'])
+        self.passthrough_group.setTitle(self.translations['passthrough'])
+        for i in range(self.passthrough_combo.count()):
+            self.passthrough_combo.setItemText(i, self.translations[f'passthrough_{self.passthrough_combo.itemData(i)}'])
+        self.passthrough_links_check.setText(self.translations['passthrough_links'])
+        self.strip_metadata_check.setText(self.translations['strip_metadata'])
+        self.resize_group.setTitle(self.translations['resize'])
+        self.max_width_label.setText(self.translations['max_width'])
+        self.max_height_label.setText(self.translations['max_height'])
+        self.max_width_spin.setSpecialValueText(self.translations['no_limit'])
+        self.max_height_spin.setSpecialValueText(self.translations['no_limit'])
+        self.resize_mode_label.setText(self.translations['resize_mode'])
+        for i, mode in enumerate(ImageConverter.RESIZE_MODES):
+            self.resize_mode_combo.setItemText(i, self.translations[f'resize_{mode}'])
+        self.resample_label.setText(self.translations['resample_filter'])
+        self.only_shrink_check.setText(self.translations['only_shrink'])
+
         self.save_button.setText(self.translations['save'])
         self.cancel_button.setText(self.translations['cancel'])
         self.reset_button.setText(self.translations['reset'])
@@ -520,8 +764,7 @@ class HistoryDialog(QDialog):
                                    self.translations['clear_history_confirm'],
                                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            self.converter.history.clear()
-            self.converter.save_history()
+            self.converter.clear_history()
             self.load_history()
 
 class DragDropLabel(QLabel):
@@ -594,11 +837,12 @@ class ConverterWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.settings_manager = SettingsManager()
-        self.converter = ImageConverter()
+        self.converter = ImageConverter(max_history_items=self.settings_manager.settings.max_history_items)
         self.translations = self.settings_manager.get_translations()
         self.current_files = []
         self.current_format = None
         self.conversion_thread = None
+        self.preview_threads = []
         self.init_ui()
         self.apply_theme()
 
@@ -674,6 +918,11 @@ class ConverterWindow(QMainWindow):
         self.progress_bar.hide()
         self.layout.addWidget(self.progress_bar)
 
+        self.cancel_button = QPushButton(self.translations['cancel'])
+        self.cancel_button.clicked.connect(self.cancel_conversion)
+        self.cancel_button.hide()
+        self.layout.addWidget(self.cancel_button)
+
         self.back_button = QPushButton(self.translations['back'])
         self.back_button.clicked.connect(self.reset_interface)
         self.back_button.hide()
@@ -777,7 +1026,7 @@ class ConverterWindow(QMainWindow):
         valid_extensions = self.converter.SUPPORTED_FORMATS.get(input_format.upper(), [])
         for file in files:
             ext = os.path.splitext(file)[1].lower()[1:]
-            if ext in valid_extensions:
+            if os.path.isdir(file) or ext in valid_extensions:
                 valid_files.append(file)
         if not valid_files:
             self.status_label.setText(self.translations['no_valid_files'])
@@ -789,36 +1038,39 @@ class ConverterWindow(QMainWindow):
 
     def show_file_info(self):
         """Mostrar información del archivo seleccionado"""
-        if len(self.current_files) == 1:
+        if len(self.current_files) == 1 and os.path.isdir(self.current_files[0]):
+            self.file_info_label.setText(f"{self.translations['folder']}: {os.path.basename(self.current_files[0])}")
+            self.preview_label.hide()
+        elif len(self.current_files) == 1:
             file_path = self.current_files[0]
             file_name = os.path.basename(file_path)
             file_size = os.path.getsize(file_path)
             file_size_mb = file_size / (1024 * 1024)
             self.file_info_label.setText(f"{self.translations['file']}: {file_name}\n{self.translations['size']}: {file_size_mb:.2f} MB")
-            try:
-                img = Image.open(file_path)
-                if img.mode not in ('RGB', 'RGBA', 'L'):
-                    img = img.convert('RGBA')
-                elif img.mode == 'P':
-                    if 'transparency' in img.info or img.format == 'GIF':
-                        img = img.convert('RGBA')
-                    else:
-                        img = img.convert('RGB')
-                elif img.mode == 'L':
-                    img = img.convert('RGB')
-                qim = ImageQt.ImageQt(img)
-                pixmap = QPixmap.fromImage(qim)
-                scaled_pixmap = pixmap.scaled(180, 180, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-                self.preview_label.setPixmap(scaled_pixmap)
-                self.preview_label.show()
-            except Exception as e:
-                print(f"Error al cargar la vista previa de la imagen: {e}")
-                self.preview_label.hide()
+            # Conservar referencias hasta que terminen las vistas previas anteriores
+            self.preview_threads = [t for t in self.preview_threads if t.isRunning()]
+            preview_thread = PreviewThread(self.converter, file_path)
+            preview_thread.ready.connect(self.show_preview)
+            preview_thread.failed.connect(self.preview_failed)
+            self.preview_threads.append(preview_thread)
+            preview_thread.start()
         else:
             self.file_info_label.setText(f"{self.translations['selected_files']} {len(self.current_files)}")
             self.preview_label.hide()
         self.file_info_label.show()
 
+    def show_preview(self, file_path, qim):
+        """Mostrar la miniatura generada por PreviewThread"""
+        if self.current_files != [file_path]:
+            return  # La selección cambió mientras se generaba
+        self.preview_label.setPixmap(QPixmap.fromImage(qim))
+        self.preview_label.show()
+
+    def preview_failed(self, file_path, error):
+        print(f"Error al cargar la vista previa de la imagen: {error}")
+        if self.current_files == [file_path]:
+            self.preview_label.hide()
+
     def show_conversion_interface(self):
         """Mostrar interfaz de conversión"""
         self.drop_label.hide()
@@ -842,15 +1094,26 @@ class ConverterWindow(QMainWindow):
             self.current_files,
             output_format,
             quality_settings,
-            default_output_dir
+            default_output_dir,
+            self.settings_manager.get_batch_options(),
+            self.input_format_combo.currentText()
         )
         self.conversion_thread.finished.connect(self.conversion_finished)
         self.conversion_thread.progress.connect(self.progress_bar.setValue)
+        self.cancel_button.setEnabled(True)
+        self.cancel_button.show()
         self.conversion_thread.start()
 
+    def cancel_conversion(self):
+        """Cancelar la conversión en curso; los resultados parciales llegan en conversion_finished"""
+        if self.conversion_thread and self.conversion_thread.isRunning():
+            self.cancel_button.setEnabled(False)
+            self.conversion_thread.cancel()
+
     def conversion_finished(self, success, message):
         """Manejar finalización de conversión"""
         self.progress_bar.hide()
+        self.cancel_button.hide()
         self.status_label.setText(message)
         if success:
             self.status_label.setStyleSheet("color: #4CAF50;")
@@ -862,7 +1125,7 @@ class ConverterWindow(QMainWindow):
     def reset_interface(self):
         """Resetear interfaz para nueva conversión"""
         if self.conversion_thread and self.conversion_thread.isRunning():
-            self.conversion_thread.requestInterruption()
+            self.conversion_thread.cancel()
             self.conversion_thread.wait(5000)
             if self.conversion_thread.isRunning():
                 print("Advertencia: El hilo de conversión no terminó limpiamente.")
@@ -873,6 +1136,7 @@ class ConverterWindow(QMainWindow):
         self.convert_button.hide()
         self.back_button.hide()
         self.progress_bar.hide()
+        self.cancel_button.hide()
         self.status_label.setText("")
         self.status_label.setStyleSheet("color: #FFFFFF;")
         self.reset_timer.stop()
@@ -908,6 +1172,7 @@ class ConverterWindow(QMainWindow):
             self.format_label.setText(self.translations['select_conversion'])
             self.drop_label.setText(self.translations['drag_drop_files'] + "\n" + self.translations['or_click_to_select'])
             self.back_button.setText(self.translations['back'])
+            self.cancel_button.setText(self.translations['cancel'])
             if hasattr(self, 'from_label') and self.from_label is not None:
                 self.from_label.setText(self.translations['from'])
             if hasattr(self, 'to_label') and self.to_label is not None:
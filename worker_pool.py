@@ -0,0 +1,76 @@
+# worker_pool.py - Pool de hilos reutilizable con cola de trabajo acotada
+
+import threading
+import queue
+from concurrent.futures import Future
+
+class WorkerPool:
+    """
+    Pool de hilos de larga duración que consumen tareas de una cola acotada.
+    submit() bloquea cuando la cola está llena (contrapresión) y devuelve un
+    Future, así que la finalización se notifica por eventos y no por sondeo.
+    queue_size=0 deja la cola sin límite: submit() nunca bloquea y quien
+    llama acota el trabajo pendiente por su cuenta.
+    """
+    _STOP = object()
+
+    def __init__(self, num_workers=4, queue_size=None):
+        self.num_workers = max(1, int(num_workers))
+        self._tasks = queue.Queue(maxsize=self.num_workers * 2 if queue_size is None else queue_size)
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._threads = []
+        for i in range(self.num_workers):
+            t = threading.Thread(target=self._worker, name=f"pix-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _worker(self):
+        while True:
+            item = self._tasks.get()
+            if item is self._STOP:
+                return
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def submit(self, fn, *args, **kwargs):
+        """Encola una tarea; bloquea mientras la cola esté llena"""
+        if self._shutdown:
+            raise RuntimeError("El pool de trabajo está cerrado")
+        future = Future()
+        self._tasks.put((future, fn, args, kwargs))
+        return future
+
+    def cancel_pending(self):
+        """Descarta las tareas que siguen en cola (sus Futures quedan cancelados); devuelve cuántas"""
+        dropped = 0
+        while True:
+            try:
+                item = self._tasks.get_nowait()
+            except queue.Empty:
+                return dropped
+            if item is self._STOP:
+                # Cierre en curso: la señal de parada no se descarta
+                self._tasks.put(item)
+                return dropped
+            if item[0].cancel():
+                dropped += 1
+
+    def shutdown(self, wait=True):
+        """Detiene los hilos una vez vaciada la cola"""
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+        for _ in self._threads:
+            self._tasks.put(self._STOP)
+        if wait:
+            for t in self._threads:
+                t.join()